@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+# Sends async streaming responses on the event loop, see core.asgi
+from core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the settings are configured
+from core.media import MediaApp  # noqa: E402
+
+# Media files are streamed on the event loop, see core.media
+application = MediaApp(django_application)
@@ -55,17 +55,25 @@ INSTALLED_APPS = [
     "rest_framework",
     "comment",
     "core",
+    "export",
     "reply",
+    "tag",
     "user",
     "video",
 ]
 
+# Authenticate requests with a user built from the access token claims,
+# see core.authentication, rather than reading the user on every request
+JWT_TOKEN_USER = env.bool("JWT_TOKEN_USER", default=True)
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "core.renderers.FastJSONRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.TokenUserAuthentication"
+        if JWT_TOKEN_USER
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -80,7 +88,8 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=180),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
-    "UPDATE_LAST_LOGIN": True,
+    # Written in batches by user.logins instead
+    "UPDATE_LAST_LOGIN": False,
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "VERIFYING_KEY": None,
@@ -94,7 +103,7 @@ SIMPLE_JWT = {
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
-    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_USER_CLASS": "core.models.TokenUser",
     "JTI_CLAIM": "jti",
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
@@ -144,9 +153,60 @@ DATABASES = {
         "PASSWORD": env("DATABASE_PASSWORD"),
         "HOST": env("DATABASE_HOST"),
         "PORT": env("DATABASE_PORT"),
+        # Connections kept by the process, see core.db_backends
+        "POOL": {
+            "SIZE": env.int("DATABASE_POOL_SIZE", default=10),
+            "TIMEOUT": env.float("DATABASE_POOL_TIMEOUT", default=5),
+            "PING_AFTER": env.float("DATABASE_POOL_PING_AFTER", default=1),
+            "MAX_LIFETIME": env.float(
+                "DATABASE_POOL_MAX_LIFETIME", default=1800
+            ),
+        },
     }
 }
 
+# Take the connections to PostgreSQL from a pool rather than opening one
+# per request
+if (
+    env.bool("DATABASE_POOL", default=True)
+    and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql"
+):
+    DATABASES["default"]["ENGINE"] = "core.db_backends.postgresql"
+
+# Covering indexes are built without their included columns on databases
+# other than PostgreSQL, e.g. SQLite for local runs, which is expected
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+# Cache shared by every process, a local stand-in unless SHARED_CACHE_URL
+# points to Redis, behind an in-process tier, see core.cache_backends
+SHARED_CACHE_URL = env("SHARED_CACHE_URL", default=None)
+
+CACHES = {
+    "default": {
+        "BACKEND": "core.cache_backends.TieredCache",
+        # Names the in-process tier shared by the threads of a process
+        "LOCATION": "default",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "MAX_SIZE": env.int("LOCAL_CACHE_MAX_SIZE", default=64 * 2**20),
+            "LOCAL_TTL": env.float("LOCAL_CACHE_TTL", default=1),
+            "JITTER": 0.1,
+        },
+    },
+    "shared": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": SHARED_CACHE_URL,
+        }
+        if SHARED_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "shared",
+            "OPTIONS": {"MAX_ENTRIES": 10_000},
+        }
+    ),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -185,6 +245,33 @@ USE_TZ = True
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "media/"
 
+# Neighbour table of the text-similarity related videos, see video.similar
+TEXT_NEIGHBOURS_PATH = env(
+    "TEXT_NEIGHBOURS_PATH",
+    default=os.path.join(BASE_DIR, "var", "text_neighbours.bin"),
+)
+
+# Seconds the pages of each cached listing are kept, see core.caching
+LIST_CACHE_TTLS = {
+    "videos": env.int("VIDEO_LIST_CACHE_TTL", default=60),
+    "user-videos": env.int("USER_VIDEOS_CACHE_TTL", default=300),
+}
+
+# Seconds the active state of token users is cached, see core.authentication
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", default=30)
+
+# Threads checking the credentials of the async token endpoint, and the
+# checks that may wait for one before logins are refused, see
+# user.credentials
+LOGIN_POOL_SIZE = env.int("LOGIN_POOL_SIZE", default=4)
+LOGIN_QUEUE_DEPTH = env.int("LOGIN_QUEUE_DEPTH", default=16)
+
+# Longest seconds a last login time waits to be written, see user.logins
+LAST_LOGIN_FLUSH_INTERVAL = env.float("LAST_LOGIN_FLUSH_INTERVAL", default=5)
+
+# Threads reading the media files streamed under ASGI, see core.media
+MEDIA_READ_THREADS = env.int("MEDIA_READ_THREADS", default=8)
+
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_URL = "static/"
 
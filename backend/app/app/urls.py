@@ -20,8 +20,11 @@ from django.urls import path, include
 
 urlpatterns = [
     path("admin/", admin.site.urls, name="admin-site"),
+    path("api/", include("core.urls"), name="core-resource"),
     path("api/comments/", include("comment.urls"), name="comment-resource"),
+    path("api/export/", include("export.urls"), name="export-resource"),
     path("api/replies/", include("reply.urls"), name="reply-resource"),
+    path("api/tags/", include("tag.urls"), name="tag-resource"),
     path("api/users/", include("user.urls"), name="user-resource"),
     path("api/videos/", include("video.urls"), name="video-resource"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -8,7 +8,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Comment
-        fields = "__all__"
+        exclude = ("updated_at",)
         read_only_fields = ("id", "created_at", "created_by", "likes")
 
     def get_created_at(self, obj):
@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from comment import serializers
-from core import models
+from core import conditional, models
 
 
 class CommentDetailView(APIView):
@@ -20,9 +20,9 @@ class CommentDetailView(APIView):
         """Retrieve a comment"""
 
         try:
-            comment = self.queryset.get(id=id)
-            serializer = self.serializer_class(comment, many=False)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.detail_response(
+                request, self.queryset, id, self.serializer_class
+            )
         except models.Comment.DoesNotExist:
             """Return 404 if comment not found"""
 
@@ -321,9 +321,19 @@ class ReplyView(APIView):
 
         try:
             comment = models.Comment.objects.get(id=id)
-            replies = self.queryset.filter(comment=comment)
-            serializer = self.serializer_class(replies, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            replies = self.queryset.filter(comment=comment).order_by(
+                "created_at", "id"
+            )
+            validators = conditional.collection_validators(request, replies)
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
+
+            serializer = self.serializer_class(
+                replies.select_related("created_by"), many=True
+            )
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.add_validators(response, validators)
         except models.Comment.DoesNotExist:
             """Return 404 if comment not found"""
 
@@ -1,11 +1,35 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from core import models
+from core import models, tags
+
+
+class VideoTagForm(forms.ModelForm):
+    """Video tag edited by name instead of picked from every tag"""
+
+    tag = forms.CharField(
+        max_length=50,
+        validators=models.Tag._meta.get_field("name").validators,
+    )
+
+    class Meta:
+        model = models.VideoTag
+        fields = ("video", "tag")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.tag_id:
+            self.initial["tag"] = self.instance.tag.name
+
+    def clean_tag(self):
+        name = tags.normalize(self.cleaned_data["tag"])
+        return models.Tag(id=tags.get_id(name, create=True), name=name)
 
 
 class VideoTagInline(admin.TabularInline):
     model = models.VideoTag
+    form = VideoTagForm
     extra = 0
     verbose_name = "Tag"
     verbose_name_plural = "Tags"
@@ -211,6 +235,7 @@ class CommentAdmin(ModelAdmin):
 
 
 class VideoTagAdmin(ModelAdmin):
+    form = VideoTagForm
     ordering = ("id",)
     list_display = ("video", "tag", "get_created_by")
     fieldsets = (
@@ -0,0 +1,59 @@
+"""
+ASGI handler sending async streaming responses on the event loop.
+
+Django 4.1 iterates the content of streaming responses with a plain
+``for`` on the event loop, so content waiting for its chunks, e.g. an
+export produced in a thread, blocks every other request of the worker
+meanwhile. ``StreamingHttpResponse`` keeps content that is also an async
+iterable, and ``ASGIHandler`` sends it with ``async for`` instead. Other
+handlers, e.g. WSGI or the test client, iterate it as usual.
+"""
+
+import django
+from django import http
+from django.core.handlers import asgi
+
+
+class StreamingHttpResponse(http.StreamingHttpResponse):
+    """Streaming response sent with ``async for`` when it can be"""
+
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        super().__init__(streaming_content, *args, **kwargs)
+        self.async_content = None
+        if hasattr(streaming_content, "__aiter__"):
+            self.async_content = streaming_content
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGI handler of Django, sending async content with ``async for``"""
+
+    async def send_response(self, response, send):
+        content = getattr(response, "async_content", None)
+        if content is None:
+            return await super().send_response(response, send)
+
+        async def send_content(message):
+            # The closing message, once the headers are sent
+            if message["type"] == "http.response.body":
+                async for part in content:
+                    part = response.make_bytes(part)
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send(
+                            {
+                                "type": "http.response.body",
+                                "body": chunk,
+                                "more_body": True,
+                            }
+                        )
+            await send(message)
+
+        # Sent above, the sync iteration of Django sends nothing
+        response.streaming_content = ()
+        await super().send_response(response, send_content)
+
+
+def get_asgi_application():
+    """``django.core.asgi.get_asgi_application`` with the handler above"""
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,95 @@
+"""
+JWT authentication without reading the user on every request.
+
+Access tokens carry the id of the user and the claims of
+``TokenUser.CLAIMS``, from which the user of a request is built. Views
+using only those fields never read the user; the first access to any
+other field reads the whole row. The claims are those of the user when
+the token was issued, so they may be ``ACCESS_TOKEN_LIFETIME`` old.
+
+Whether the user is still active is cached for ``USER_CACHE_TTL``
+seconds, and dropped when the user is saved or deleted, so deactivated
+users are rejected at once. Tokens without the claims authenticate by
+reading the user.
+"""
+
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from core import caching
+
+ACTIVE_KEY = "user:{id}:active"
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """Authenticates requests as the token user of their access token"""
+
+    def get_user(self, validated_token):
+        user_class = api_settings.TOKEN_USER_CLASS
+        if any(claim not in validated_token for claim in user_class.CLAIMS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        is_active = is_user_active(user_class, user_id)
+        if is_active is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        if not is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        fields = {
+            api_settings.USER_ID_FIELD: user_id,
+            "is_active": is_active,
+            **{claim: validated_token[claim] for claim in user_class.CLAIMS},
+        }
+        # In the order of the model fields, the others deferred
+        names = [
+            field.attname
+            for field in user_class._meta.concrete_fields
+            if field.attname in fields
+        ]
+        return user_class.from_db(
+            router.db_for_read(user_class),
+            names,
+            [fields[name] for name in names],
+        )
+
+
+def is_user_active(user_class, user_id):
+    """Whether the user is active, None when missing"""
+
+    def load():
+        users = user_class.objects.filter(id=user_id)
+        return users.values_list("is_active", flat=True).first()
+
+    return caching.get_or_fill(
+        ACTIVE_KEY.format(id=user_id),
+        load,
+        settings.USER_CACHE_TTL,
+        "user:active",
+    )
+
+
+def forget(user_id, using="default"):
+    """Drop the cached active state of a user, now and on commit"""
+
+    key = ACTIVE_KEY.format(id=user_id)
+    cache.delete(key)
+    transaction.on_commit(partial(cache.delete, key), using=using)
@@ -0,0 +1,249 @@
+"""
+Two-tier cache backend: an in-process LRU in front of a shared cache.
+
+Values are pickled by this backend and stored in the shared cache with a
+random stamp, and the stamp alone under a second key. Each process keeps
+the values it read or wrote in a size bounded LRU, unpickled, with their
+stamp, sized by the length of the pickle written or read. A value of the LRU is
+served without asking the shared cache for ``LOCAL_TTL`` seconds after it
+was read or last revalidated; after that only its stamp is read back from
+the shared cache, and the value is read again when the stamp changed
+because another process set or deleted the key. Changes made by other
+processes are thus seen after at most ``LOCAL_TTL`` seconds, changes made
+by the same process at once.
+
+Timeouts are shortened by a random fraction of up to ``JITTER`` per key,
+so that keys set together do not expire together.
+
+The LRU is shared by the threads of a process, like the entries of a
+``LocMemCache``, through module state keyed by the ``LOCATION`` of the
+cache, while Django creates a cache object per thread. Its values are
+shared by the callers rather than copied, so they must not be mutated.
+
+Options:
+    SHARED: alias of the shared cache in ``CACHES``
+    MAX_SIZE: bytes of pickled values held by each process
+    LOCAL_TTL: seconds values are served before their stamp is checked
+    JITTER: largest fraction a timeout is shortened by
+"""
+
+import pickle
+import random
+import secrets
+import threading
+from collections import Counter, OrderedDict
+from time import monotonic, time
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAMP_SUFFIX = ":stamp"
+
+
+class Entry:
+    __slots__ = ("value", "stamp", "size", "expires_at", "checked_at")
+
+    def __init__(self, value, stamp, size, expires_at, checked_at):
+        self.value = value
+        self.stamp = stamp
+        self.size = size
+        self.expires_at = expires_at
+        self.checked_at = checked_at
+
+
+class LocalTier:
+    """LRU of the values of a process, with the counts of its reads"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", "shared")
+        self.max_size = options.get("MAX_SIZE", 64 * 2**20)
+        # Larger values would evict too much of the LRU at once
+        self.max_entry_size = self.max_size // 16
+        self.local_ttl = options.get("LOCAL_TTL", 1)
+        self.jitter = options.get("JITTER", 0.1)
+
+        with _tiers_lock:
+            self._tier = _tiers.setdefault(location, LocalTier())
+        self._entries = self._tier.entries
+        self._lock = self._tier.lock
+        self._counts = self._tier.counts
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def stats(self):
+        """Counts of the reads answered by each tier in this process"""
+
+        with self._lock:
+            counts = dict(self._counts)
+            entries, size = len(self._entries), self._tier.size
+        reads = sum(counts.values())
+        return {
+            "reads": reads,
+            "local_hits": counts.get("local", 0),
+            "revalidated_hits": counts.get("revalidated", 0),
+            "shared_hits": counts.get("shared", 0),
+            "misses": counts.get("miss", 0),
+            "local_hit_ratio": (
+                (counts.get("local", 0) + counts.get("revalidated", 0))
+                / reads
+                if reads
+                else 0.0
+            ),
+            "shared_hit_ratio": (
+                counts.get("shared", 0) / reads if reads else 0.0
+            ),
+            "local_entries": entries,
+            "local_size": size,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts.clear()
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None and now - entry.checked_at < self.local_ttl:
+                self._entries.move_to_end(key)
+                self._counts["local"] += 1
+                return entry.value
+
+        if entry is not None:
+            if self.shared.get(key + STAMP_SUFFIX) == entry.stamp:
+                with self._lock:
+                    entry.checked_at = now
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self._counts["revalidated"] += 1
+                return entry.value
+
+        stored = self.shared.get(key)
+        if stored is None:
+            with self._lock:
+                self._remove(key)
+                self._counts["miss"] += 1
+            return default
+
+        stamp, payload, expires_at = stored
+        value = pickle.loads(payload)
+        with self._lock:
+            self._counts["shared"] += 1
+        self._remember(key, value, stamp, expires_at, len(payload))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout, expires_at = self._timeout(timeout)
+        stamp = secrets.token_hex(8)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self.shared.set_many(
+            {key: (stamp, payload, expires_at), key + STAMP_SUFFIX: stamp},
+            timeout,
+        )
+        self._remember(key, value, stamp, expires_at, len(payload))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout, expires_at = self._timeout(timeout)
+        stamp = secrets.token_hex(8)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if not self.shared.add(key, (stamp, payload, expires_at), timeout):
+            return False
+        # Readers of the key before the stamp is set read the value again
+        self.shared.set(key + STAMP_SUFFIX, stamp, timeout)
+        self._remember(key, value, stamp, expires_at, len(payload))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            self._remove(key)
+        timeout, _ = self._timeout(timeout)
+        touched = self.shared.touch(key, timeout)
+        self.shared.touch(key + STAMP_SUFFIX, timeout)
+        return touched
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            found = self._remove(key)
+        deleted = self.shared.delete(key)
+        self.shared.delete(key + STAMP_SUFFIX)
+        return deleted or found
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(k, version=version) for k in keys]
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+        self.shared.delete_many(keys + [key + STAMP_SUFFIX for key in keys])
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tier.size = 0
+        self.shared.clear()
+
+    def clear_local(self):
+        """Forget the values held by this process, e.g. in tests"""
+
+        with self._lock:
+            self._entries.clear()
+            self._tier.size = 0
+
+    def _timeout(self, timeout):
+        """
+        Jittered timeout in seconds and the wall clock time it expires at,
+        stored with the value for the local tier of every process
+        """
+
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None, float("inf")
+        if timeout > 0:
+            timeout *= 1 - random.random() * self.jitter
+        return timeout, time() + timeout
+
+    def _remember(self, key, value, stamp, expires_at, size):
+        now = monotonic()
+        expires_at = now + (expires_at - time())
+        with self._lock:
+            self._remove(key)
+            if size > self.max_entry_size or expires_at <= now:
+                return
+            self._entries[key] = Entry(value, stamp, size, expires_at, now)
+            self._tier.size += size
+            while self._tier.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._tier.size -= evicted.size
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._tier.size -= entry.size
+        return True
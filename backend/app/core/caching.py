@@ -0,0 +1,278 @@
+"""
+Read-through cache of the representations of single objects.
+
+The representation of an object is cached under its id and a version
+token, itself cached under the id. Any change to the object, or to the
+username of its author, drops the token and the next reader picks a new
+one, so the cached representation is never read again and expires. A
+reader that loaded the object before a change stores it under the token
+it read before loading, which is the dropped one, so a stale
+representation is never cached under the current token.
+
+Pages of listings are cached the same way under their normalized query
+parameters and a generation token of the listing, optionally scoped, e.g.
+to the videos of one user. Any write to the listed rows drops the
+generation token, which drops every cached page of the listing at once
+without knowing their keys. The pages of each listing are kept for the
+seconds of ``settings.LIST_CACHE_TTLS``.
+
+Tokens are dropped when the change is saved, for the reads of the same
+transaction, and again once it commits. Hits and misses are counted per
+model or listing in each process.
+
+Concurrent misses of a key are coalesced so that the database is asked
+once. The first caller of a process fills the key while the others of
+the process wait for its value, and across processes the first caller
+takes a lock in the cache while the callers of other processes poll the
+cache for the value. Values are kept ``STALE_TTL`` seconds past their TTL
+and served stale while one caller fills them again. A caller waiting
+longer than ``WAIT_TIMEOUT`` fills the key itself.
+"""
+
+import hashlib
+import secrets
+import threading
+from collections import Counter
+from time import monotonic, sleep, time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TTL = 60 * 60
+STALE_TTL = 60
+LOCK_KEY = "fill:{key}"
+# Seconds a fill may hold the lock, for callers that die while filling
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.05
+VERSION_KEY = "object:{label}:{id}"
+ENTRY_KEY = "object:{label}:{id}:{version}"
+GENERATION_KEY = "list:{listing}:{scope}"
+PAGE_KEY = "list:{listing}:{scope}:{generation}:{params}"
+BATCH_SIZE = 1000
+
+_hits = Counter()
+_misses = Counter()
+_lock = threading.Lock()
+# Fills in progress in this process by key
+_fills = {}
+
+
+class Fill:
+    """A fill of a key by one thread, waited for by the others"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def get_or_fill(key, fill, ttl=TTL, label=""):
+    """
+    Return the cached value of a key, or fill it with the value returned
+    by ``fill``, once for the concurrent misses of the key. Errors raised
+    by ``fill`` are raised to the callers waiting for it, and nothing is
+    cached.
+    """
+
+    entry = cache.get(key)
+    stale = None
+    if entry is not None:
+        fresh_until, value = entry
+        if time() < fresh_until:
+            _count(_hits, label)
+            return value
+        stale = entry
+
+    with _lock:
+        current = _fills.get(key)
+        if current is None:
+            _fills[key] = current = Fill()
+            leader = True
+        else:
+            leader = False
+
+    if not leader:
+        _count(_hits, label)
+        if stale is not None:
+            return stale[1]
+        if current.done.wait(WAIT_TIMEOUT):
+            return current.result()
+        return fill()
+
+    try:
+        lock_key = LOCK_KEY.format(key=key)
+        token = secrets.token_hex(8)
+        if cache.add(lock_key, token, LOCK_TIMEOUT):
+            _count(_misses, label)
+            try:
+                current.value = _fill(key, fill, ttl)
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+        elif stale is not None:
+            # Being filled by another process
+            _count(_hits, label)
+            current.value = stale[1]
+        else:
+            current.value = _wait(key, fill, ttl, label)
+        return current.value
+    except Exception as error:
+        current.error = error
+        raise
+    finally:
+        with _lock:
+            del _fills[key]
+        current.done.set()
+
+
+def peek(key):
+    """Fresh cached value of a key, or None, without filling it"""
+
+    entry = cache.get(key)
+    if entry is not None and time() < entry[0]:
+        return entry[1]
+    return None
+
+
+def _fill(key, fill, ttl):
+    value = fill()
+    cache.set(key, (time() + ttl, value), ttl + STALE_TTL)
+    return value
+
+
+def _wait(key, fill, ttl, label):
+    """Wait for the fill of another process, or fill the key"""
+
+    deadline = monotonic() + WAIT_TIMEOUT
+    while monotonic() < deadline:
+        sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and time() < entry[0]:
+            _count(_hits, label)
+            return entry[1]
+    _count(_misses, label)
+    return _fill(key, fill, ttl)
+
+
+def object_key(model, object_id):
+    """Key of the current version of the representation of an object"""
+
+    model_label = label(model)
+    version = _token(VERSION_KEY.format(label=model_label, id=object_id))
+    return ENTRY_KEY.format(label=model_label, id=object_id, version=version)
+
+
+def get(model, object_id, load):
+    """
+    Return the cached representation of an object, or the one returned
+    by ``load``, which may raise ``DoesNotExist`` as missing objects are
+    not cached
+    """
+
+    return get_or_fill(
+        object_key(model, object_id), load, label=label(model)
+    )
+
+
+def invalidate(model, object_ids, using="default"):
+    """Drop the version tokens of the objects, now and on commit"""
+
+    model_label = label(model)
+    keys = [VERSION_KEY.format(label=model_label, id=i) for i in object_ids]
+    _drop(keys, using)
+
+
+def normalize_params(params):
+    """Query parameters sorted by name, values kept in order"""
+
+    return tuple(
+        sorted((name, tuple(params.getlist(name))) for name in params)
+    )
+
+
+def page_key(listing, params, scope=""):
+    """Key of a page of a listing in the current generation"""
+
+    generation = _token(GENERATION_KEY.format(listing=listing, scope=scope))
+    digest = hashlib.blake2b(
+        repr(normalize_params(params)).encode(), digest_size=16
+    )
+    return PAGE_KEY.format(
+        listing=listing,
+        scope=scope,
+        generation=generation,
+        params=digest.hexdigest(),
+    )
+
+
+def get_page(listing, params, fill, scope=""):
+    """Return the cached data of a page of a listing, or fill it"""
+
+    return get_or_fill(
+        page_key(listing, params, scope),
+        fill,
+        settings.LIST_CACHE_TTLS[listing],
+        f"list:{listing}",
+    )
+
+
+def bump(listing, scopes=("",), using="default"):
+    """Drop the generation tokens of a listing, now and on commit"""
+
+    keys = [
+        GENERATION_KEY.format(listing=listing, scope=scope) for scope in scopes
+    ]
+    _drop(keys, using)
+
+
+def stats():
+    """Hit and miss counts of each model in this process"""
+
+    with _lock:
+        labels = sorted(_hits.keys() | _misses.keys())
+        return {
+            model_label: {
+                "hits": _hits[model_label],
+                "misses": _misses[model_label],
+            }
+            for model_label in labels
+        }
+
+
+def reset_stats():
+    with _lock:
+        _hits.clear()
+        _misses.clear()
+
+
+def _token(key):
+    token = cache.get(key)
+    if token is None:
+        token = secrets.token_hex(8)
+        if not cache.add(key, token, None):
+            token = cache.get(key, token)
+    return token
+
+
+def _drop(keys, using):
+    def drop():
+        for start in range(0, len(keys), BATCH_SIZE):
+            cache.delete_many(keys[start:start + BATCH_SIZE])
+
+    drop()
+    transaction.on_commit(drop, using=using)
+
+
+def _count(counter, model_label):
+    with _lock:
+        counter[model_label] += 1
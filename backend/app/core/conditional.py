@@ -0,0 +1,199 @@
+"""
+Validators of the responses of the read endpoints, for conditional GETs.
+
+The ETag of a detail response is derived from the ``updated_at`` of the
+object and of its author, whose username it shows. The ETag of a list
+response is derived from the number of rows listed, their latest
+``updated_at`` and the latest ``updated_at`` of the users, so that a
+renamed author changes it too. The request path and query parameters
+are part of the list ETags, as pages of the same rows have different
+bodies.
+
+A request whose ``If-None-Match``, or ``If-Modified-Since`` without it,
+matches the validators gets a 304 without a body. Detail representations
+and listing pages are cached with their validators, so revalidating a
+cached response reads no table at all, and concurrent misses of the same
+response are filled once. Conditional requests missing the cache are
+checked against validators read first, so a 304 never serializes the
+object or builds the page.
+"""
+
+import hashlib
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+from core import caching
+
+
+def etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12)
+    # Weak, as renderers may encode the same representation differently
+    return f'W/"{digest.hexdigest()}"'
+
+
+def object_validators(instance, author=None):
+    """ETag and last modification time of an object"""
+
+    times = [instance.updated_at]
+    if author is not None:
+        times.append(author.updated_at)
+    return (
+        etag(instance._meta.label_lower, instance.pk, *times),
+        max(times),
+    )
+
+
+def collection_validators(request, queryset, authors=True):
+    """
+    ETag and last modification time of a list of the rows of a queryset,
+    including the changes of the users when ``authors`` is set
+    """
+
+    rows = queryset.order_by().aggregate(
+        count=Count("id"), updated_at=Max("updated_at")
+    )
+    times = [rows["updated_at"]]
+    if authors:
+        users = get_user_model().objects.using(queryset.db)
+        users = users.aggregate(updated_at=Max("updated_at"))
+        times.append(users["updated_at"])
+    times = [time for time in times if time is not None]
+    return (
+        etag(
+            request.path,
+            caching.normalize_params(request.query_params),
+            rows["count"],
+            *times,
+        ),
+        max(times, default=None),
+    )
+
+
+def is_conditional(request):
+    """Whether the request carries validators to revalidate against"""
+
+    return (
+        "HTTP_IF_NONE_MATCH" in request.META
+        or "HTTP_IF_MODIFIED_SINCE" in request.META
+    )
+
+
+def not_modified(request, validators):
+    """
+    Return the 304 response of a request whose conditional headers match
+    the validators, or None
+    """
+
+    tag, last_modified = validators
+    response = get_conditional_response(
+        request,
+        etag=tag,
+        last_modified=last_modified and int(last_modified.timestamp()),
+    )
+    if response is not None:
+        add_validators(response, validators)
+    return response
+
+
+def add_validators(response, validators):
+    """Set the validator headers of a successful response"""
+
+    successful = (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED)
+    if response.status_code in successful:
+        tag, last_modified = validators
+        response["ETag"] = tag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+class Uncached(Exception):
+    """Raised by fills with a response that must not be cached"""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
+def read_object(queryset, object_id):
+    """The object with its author, raising ``DoesNotExist`` when missing"""
+
+    return queryset.select_related("created_by").get(id=object_id)
+
+
+def detail_entry(queryset, object_id, serializer_class, instance=None):
+    """
+    Validators and representation of an object, read through the object
+    cache, from ``instance`` when it was already read. The object is read
+    with its author, and raises ``DoesNotExist`` when missing.
+    """
+
+    def load():
+        obj = instance or read_object(queryset, object_id)
+        validators = object_validators(obj, obj.created_by)
+        return validators, dict(serializer_class(obj).data)
+
+    return caching.get(queryset.model, object_id, load)
+
+
+def detail_response(request, queryset, object_id, serializer_class):
+    """Response of a detail view, 304 when the validators match"""
+
+    instance = None
+    key = caching.object_key(queryset.model, object_id)
+    if is_conditional(request) and caching.peek(key) is None:
+        # Revalidated before the object is serialized
+        instance = read_object(queryset, object_id)
+        validators = object_validators(instance, instance.created_by)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
+    validators, data = detail_entry(
+        queryset, object_id, serializer_class, instance
+    )
+    response = not_modified(request, validators)
+    if response is None:
+        response = Response(data, status=status.HTTP_200_OK)
+    return add_validators(response, validators)
+
+
+def list_response(request, listing, queryset, build, scope="", authors=True):
+    """
+    Response of a page of a listing of the rows of a queryset, read
+    through the listing cache, 304 when the validators match. ``build``
+    returns the response of the page, cached when successful.
+    """
+
+    validators = None
+    key = caching.page_key(listing, request.query_params, scope)
+    if is_conditional(request) and caching.peek(key) is None:
+        # Revalidated before the page is built
+        validators = collection_validators(request, queryset, authors)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
+    def fill():
+        page_validators = validators or collection_validators(
+            request, queryset, authors
+        )
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            raise Uncached(response)
+        return page_validators, response.data
+
+    try:
+        validators, data = caching.get_page(
+            listing, request.query_params, fill, scope
+        )
+    except Uncached as error:
+        return error.response
+
+    response = not_modified(request, validators)
+    if response is None:
+        response = Response(data, status=status.HTTP_200_OK)
+    return add_validators(response, validators)
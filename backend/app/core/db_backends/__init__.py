@@ -0,0 +1,291 @@
+"""
+Database connections kept in a bounded pool per process.
+
+Django opens a connection on the first query of a request, and closes it
+at the end of the request, or ``CONN_MAX_AGE`` seconds later. A backend
+of this package takes its connections from a pool instead, and gives
+them back when Django closes them, so that requests reuse connections
+without going through the connection handshake again. ``CONN_MAX_AGE``
+is better left at 0, so that connections go back to the pool at the end
+of each request instead of being held by a thread.
+
+The pool of a database opens at most ``SIZE`` connections, set under
+``POOL`` in its settings. Further checkouts wait for a connection to be
+given back, and fail with ``PoolTimeout`` after ``TIMEOUT`` seconds.
+Connections idle for ``PING_AFTER`` seconds are pinged before use, and
+those open for ``MAX_LIFETIME`` seconds are closed rather than reused.
+Connections given back within a transaction or after an error are
+closed too.
+
+Under ASGI, Django 4.1 runs the views in threads, so checkouts never
+wait on the event loop, and connections go back to the pool as
+threads close them.
+"""
+
+import threading
+from collections import Counter, deque
+from statistics import quantiles
+from time import monotonic
+from django.db import OperationalError
+from django.db.backends.base.base import NO_DB_ALIAS
+
+DEFAULTS = {
+    "SIZE": 10,
+    "TIMEOUT": 5.0,
+    "PING_AFTER": 1.0,
+    "MAX_LIFETIME": 1800.0,
+}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections"""
+
+    def __init__(self, size, timeout, ping_after, max_lifetime):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_lifetime = max_lifetime
+        self.condition = threading.Condition()
+        # (connection, opened at, given back at), the latest last
+        self.idle = deque()
+        # Opened at of the connections checked out, by id
+        self.in_use = {}
+        self.opened = 0
+        self.waiting = 0
+        self.closed = False
+        self.counts = Counter()
+        self.latencies = deque(maxlen=1000)
+
+    def checkout(self, connect):
+        """
+        Connection of the pool, opened with ``connect()`` when none is
+        idle, raising ``PoolTimeout`` when none is given back in time
+        """
+
+        start = monotonic()
+        with self.condition:
+            self.waiting += 1
+            try:
+                entry = self._wait(start + self.timeout)
+            finally:
+                self.waiting -= 1
+
+        if entry is not None:
+            connection, opened_at, returned_at = entry
+            now = monotonic()
+            if now - opened_at >= self.max_lifetime:
+                discarded = "recycled"
+            elif now - returned_at >= self.ping_after and not _ping(
+                connection
+            ):
+                discarded = "failed_pings"
+            else:
+                discarded = None
+            if discarded:
+                _close(connection)
+                with self.condition:
+                    self.counts[discarded] += 1
+                entry = None
+
+        if entry is None:
+            try:
+                connection, opened_at = connect(), monotonic()
+            except BaseException:
+                self._release()
+                raise
+
+        with self.condition:
+            self.in_use[id(connection)] = opened_at
+            self.counts["checkouts"] += 1
+            if entry is None:
+                self.counts["connects"] += 1
+            self.latencies.append(monotonic() - start)
+        return connection
+
+    def checkin(self, connection, reusable=True):
+        """Give a connection back, closing it unless ``reusable``"""
+
+        with self.condition:
+            opened_at = self.in_use.pop(id(connection), None)
+            if opened_at is None:
+                # Not checked out of this pool, e.g. of a closed one
+                reusable = False
+            elif (
+                reusable
+                and not self.closed
+                and monotonic() - opened_at < self.max_lifetime
+            ):
+                self.idle.append((connection, opened_at, monotonic()))
+                self.condition.notify()
+                return
+        if opened_at is not None:
+            self._release()
+        _close(connection)
+
+    def close(self):
+        """Close the idle connections, and the others once given back"""
+
+        with self.condition:
+            self.closed = True
+            idle = [entry[0] for entry in self.idle]
+            self.idle.clear()
+            self.opened -= len(idle)
+            self.condition.notify_all()
+        for connection in idle:
+            _close(connection)
+
+    def stats(self):
+        with self.condition:
+            latencies = [latency * 1000 for latency in self.latencies]
+            if len(latencies) > 1:
+                cuts = quantiles(latencies, n=100)
+            else:
+                cuts = (latencies or [0]) * 99
+            return {
+                "size": self.size,
+                "open": self.opened,
+                "in_use": len(self.in_use),
+                "idle": len(self.idle),
+                "waiting": self.waiting,
+                "checkouts": self.counts["checkouts"],
+                "connects": self.counts["connects"],
+                "timeouts": self.counts["timeouts"],
+                "failed_pings": self.counts["failed_pings"],
+                "recycled": self.counts["recycled"],
+                "checkout_ms": {
+                    "p50": round(cuts[49], 3),
+                    "p99": round(cuts[98], 3),
+                    "max": round(max(latencies, default=0), 3),
+                },
+            }
+
+    def _wait(self, deadline):
+        """
+        Idle connection entry, or None when one may be opened, with the
+        lock held
+        """
+
+        while True:
+            if self.idle:
+                return self.idle.pop()
+            if self.opened < self.size:
+                self.opened += 1
+                return None
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                self.counts["timeouts"] += 1
+                raise PoolTimeout(
+                    f"No database connection was free within {self.timeout}s"
+                    f" ({self.size} in use)"
+                )
+            self.condition.wait(remaining)
+
+    def _release(self):
+        """Free the place of a connection closed or never opened"""
+
+        with self.condition:
+            self.opened -= 1
+            self.condition.notify()
+
+
+def _ping(connection):
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Pool of the connections to the database of the settings"""
+
+    key = (
+        alias,
+        settings_dict["NAME"],
+        settings_dict["HOST"],
+        settings_dict["PORT"],
+        settings_dict["USER"],
+    )
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = {**DEFAULTS, **settings_dict.get("POOL", {})}
+            pool = _pools[key] = ConnectionPool(
+                options["SIZE"],
+                options["TIMEOUT"],
+                options["PING_AFTER"],
+                options["MAX_LIFETIME"],
+            )
+        return pool
+
+
+def stats():
+    """Stats of the pools of each database, by alias"""
+
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        f"{alias}:{name}": pool.stats() for (alias, name, *_), pool in pools
+    }
+
+
+def close_pools(name=None):
+    """Close the pools, or those of the database of the name"""
+
+    with _pools_lock:
+        keys = [key for key in _pools if name is None or key[1] == name]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapper:
+    """Mixin of a database wrapper taking its connections from a pool"""
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Connections to create or drop test databases
+            return super().get_new_connection(conn_params)
+
+        pool = get_pool(self.alias, self.settings_dict)
+        connection = pool.checkout(
+            lambda: super(PooledDatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        self._pool = pool
+        return connection
+
+    def _close(self):
+        pool = getattr(self, "_pool", None)
+        if self.connection is None or pool is None:
+            return super()._close()
+
+        self._pool = None
+        # Connections in a transaction or that may be broken are closed
+        reusable = not (
+            self.in_atomic_block
+            or self.needs_rollback
+            or self.errors_occurred
+            or self.autocommit != self.settings_dict["AUTOCOMMIT"]
+        )
+        pool.checkin(self.connection, reusable)
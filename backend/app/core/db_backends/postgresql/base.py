@@ -0,0 +1,15 @@
+from django.db.backends.postgresql import base, creation
+from core.db_backends import PooledDatabaseWrapper, close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle connections of the pool would keep the database in use
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapper, base.DatabaseWrapper):
+    """PostgreSQL database wrapper taking its connections from a pool"""
+
+    creation_class = DatabaseCreation
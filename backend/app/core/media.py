@@ -0,0 +1,232 @@
+"""
+Media files streamed by an ASGI application of their own.
+
+Served by Django, a download holds a thread for the whole transfer, so
+slow viewers of a video soon take every thread of a worker. ``MediaApp``
+answers the requests below ``settings.MEDIA_URL`` on the event loop
+instead, and passes the others to Django. A file is sent in chunks of
+``CHUNK_SIZE`` read with ``os.pread`` by a pool of
+``settings.MEDIA_READ_THREADS`` threads, the next chunk being read while
+the previous one is sent. Each chunk is only read once the server has
+taken the one before it, as ``send`` waits while the client is slow to
+read, so a slow download holds at most two chunks and no thread.
+
+Single byte ranges are answered with a 206, as browsers seek in videos
+with them. Other ranges are ignored, which HTTP allows, and ranges past
+the end of the file are answered with a 416. Ranges with an ``If-Range``
+other than the ``Last-Modified`` date of the file, e.g. an ETag as none
+is sent, are ignored too, so that a client resuming a file changed since
+gets it whole.
+"""
+
+import asyncio
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class MediaApp:
+    """ASGI application serving media files, and the others by ``app``"""
+
+    def __init__(self, app, root=None, prefix=None):
+        self.app = app
+        self.root = root or settings.MEDIA_ROOT
+        self.prefix = "/" + (prefix or settings.MEDIA_URL).strip("/") + "/"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(
+            self.prefix
+        ):
+            return await self.app(scope, receive, send)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            return await _respond(send, 405, [(b"allow", b"GET, HEAD")])
+
+        name = scope["path"][len(self.prefix):]
+        try:
+            path = safe_join(self.root, posixpath.normpath(name).lstrip("/"))
+            info = await asyncio.get_running_loop().run_in_executor(
+                get_executor(), os.stat, path
+            )
+        except (OSError, SuspiciousFileOperation, ValueError):
+            return await _respond(send, 404)
+        if not stat.S_ISREG(info.st_mode):
+            return await _respond(send, 404)
+
+        await _serve(scope, receive, send, path, info)
+
+
+async def _serve(scope, receive, send, path, info):
+    headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope["headers"]
+    }
+    if not was_modified_since(
+        headers.get("if-modified-since"), info.st_mtime
+    ):
+        return await _respond(send, 304)
+
+    last_modified = http_date(info.st_mtime)
+    content_type, encoding = mimetypes.guess_type(path)
+    response_headers = [
+        (b"content-type", (content_type or "application/octet-stream")),
+        (b"last-modified", last_modified),
+        (b"accept-ranges", "bytes"),
+    ]
+    if encoding:
+        response_headers.append((b"content-encoding", encoding))
+
+    size = info.st_size
+    status, start, length = 200, 0, size
+    byte_range = None
+    if if_range_matches(headers.get("if-range"), last_modified):
+        byte_range = parse_range(headers.get("range"), size)
+    if byte_range is False:
+        return await _respond(
+            send, 416, [(b"content-range", f"bytes */{size}".encode())]
+        )
+    if byte_range is not None:
+        start, end = byte_range
+        status, length = 206, end - start + 1
+        response_headers.append(
+            (b"content-range", f"bytes {start}-{end}/{size}")
+        )
+    response_headers.append((b"content-length", str(length)))
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (name, value.encode("latin-1"))
+                for name, value in response_headers
+            ],
+        }
+    )
+    if scope["method"] == "HEAD" or not length:
+        return await send({"type": "http.response.body"})
+
+    await stream(receive, send, path, start, length)
+
+
+def if_range_matches(header, last_modified):
+    """
+    Whether the ``If-Range`` header, when sent, is the ``Last-Modified``
+    date of the file, which it must be exactly
+    """
+
+    return header is None or header.strip() == last_modified
+
+
+def parse_range(header, size):
+    """
+    First and last byte of a single range of the ``Range`` header, None
+    to send the whole file, False when the range is past its end
+    """
+
+    match = RANGE.fullmatch((header or "").strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # The last bytes of the file
+        length = min(int(last), size)
+        if not length:
+            return False
+        return size - length, size - 1
+
+    first = int(first)
+    if first >= size:
+        return False
+    last = size - 1 if not last else min(int(last), size - 1)
+    if last < first:
+        return None
+    return first, last
+
+
+async def stream(receive, send, path, start, length):
+    """Send ``length`` bytes of the file from ``start``, a chunk at a time"""
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    fd = await loop.run_in_executor(executor, os.open, path, os.O_RDONLY)
+    disconnected = asyncio.ensure_future(_disconnect(receive))
+    pending = None
+    try:
+        offset, end = start, start + length
+
+        def read(offset):
+            size = min(CHUNK_SIZE, end - offset)
+            return loop.run_in_executor(executor, os.pread, fd, size, offset)
+
+        pending = read(offset)
+        while not disconnected.done():
+            chunk = await pending
+            pending = None
+            offset += len(chunk)
+            more = bool(chunk) and offset < end
+            if more:
+                # Read ahead while the chunk is sent
+                pending = read(offset)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": more,
+                }
+            )
+            if not more:
+                break
+    finally:
+        disconnected.cancel()
+        if pending is not None:
+            # The read cannot be cancelled in its thread, nor fd closed
+            # under it
+            await asyncio.wait([pending])
+        os.close(fd)
+
+
+async def _disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _respond(send, status, headers=()):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-length", b"0"), *headers],
+        }
+    )
+    await send({"type": "http.response.body"})
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.MEDIA_READ_THREADS, thread_name_prefix="media"
+            )
+        return _executor
@@ -108,15 +108,44 @@ class User(AbstractUser, PermissionsMixin):
     date_joined = models.DateTimeField(
         _("date joined"), auto_now_add=True, editable=False
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_("updated at"), auto_now=True, editable=False
+    )
 
     objects = UserManager()
 
     REQUIRED_FIELDS = ["first_name", "last_name", "email"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Latest change of any user, part of the list validators
+            models.Index(fields=["updated_at"], name="user_updated_at_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.username
 
 
+class TokenUser(User):
+    """
+    User built from the claims of an access token without reading its
+    row. The other fields are deferred, and all of them are read at once
+    the first time one is used.
+    """
+
+    # Claims of the access tokens, besides the id
+    CLAIMS = ("username", "is_staff")
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = deferred
+        super().refresh_from_db(using, fields)
+
+
 class Video(models.Model):
     """Model for videos."""
 
@@ -161,11 +190,28 @@ class Video(models.Model):
     created_at = models.DateTimeField(
         verbose_name=_("Uploaded at"), auto_now_add=True, editable=False
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_("updated at"), auto_now=True, editable=False
+    )
 
     class Meta:
         verbose_name = _("video")
         verbose_name_plural = _("videos")
         db_table = "video"
+        indexes = [
+            # Videos of a user, newest first, and their count
+            models.Index(
+                fields=["created_by", "-id"], name="video_created_by_id_idx"
+            ),
+            # Orderings of the video list, read forwards or backwards
+            models.Index(
+                fields=["created_at", "id"], name="video_created_at_id_idx"
+            ),
+            models.Index(fields=["likes", "id"], name="video_likes_id_idx"),
+            # Count and latest change of the list, from the index alone
+            models.Index(fields=["updated_at"], name="video_updated_at_idx"),
+            models.Index(fields=["title", "id"], name="video_title_id_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -196,11 +242,21 @@ class Comment(models.Model):
     created_at = models.DateTimeField(
         verbose_name=_("created at"), auto_now_add=True, editable=False
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_("updated at"), auto_now=True, editable=False
+    )
 
     class Meta:
         verbose_name = _("comment")
         verbose_name_plural = _("comments")
         db_table = "comment"
+        indexes = [
+            # Comments of a video in the order they were written
+            models.Index(
+                fields=["video", "created_at", "id"],
+                name="comment_video_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:20]
@@ -224,6 +280,9 @@ class VideoLike(models.Model):
         on_delete=models.CASCADE,
         related_query_name="video_like",
     )
+    created_at = models.DateTimeField(
+        verbose_name=_("created at"), auto_now_add=True, editable=False
+    )
 
     class Meta:
         verbose_name = _("video like")
@@ -235,6 +294,78 @@ class VideoLike(models.Model):
         return self.video.title
 
 
+class TrendingScore(models.Model):
+    """Model for the time-decayed trending score of videos."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    video = models.OneToOneField(
+        Video,
+        verbose_name=_("video"),
+        on_delete=models.CASCADE,
+        related_name="trending_score",
+    )
+    score = models.FloatField(verbose_name=_("score"))
+
+    class Meta:
+        verbose_name = _("trending score")
+        verbose_name_plural = _("trending scores")
+        db_table = "trending_score"
+        indexes = [
+            models.Index(
+                fields=["-score", "-video"], name="trending_score_rank_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.video.title
+
+
+class TrendingCheckpoint(models.Model):
+    """Model for the last event of each source counted in the scores."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    source = models.CharField(
+        verbose_name=_("source"), max_length=50, unique=True
+    )
+    last_id = models.BigIntegerField(verbose_name=_("last id"), default=0)
+    # [id, timestamp first missed] of the ids below last_id not counted yet
+    gaps = models.JSONField(verbose_name=_("gaps"), default=list)
+
+    class Meta:
+        verbose_name = _("trending checkpoint")
+        verbose_name_plural = _("trending checkpoints")
+        db_table = "trending_checkpoint"
+
+    def __str__(self) -> str:
+        return self.source
+
+
+class Tag(models.Model):
+    """Model for the dictionary of tag names."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    name = models.CharField(
+        verbose_name=_("name"),
+        max_length=50,
+        unique=True,
+        validators=[RegexValidator(r"^[a-zA-Z0-9_]+$")],
+    )
+
+    class Meta:
+        verbose_name = _("tag")
+        verbose_name_plural = _("tags")
+        db_table = "tag"
+
+    def __str__(self) -> str:
+        return self.name
+
+
 class VideoTag(models.Model):
     """Model for tags attached to videos."""
 
@@ -247,10 +378,14 @@ class VideoTag(models.Model):
         on_delete=models.CASCADE,
         related_query_name="video_tag",
     )
-    tag = models.CharField(
+    tag = models.ForeignKey(
+        Tag,
         verbose_name=_("tag"),
-        max_length=50,
-        validators=[RegexValidator(r"^[a-zA-Z0-9_]+$")],
+        on_delete=models.CASCADE,
+        related_query_name="video_tag",
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_("created at"), auto_now_add=True
     )
 
     class Meta:
@@ -258,6 +393,133 @@ class VideoTag(models.Model):
         verbose_name_plural = _("video tags")
         db_table = "video_tag"
         unique_together = ("video", "tag")
+        indexes = [
+            models.Index(
+                fields=["tag", "video"], name="video_tag_tag_video_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.video.title
+
+
+class TagUsage(models.Model):
+    """Model for the number of videos tagged with each tag."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    tag = models.OneToOneField(
+        Tag,
+        verbose_name=_("tag"),
+        on_delete=models.CASCADE,
+        related_name="usage",
+    )
+    count = models.IntegerField(verbose_name=_("count"), default=0)
+
+    class Meta:
+        verbose_name = _("tag usage")
+        verbose_name_plural = _("tag usages")
+        db_table = "tag_usage"
+        indexes = [
+            # Most used tags, without the tags no longer used
+            models.Index(
+                fields=["-count", "tag"],
+                name="tag_usage_count_idx",
+                condition=models.Q(count__gt=0),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.tag.name
+
+
+class TagUsageDaily(models.Model):
+    """Model for the number of videos tagged with each tag per day."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    tag = models.ForeignKey(
+        Tag,
+        verbose_name=_("tag"),
+        on_delete=models.CASCADE,
+        related_query_name="daily_usage",
+    )
+    day = models.DateField(verbose_name=_("day"))
+    count = models.IntegerField(verbose_name=_("count"), default=0)
+
+    class Meta:
+        verbose_name = _("daily tag usage")
+        verbose_name_plural = _("daily tag usages")
+        db_table = "tag_usage_daily"
+        unique_together = ("tag", "day")
+        indexes = [
+            # Covers the sums of the last days, including count on
+            # PostgreSQL
+            models.Index(
+                fields=["day", "tag"],
+                name="tag_usage_daily_day_idx",
+                include=["count"],
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.tag.name} {self.day}"
+
+
+class RelatedVideo(models.Model):
+    """Model for the videos most similar to each video by tags."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    video = models.ForeignKey(
+        Video,
+        verbose_name=_("video"),
+        on_delete=models.CASCADE,
+        related_name="related_videos",
+    )
+    related = models.ForeignKey(
+        Video,
+        verbose_name=_("related video"),
+        on_delete=models.CASCADE,
+        related_name="related_from",
+    )
+    score = models.FloatField(verbose_name=_("score"))
+
+    class Meta:
+        verbose_name = _("related video")
+        verbose_name_plural = _("related videos")
+        db_table = "related_video"
+        unique_together = ("video", "related")
+        indexes = [
+            models.Index(
+                fields=["video", "-score"], name="related_video_score_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.related.title
+
+
+class RelatedVideoQueue(models.Model):
+    """Model for the videos whose related videos are out of date."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    video = models.OneToOneField(
+        Video,
+        verbose_name=_("video"),
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    class Meta:
+        verbose_name = _("related video queue entry")
+        verbose_name_plural = _("related video queue")
+        db_table = "related_video_queue"
 
     def __str__(self) -> str:
         return self.video.title
@@ -310,6 +572,18 @@ class CommentReply(models.Model):
     created_at = models.DateTimeField(
         verbose_name=_("Replied at"), auto_now_add=True, editable=False
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_("updated at"), auto_now=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            # Replies to a comment in the order they were written
+            models.Index(
+                fields=["comment", "created_at", "id"],
+                name="reply_comment_created_idx",
+            ),
+        ]
 
 
 class ReplyLike(models.Model):
@@ -334,3 +608,30 @@ class ReplyLike(models.Model):
 
     def __str__(self) -> str:
         return self.reply.created_by.username
+
+
+class RevokedToken(models.Model):
+    """Model for the refresh tokens revoked before they expire."""
+
+    id = models.BigAutoField(
+        verbose_name=_("id"), primary_key=True, unique=True, editable=False
+    )
+    jti = models.CharField(verbose_name=_("jti"), max_length=255, unique=True)
+    expires_at = models.DateTimeField(verbose_name=_("expires at"))
+    revoked_at = models.DateTimeField(
+        verbose_name=_("revoked at"), auto_now_add=True, editable=False
+    )
+
+    class Meta:
+        verbose_name = _("revoked token")
+        verbose_name_plural = _("revoked tokens")
+        db_table = "revoked_token"
+        indexes = [
+            # Loading the filter and pruning skip the expired tokens
+            models.Index(
+                fields=["expires_at"], name="revoked_token_expires_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.jti
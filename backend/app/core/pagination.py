@@ -0,0 +1,77 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over an ordering that ends in a unique key.
+
+    The cursor is the sort key of the last row of the previous page, so
+    fetching a page is an index range scan of ``page_size`` rows whatever
+    the depth of the page, and there is no ``COUNT(*)``.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_cursor(self, request, *types):
+        """
+        Return the decoded sort key of the cursor or None, checking each
+        of its values is an instance of the matching type
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            key = json.loads(urlsafe_b64decode(encoded + padding))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(key, list) or len(key) != len(types):
+            raise NotFound(self.invalid_cursor_message)
+        for value, type in zip(key, types):
+            if not isinstance(value, type) or isinstance(value, bool):
+                raise NotFound(self.invalid_cursor_message)
+        return key
+
+    def encode_cursor(self, key):
+        data = json.dumps(list(key), separators=(",", ":")).encode()
+        return urlsafe_b64encode(data).decode().rstrip("=")
+
+    def paginate(self, rows, request, get_key):
+        """
+        Trim rows fetched with a limit of ``page_size + 1`` to a page and
+        remember the key of its last row for the next link.
+        """
+
+        self.request = request
+        self.next_key = None
+        rows = list(rows)
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            self.next_key = get_key(rows[-1])
+        return rows
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_key)
+        )
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": None,
+            "results": data,
+        }
@@ -0,0 +1,196 @@
+import json
+import re
+import secrets
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """
+    Encode plain JSON types (str, int, float, bool, None, list and dict)
+    to compact UTF-8 bytes, e.g. one line of an NDJSON stream, as
+    ``FastJSONRenderer`` encodes them: with orjson only when it writes the
+    data like the stdlib encoder.
+    """
+
+    if orjson is not None and _floats_match(data):
+        try:
+            return orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=renderers.SHORT_SEPARATORS,
+    ).encode()
+
+
+class Fragment:
+    """
+    Already encoded JSON value, e.g. a cached representation of a video.
+
+    Fragments can be placed anywhere in the data passed to a response and
+    are spliced into the rendered output as-is, without being decoded and
+    encoded again.
+    """
+
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        if isinstance(content, str):
+            content = content.encode()
+        self.content = content
+
+    def __eq__(self, other):
+        return isinstance(other, Fragment) and self.content == other.content
+
+    def __repr__(self):
+        return f"Fragment({self.content!r})"
+
+
+class FragmentEncoder(encoders.JSONEncoder):
+    """
+    Encoder writing fragments as placeholders made of the marker and the
+    index of their content in ``fragments``
+    """
+
+    def __init__(self, *args, fragments, marker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = fragments
+        self.marker = marker
+
+    def default(self, obj):
+        if isinstance(obj, Fragment):
+            self.fragments.append(obj.content)
+            return f"{self.marker}{len(self.fragments) - 1}"
+        return super().default(obj)
+
+
+_SCALARS = frozenset((str, int, bool, type(None)))
+
+
+def _float_matches(value):
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def _floats_match(data):
+    """
+    Whether orjson writes the floats of the data like the stdlib: finite
+    and written without exponent, i.e. zero or between 1e-4 and 1e16
+    """
+
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, (list, tuple)):
+            if isinstance(value, float) and not _float_matches(value):
+                return False
+            continue
+        for item in value:
+            # Skip plain values without a call, the bulk of the data
+            if type(item) in _SCALARS:
+                continue
+            if type(item) is float:
+                if not _float_matches(item):
+                    return False
+            else:
+                stack.append(item)
+    return True
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer that encodes with orjson when it is installed and falls
+    back to the stdlib encoder of ``JSONRenderer`` otherwise.
+
+    The orjson path is only taken when its output is byte-identical to
+    the stdlib one: compact, non-ASCII-escaped output without indentation.
+    Anything orjson refuses to encode (e.g. integers wider than 64 bits or
+    non-string keys) is rendered again with the stdlib encoder, as are
+    data with floats orjson writes differently: ``1e16`` for ``1e+16``,
+    ``0.0000999`` for ``9.99e-05`` and ``null`` for NaN, which the stdlib
+    rejects.
+    """
+
+    encoder_class = FragmentEncoder
+
+    orjson_options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson
+        else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, Fragment):
+            return data.content
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        fragments = []
+        marker = f"__fragment_{secrets.token_hex(8)}_"
+
+        ret = None
+        if self._use_orjson(indent) and _floats_match(data):
+            encoder = self.encoder_class(fragments=fragments, marker=marker)
+
+            def default(obj):
+                value = encoder.default(obj)
+                if not _floats_match(value):
+                    raise TypeError("Float written differently by orjson")
+                return value
+
+            try:
+                ret = orjson.dumps(
+                    data, default=default, option=self.orjson_options
+                )
+            except orjson.JSONEncodeError:
+                fragments.clear()
+
+        if ret is None:
+            ret = json.dumps(
+                data,
+                cls=self.encoder_class,
+                fragments=fragments,
+                marker=marker,
+                indent=indent,
+                ensure_ascii=self.ensure_ascii,
+                allow_nan=not self.strict,
+                separators=self._get_separators(indent),
+            ).encode()
+
+        # Same escaping of \u2028 and \u2029 as JSONRenderer
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+        if fragments:
+            pattern = re.compile(rf'"{marker}(\d+)"'.encode())
+            ret = pattern.sub(lambda m: fragments[int(m.group(1))], ret)
+        return ret
+
+    def _use_orjson(self, indent):
+        return (
+            orjson is not None
+            and indent is None
+            and self.compact
+            and not self.ensure_ascii
+        )
+
+    def _get_separators(self, indent):
+        if indent is not None:
+            return renderers.INDENT_SEPARATORS
+        if self.compact:
+            return renderers.SHORT_SEPARATORS
+        return renderers.LONG_SEPARATORS
@@ -0,0 +1,209 @@
+"""
+Revocation of refresh tokens.
+
+The ``jti`` of each revoked token is stored in the revoked token table
+until the token expires. Each process keeps a Bloom filter of the
+revoked ``jti``s, so that refreshing a token that was not revoked, by far
+the most common case, reads no table. Only ``jti``s found in the filter,
+revoked or false positives, are looked up in the table.
+
+Revoking a token changes a generation token in the cache, and processes
+rebuild their filter from the table when they see a new generation, so
+revocations by other processes are honored as soon as the cache shows
+them. Filters are also rebuilt every ``rebuild_interval`` seconds to
+drop the expired tokens. Revocations are rare next to refreshes, so each
+one rebuilds the filters rather than being added to them. One thread of
+a process rebuilds its filter while the others wait for it.
+
+The generation is stored without expiry, but may still be evicted, and
+with it the generation of revocations not seen yet. A missing generation
+is replaced by a new one, so that every process rebuilds its filter, and
+filters are rebuilt on every refresh while the cache keeps none.
+"""
+
+import hashlib
+import math
+import secrets
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from time import monotonic
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.settings import api_settings
+from core import models
+
+GENERATION_KEY = "revocation:generation"
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with no false negatives and
+    false positives at a rate of about ``error_rate`` at ``capacity``
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        # Odd, so that the positions do not repeat
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [
+            (first + i * second) % self.size for i in range(self.hash_count)
+        ]
+
+
+class RevocationFilter:
+    """Bloom filter of the ``jti``s of the tokens revoked and not expired"""
+
+    rebuild_interval = 600
+    error_rate = 0.01
+    min_capacity = 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rebuild_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = Counter()
+            self.filter = None
+            self.generation = None
+            self.built_at = None
+            self.tokens = 0
+
+    def might_be_revoked(self, jti):
+        self._ensure_fresh()
+        with self.lock:
+            found = jti in self.filter
+            self.counts["hits" if found else "misses"] += 1
+        return found
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.counts["hits"],
+                "misses": self.counts["misses"],
+                "false_positives": self.counts["false_positives"],
+                "rebuilds": self.counts["rebuilds"],
+                "tokens": self.tokens,
+            }
+
+    def _ensure_fresh(self):
+        if not self._stale(_generation(), monotonic()):
+            return
+        with self.rebuild_lock:
+            # Rebuilt by another thread while waiting for the lock
+            generation = _generation()
+            now = monotonic()
+            if self._stale(generation, now):
+                self._rebuild(generation, now)
+
+    def _stale(self, generation, now):
+        with self.lock:
+            return (
+                self.built_at is None
+                or generation is None
+                or generation != self.generation
+                or now - self.built_at > self.rebuild_interval
+            )
+
+    def _rebuild(self, generation, now):
+        tokens = models.RevokedToken.objects.filter(
+            expires_at__gt=django_timezone.now()
+        )
+        jtis = list(tokens.values_list("jti", flat=True))
+        capacity = max(len(jtis), self.min_capacity)
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self.lock:
+            self.filter = bloom
+            self.generation = generation
+            self.built_at = now
+            self.tokens = len(jtis)
+            self.counts["rebuilds"] += 1
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Evicted, maybe along with revocations not seen yet
+        cache.add(GENERATION_KEY, secrets.token_hex(8), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+_filter = RevocationFilter()
+
+
+def get_filter():
+    return _filter
+
+
+def is_revoked(jti):
+    """Whether the token with the ``jti`` was revoked"""
+
+    if not _filter.might_be_revoked(jti):
+        return False
+    revoked = models.RevokedToken.objects.filter(jti=jti).exists()
+    if not revoked:
+        with _filter.lock:
+            _filter.counts["false_positives"] += 1
+    return revoked
+
+
+def revoke(token, using="default"):
+    """
+    Revoke a refresh token until it expires. The filters are rebuilt from
+    the signal of the new row.
+    """
+
+    tokens = models.RevokedToken.objects.using(using)
+    tokens.get_or_create(
+        jti=token[api_settings.JTI_CLAIM],
+        defaults={
+            "expires_at": datetime.fromtimestamp(token["exp"], timezone.utc)
+        },
+    )
+
+
+def bump(using="default"):
+    """New generation of the revoked tokens, now and on commit"""
+
+    def new_generation():
+        cache.set(GENERATION_KEY, secrets.token_hex(8), None)
+
+    new_generation()
+    transaction.on_commit(new_generation, using=using)
+
+
+def prune(using="default"):
+    """
+    Delete the expired tokens, returning their number. Expired tokens are
+    rejected anyway, so the filters are not rebuilt.
+    """
+
+    tokens = models.RevokedToken.objects.using(using)
+    tokens = tokens.filter(expires_at__lte=django_timezone.now())
+    deleted, _ = tokens.delete()
+    return deleted
@@ -0,0 +1,98 @@
+from operator import itemgetter
+
+
+def format_datetime(value):
+    """
+    Format a datetime as "%Y-%m-%d %H:%M:%S" without going through
+    strftime, which is the slowest part of rendering a row.
+    """
+
+    if value is None:
+        return None
+    return "%04d-%02d-%02d %02d:%02d:%02d" % (
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+    )
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for list responses.
+
+    Rows are plain tuples coming from ``values_list()`` instead of model
+    instances, so there is no model instantiation, no per-field
+    ``to_representation`` dispatch and no lazy loading of relations.
+    Subclasses declare ``fields`` as ``(name, source)`` or
+    ``(name, source, formatter)`` entries where:
+
+    - ``source`` is an ORM lookup or a tuple of lookups
+    - ``formatter`` is a callable taking the looked up values, or a
+      ``str.format`` template such as ``"/media/{}/videos/{}"``
+
+    The accessors are resolved once per class, when it is defined.
+    """
+
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        lookups = []
+        accessors = []
+        for field in cls.fields:
+            name, source = field[0], field[1]
+            formatter = field[2] if len(field) > 2 else None
+
+            sources = (source,) if isinstance(source, str) else source
+            for lookup in sources:
+                if lookup not in lookups:
+                    lookups.append(lookup)
+            getter = itemgetter(*[lookups.index(s) for s in sources])
+
+            if isinstance(formatter, str):
+                accessors.append(
+                    (name, _template(getter, formatter, len(sources)))
+                )
+            elif formatter is not None:
+                accessors.append((name, _compose(getter, formatter)))
+            else:
+                accessors.append((name, getter))
+
+        cls.lookups = tuple(lookups)
+        cls.accessors = tuple(accessors)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def rows_for(cls, queryset):
+        """Return the ``values_list()`` queryset this serializer reads"""
+
+        return queryset.values_list(*cls.lookups)
+
+    @classmethod
+    def to_representation(cls, row):
+        return {name: accessor(row) for name, accessor in cls.accessors}
+
+    @property
+    def data(self):
+        accessors = self.accessors
+        return [
+            {name: accessor(row) for name, accessor in accessors}
+            for row in self.rows
+        ]
+
+
+def _template(getter, template, arity):
+    fmt = template.format
+    if arity == 1:
+        return lambda row: fmt(getter(row))
+    return lambda row: fmt(*getter(row))
+
+
+def _compose(getter, formatter):
+    return lambda row: formatter(getter(row))
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import authentication, caching, models, revocation, tags
+
+# Models whose detail representations are cached, with their author
+CACHED_MODELS = (models.Video, models.Comment, models.CommentReply)
+
+
+@receiver(post_delete, sender=models.Tag)
+def forget_tag(sender, instance, **kwargs):
+    tags.forget(instance.name)
+
+
+@receiver(post_save, sender=models.Video)
+@receiver(post_delete, sender=models.Video)
+@receiver(post_save, sender=models.Comment)
+@receiver(post_delete, sender=models.Comment)
+@receiver(post_save, sender=models.CommentReply)
+@receiver(post_delete, sender=models.CommentReply)
+def invalidate_object(sender, instance, using=None, **kwargs):
+    """Also called when likes change, as they are saved on the object"""
+
+    caching.invalidate(sender, [instance.id], using)
+
+
+@receiver(post_save, sender=models.Video)
+@receiver(post_delete, sender=models.Video)
+def bump_video_listings(sender, instance, using=None, **kwargs):
+    caching.bump("videos", using=using)
+    caching.bump("user-videos", [instance.created_by_id], using)
+
+
+# Saved through the token user of a request, which is a proxy
+@receiver(post_save, sender=get_user_model())
+@receiver(post_save, sender=models.TokenUser)
+def invalidate_authored(
+    sender, instance, created, update_fields=None, using=None, **kwargs
+):
+    """Drop the cached objects and listings showing the username"""
+
+    if created:
+        return
+    if update_fields is not None and "username" not in update_fields:
+        return
+    for model in CACHED_MODELS:
+        ids = model.objects.using(using).filter(created_by=instance)
+        ids = list(ids.values_list("id", flat=True))
+        caching.invalidate(model, ids, using)
+    caching.bump("videos", using=using)
+    caching.bump("user-videos", [instance.id], using)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_save, sender=models.TokenUser)
+@receiver(post_delete, sender=models.TokenUser)
+def forget_user(sender, instance, using=None, **kwargs):
+    authentication.forget(instance.id, using)
+
+
+@receiver(post_save, sender=models.RevokedToken)
+def bump_revocations(sender, using=None, **kwargs):
+    revocation.bump(using)
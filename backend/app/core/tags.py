@@ -0,0 +1,77 @@
+"""
+Lookups between tag names and the integer ids of the tag dictionary.
+
+Tag names never change once created, so the name to id mapping is cached
+in process. Ids are only cached once the transaction that read or created
+them has committed, so a rolled back tag never ends up in the cache.
+"""
+
+import threading
+from django.db import connections, transaction
+from core import models
+
+MAX_CACHED = 100_000
+
+_ids = {}
+_lock = threading.Lock()
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def get_ids(names, create=False, using="default"):
+    """
+    Return a dict mapping the normalized form of each name to its tag id.
+    Unknown names are left out, or created when ``create`` is set.
+    """
+
+    names = {normalize(name) for name in names}
+    ids = {name: _ids[name] for name in names if name in _ids}
+
+    missing = names - ids.keys()
+    if missing:
+        tags = models.Tag.objects.using(using)
+        found = dict(tags.filter(name__in=missing).values_list("name", "id"))
+        if create and len(found) < len(missing):
+            found.update(_create(missing - found.keys(), using))
+        ids.update(found)
+        _remember(found, using)
+
+    return ids
+
+
+def get_id(name, create=False, using="default"):
+    return get_ids([name], create=create, using=using).get(normalize(name))
+
+
+def forget(name):
+    with _lock:
+        _ids.pop(name, None)
+
+
+def clear():
+    with _lock:
+        _ids.clear()
+
+
+def _create(names, using):
+    tags = models.Tag.objects.using(using)
+    # Names created concurrently are skipped and found by the lookup below
+    tags.bulk_create(
+        [models.Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(tags.filter(name__in=names).values_list("name", "id"))
+
+
+def _remember(ids, using):
+    def remember():
+        with _lock:
+            if len(_ids) + len(ids) > MAX_CACHED:
+                _ids.clear()
+            _ids.update(ids)
+
+    if connections[using].in_atomic_block:
+        transaction.on_commit(remember, using=using)
+    else:
+        remember()
@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from core import models
+from user import logins
+from user.serializers import PairTokenSerializer
+
+
+class TokenUserAuthenticationTests(APITestCase):
+    """Test requests are authenticated from the access token claims"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.authenticate(PairTokenSerializer.get_token(self.user))
+
+    def tearDown(self):
+        logins.reset()
+
+    def authenticate(self, token):
+        access = getattr(token, "access_token", token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_claims(self):
+        """Test issued access tokens carry the token user claims"""
+        res = self.client.post(
+            reverse("user:pair-token"),
+            {"username": "testuser", "password": "testpass"},
+        )
+
+        token = AccessToken(res.data["access"])
+        self.assertEqual(token["username"], "testuser")
+        self.assertTrue(token["is_staff"])
+
+    def test_user_not_read(self):
+        """Test the user is not read by views using only the claims"""
+        url = reverse("core:cache-stats")
+        self.client.get(url)
+
+        # The active state is cached
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_user_read_once(self):
+        """Test the other fields are read at once when first used"""
+        self.client.get(reverse("core:cache-stats"))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("user:profile"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        attributes = res.data["attributes"]
+        self.assertEqual(attributes["email"], "testuser@example.com")
+
+    def test_writes(self):
+        """Test token users are saved and referenced like users"""
+        video = models.Video.objects.create(
+            title="Test Video",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        video_url = reverse("video:detail", args=[video.id])
+        self.client.get(video_url)
+
+        res = self.client.post(
+            reverse("video:comment", args=[video.id]),
+            {"text": "Comment"},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created_by"], "testuser")
+
+        res = self.client.patch(
+            reverse("user:profile"),
+            {"attributes": {"username": "renamed"}},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # The cached video showing the username was dropped
+        res = self.client.get(video_url)
+        self.assertEqual(res.data["created_by"], "renamed")
+
+    def test_deactivated(self):
+        """Test deactivated and deleted users are rejected at once"""
+        url = reverse("user:profile")
+        self.client.get(url)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.delete()
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_without_claims(self):
+        """Test tokens issued without the claims read the user"""
+        self.authenticate(AccessToken.for_user(self.user))
+
+        res = self.client.get(reverse("user:profile"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["attributes"]["username"], "testuser")
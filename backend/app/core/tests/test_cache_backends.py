@@ -0,0 +1,163 @@
+import secrets
+import threading
+from time import time
+from unittest import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from core import cache_backends
+from core.cache_backends import TieredCache
+
+
+class Pickled:
+    """Value counting the times it is pickled"""
+
+    count = 0
+
+    def __reduce__(self):
+        Pickled.count += 1
+        return Pickled, ()
+
+
+def tiered_cache(**options):
+    """A tiered cache of its own, as used by another process"""
+
+    return TieredCache(
+        secrets.token_hex(8), {"OPTIONS": {"SHARED": "shared", **options}}
+    )
+
+
+class TieredCacheTests(SimpleTestCase):
+    """Test the in-process tier in front of the shared cache"""
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.cache = tiered_cache(LOCAL_TTL=60)
+        self.other = tiered_cache(LOCAL_TTL=0)
+
+    def test_local_hits(self):
+        """Test values are read from the shared cache once per process"""
+        self.cache.set("key", {"a": 1})
+
+        self.assertEqual(self.cache.get("key"), {"a": 1})
+        self.assertEqual(self.other.get("key"), {"a": 1})
+        self.assertEqual(self.other.get("key"), {"a": 1})
+        self.assertIsNone(self.other.get("missing"))
+
+        self.assertEqual(self.cache.stats()["local_hits"], 1)
+        stats = self.other.stats()
+        self.assertEqual(stats["shared_hits"], 1)
+        self.assertEqual(stats["revalidated_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertAlmostEqual(stats["local_hit_ratio"], 1 / 3)
+
+    def test_changes_of_other_processes(self):
+        """Test values changed or deleted elsewhere are read again"""
+        self.other.set("key", 1)
+        self.cache.set("key", 2)
+        self.assertEqual(self.other.get("key"), 2)
+
+        self.cache.delete("key")
+        self.assertIsNone(self.other.get("key"))
+
+    def test_local_ttl(self):
+        """Test stamps are only checked once the local TTL has passed"""
+        self.cache.set("key", 1)
+        self.other.set("key", 2)
+        self.assertEqual(self.cache.get("key"), 1)
+
+        later = cache_backends.monotonic() + 61
+        with mock.patch.object(cache_backends, "monotonic", lambda: later):
+            self.assertEqual(self.cache.get("key"), 2)
+
+    def test_threads_share_local_tier(self):
+        """Test values set by a thread are local hits of the others"""
+        cache = caches["default"]
+        cache.clear()
+        self.addCleanup(cache.clear)
+        others = []
+
+        def set_value():
+            others.append(caches["default"])
+            caches["default"].set("key", {"a": 1})
+
+        thread = threading.Thread(target=set_value)
+        thread.start()
+        thread.join()
+        cache.reset_stats()
+
+        self.assertIsNot(others[0], cache)
+        self.assertEqual(cache.get("key"), {"a": 1})
+        self.assertEqual(cache.stats()["local_hits"], 1)
+        self.assertEqual(cache.stats()["local_entries"], 1)
+
+    def test_add(self):
+        """Test add only sets missing keys, in both tiers"""
+        self.assertTrue(self.cache.add("key", 1))
+        self.assertFalse(self.other.add("key", 2))
+
+        self.assertEqual(self.cache.get("key"), 1)
+        self.assertEqual(self.other.get("key"), 1)
+
+    def test_size_bound(self):
+        """Test the local tier evicts the least recently used values"""
+        cache = tiered_cache(MAX_SIZE=16 * 1024)
+        value = "x" * 900
+        for i in range(20):
+            cache.set(f"key{i}", value)
+            cache.get("key0")
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["local_size"], 16 * 1024)
+        self.assertLess(stats["local_entries"], 20)
+        self.assertEqual(stats["local_hits"], 20)
+
+        self.assertEqual(cache.get("key1"), value)
+        self.assertEqual(cache.stats()["shared_hits"], 1)
+
+    def test_pickled_once(self):
+        """Test values are pickled once, and sized from their pickle"""
+        Pickled.count = 0
+        self.cache.set("key", [Pickled(), "x" * 100])
+        self.assertIsInstance(self.other.get("key")[0], Pickled)
+
+        self.assertEqual(Pickled.count, 1)
+        self.assertEqual(
+            self.other.stats()["local_size"],
+            self.cache.stats()["local_size"],
+        )
+        self.assertGreater(self.cache.stats()["local_size"], 100)
+
+    def test_large_values_not_local(self):
+        """Test values too large for the local tier are only shared"""
+        cache = tiered_cache(MAX_SIZE=16 * 1024)
+        cache.set("key", "x" * 2048)
+
+        self.assertEqual(cache.get("key"), "x" * 2048)
+        self.assertEqual(cache.stats()["local_entries"], 0)
+
+    def test_timeout_jitter(self):
+        """Test timeouts are shortened by up to the jitter"""
+        cache = tiered_cache(JITTER=0.5)
+        start = time()
+        for i in range(20):
+            cache.set(f"key{i}", i, 100)
+
+        expiries = [
+            caches["shared"].get(cache.make_key(f"key{i}"))[2] - start
+            for i in range(20)
+        ]
+        self.assertTrue(all(50 <= expiry <= 101 for expiry in expiries))
+        self.assertGreater(len(set(expiries)), 1)
+
+    def test_expired(self):
+        """Test expired values are not served by the local tier"""
+        self.cache.set("key", 1, 0)
+        self.assertIsNone(self.cache.get("key"))
+
+        self.cache.set("key", 1, 10)
+        later = cache_backends.monotonic() + 11
+        with mock.patch.object(cache_backends, "monotonic", lambda: later):
+            self.cache.get("key")
+
+        # Read again from the shared cache, whose clock did not move
+        self.assertEqual(self.cache.stats()["shared_hits"], 1)
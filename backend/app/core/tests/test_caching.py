@@ -0,0 +1,384 @@
+import threading
+from time import sleep, time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from core import caching, models
+
+
+class ObjectCacheTests(APITestCase):
+    """Test the detail views are served from the object cache"""
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        self.comment = models.Comment.objects.create(
+            video=self.video, created_by=self.user, text="Test comment"
+        )
+        self.reply = models.CommentReply.objects.create(
+            comment=self.comment, created_by=self.user, text="Test reply"
+        )
+        self.urls = [
+            reverse("video:detail", args=[self.video.id]),
+            reverse("comment:detail", args=[self.comment.id]),
+            reverse("reply:detail", args=[self.reply.id]),
+        ]
+
+    def test_cached_reads(self):
+        """Test a second read does not query the database"""
+        for url in self.urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.data, first.data)
+
+        self.assertEqual(
+            caching.stats(),
+            {
+                "core.comment": {"hits": 1, "misses": 1},
+                "core.commentreply": {"hits": 1, "misses": 1},
+                "core.video": {"hits": 1, "misses": 1},
+            },
+        )
+
+    def test_invalidated_on_update(self):
+        """Test updates are visible on the next read"""
+        self.client.get(self.urls[0])
+        self.client.patch(self.urls[0], {"title": "New Title"})
+
+        res = self.client.get(self.urls[0])
+
+        self.assertEqual(res.data["title"], "New Title")
+
+    def test_invalidated_on_like(self):
+        """Test like counts are visible on the next read"""
+        other = get_user_model().objects.create(
+            first_name="Other",
+            last_name="User",
+            username="otheruser",
+            email="otheruser@example.com",
+            password="testpass",
+        )
+        self.client.get(self.urls[0])
+        self.client.get(self.urls[1])
+        self.client.force_authenticate(user=other)
+        self.client.post(reverse("video:like", args=[self.video.id]))
+        self.client.post(reverse("comment:like", args=[self.comment.id]))
+
+        self.assertEqual(self.client.get(self.urls[0]).data["likes"], 1)
+        self.assertEqual(self.client.get(self.urls[1]).data["likes"], 1)
+
+    def test_invalidated_on_username_change(self):
+        """Test a new username of the author is visible on the next read"""
+        for url in self.urls:
+            self.client.get(url)
+
+        self.user.username = "renamed"
+        self.user.save()
+
+        for url in self.urls:
+            res = self.client.get(url)
+            self.assertEqual(res.data["created_by"], "renamed")
+
+    def test_invalidated_on_delete(self):
+        """Test deleted objects are not served from the cache"""
+        for url in self.urls:
+            self.client.get(url)
+
+        self.video.delete()
+
+        for url in self.urls:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stale_fill(self):
+        """
+        Test a representation loaded before a concurrent change is not
+        read back
+        """
+
+        def load():
+            # The change lands after the load read the object
+            caching.invalidate(models.Video, [self.video.id])
+            return {"title": "stale"}
+
+        caching.get(models.Video, self.video.id, load)
+        res = caching.get(
+            models.Video, self.video.id, lambda: {"title": "fresh"}
+        )
+
+        self.assertEqual(res, {"title": "fresh"})
+
+    def test_stats_admin_only(self):
+        """Test only admins can read the cache stats"""
+        url = reverse("core:cache-stats")
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(self.urls[0])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["objects"], {"core.video": {"hits": 0, "misses": 1}}
+        )
+        self.assertIn("local_hit_ratio", res.data["tiers"])
+
+
+class ListingCacheTests(APITestCase):
+    """Test the video listings are served from the listing cache"""
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.users = [
+            get_user_model().objects.create(
+                first_name="Test",
+                last_name="User",
+                username=f"testuser{i}",
+                email=f"testuser{i}@example.com",
+                password="testpass",
+            )
+            for i in range(2)
+        ]
+        self.videos = [
+            models.Video.objects.create(
+                title="Test Video",
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=user,
+            )
+            for user in self.users
+        ]
+        self.urls = [
+            reverse("video:list"),
+            reverse("user:videos", args=[self.users[0].id]),
+            reverse("user:videos", args=[self.users[1].id]),
+        ]
+
+    def assertCached(self, url):
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cached_pages(self):
+        """Test pages are cached under their normalized parameters"""
+        self.client.get(self.urls[0], {"search": "test", "ordering": "title"})
+        self.assertCached(self.urls[0] + "?ordering=title&search=test")
+
+        res = self.client.get(self.urls[0], {"search": "none"})
+        self.assertEqual(res.data["count"], 0)
+        self.assertEqual(
+            caching.stats()["list:videos"], {"hits": 1, "misses": 2}
+        )
+
+    def test_new_generation_on_write(self):
+        """Test writes to a video drop the pages listing it"""
+        for url in self.urls:
+            self.client.get(url)
+
+        self.videos[0].likes += 1
+        self.videos[0].save()
+
+        res = self.client.get(self.urls[0])
+        self.assertEqual(res.data["results"][1]["likes"], 1)
+        res = self.client.get(self.urls[1])
+        self.assertEqual(res.data[0]["attributes"]["likes"], 1)
+        # The videos of the other user are still cached
+        self.assertCached(self.urls[2])
+
+    def test_new_generation_on_delete(self):
+        """Test deleting a video drops the pages listing it"""
+        self.client.get(self.urls[0])
+
+        self.videos[1].delete()
+
+        res = self.client.get(self.urls[0])
+        self.assertEqual(res.data["count"], 1)
+
+    def test_new_generation_on_username_change(self):
+        """Test a renamed author drops the pages showing the username"""
+        for url in self.urls:
+            self.client.get(url)
+
+        self.users[0].username = "renamed"
+        self.users[0].save()
+
+        res = self.client.get(self.urls[0])
+        self.assertEqual(res.data["results"][1]["created_by"], "renamed")
+        res = self.client.get(self.urls[1])
+        self.assertEqual(res.data[0]["created_by"], "renamed")
+        self.assertCached(self.urls[2])
+
+    def test_errors_not_cached(self):
+        """Test error responses are not cached"""
+        self.client.get(self.urls[0], {"ordering": "file"})
+        self.client.get(self.urls[0], {"ordering": "file"})
+
+        self.assertEqual(
+            caching.stats()["list:videos"], {"hits": 0, "misses": 2}
+        )
+
+    @override_settings(LIST_CACHE_TTLS={"videos": 5, "user-videos": 7})
+    def test_ttls(self):
+        """Test pages are kept for the TTL of their listing"""
+        self.client.get(self.urls[0])
+        self.client.get(self.urls[1])
+
+        keys = [
+            caching.page_key("videos", QueryDict()),
+            caching.page_key("user-videos", QueryDict(), self.users[0].id),
+        ]
+        fresh_for = [cache.get(key)[0] - time() for key in keys]
+        self.assertAlmostEqual(fresh_for[0], 5, delta=1)
+        self.assertAlmostEqual(fresh_for[1], 7, delta=1)
+
+
+class SingleFlightTests(TransactionTestCase):
+    """Test concurrent misses of a key are filled once"""
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+
+    def get_concurrently(self, url, count=8):
+        """Responses of concurrent requests, and the videos they read"""
+
+        barrier = threading.Barrier(count)
+        reads = []
+        responses = []
+
+        def slow_reads(execute, sql, params, many, context):
+            if 'FROM "video"' in sql:
+                reads.append(sql)
+                # Long enough for every request to miss the cache
+                sleep(0.2)
+            return execute(sql, params, many, context)
+
+        def get():
+            try:
+                with connection.execute_wrapper(slow_reads):
+                    barrier.wait()
+                    responses.append(APIClient().get(url))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=get) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses, reads
+
+    def test_concurrent_misses(self):
+        """Test concurrent misses read the video once"""
+        url = reverse("video:detail", args=[self.video.id])
+
+        responses, reads = self.get_concurrently(url)
+
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(
+            [res.status_code for res in responses], [status.HTTP_200_OK] * 8
+        )
+        self.assertEqual(
+            caching.stats()["core.video"], {"hits": 7, "misses": 1}
+        )
+
+    def test_concurrent_like_counts(self):
+        """Test like counts share the fills of the video detail"""
+        url = reverse("video:like", args=[self.video.id])
+
+        responses, reads = self.get_concurrently(url)
+
+        self.assertEqual(len(reads), 1)
+        self.assertEqual([res.data for res in responses], [{"count": 0}] * 8)
+
+    def test_stale_while_filling(self):
+        """Test expired values are served while another fill runs"""
+        key = "test-key"
+        caching.get_or_fill(key, lambda: "old", ttl=0)
+        # A fill by another process
+        cache.add(caching.LOCK_KEY.format(key=key), "other")
+
+        value = caching.get_or_fill(key, lambda: "new", ttl=60)
+
+        self.assertEqual(value, "old")
+
+    def test_wait_for_other_process(self):
+        """Test misses wait for the fill of another process"""
+        key = "test-key"
+        cache.add(caching.LOCK_KEY.format(key=key), "other")
+        timer = threading.Timer(
+            0.1, cache.set, (key, (time() + 60, "filled"), 60)
+        )
+        timer.start()
+
+        value = caching.get_or_fill(key, lambda: "not filled")
+        timer.join()
+
+        self.assertEqual(value, "filled")
+
+    def test_fill_errors(self):
+        """Test errors of a fill are raised to its waiters, not cached"""
+        started = threading.Event()
+        errors = []
+
+        def fill():
+            started.set()
+            sleep(0.2)
+            raise models.Video.DoesNotExist
+
+        def wait():
+            started.wait()
+            try:
+                caching.get_or_fill("test-key", lambda: "filled")
+            except models.Video.DoesNotExist as error:
+                errors.append(error)
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        with self.assertRaises(models.Video.DoesNotExist):
+            caching.get_or_fill("test-key", fill)
+        waiter.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(caching.get_or_fill("test-key", lambda: 1), 1)
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import models
+from core.pagination import KeysetPagination
+from video.serializers import VideoSerializer
+from video.views import VideoList
+
+
+class ConditionalGetTests(APITestCase):
+    """Test the read endpoints answer conditional requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        self.comment = models.Comment.objects.create(
+            video=self.video, created_by=self.user, text="Test comment"
+        )
+        self.reply = models.CommentReply.objects.create(
+            comment=self.comment, created_by=self.user, text="Test reply"
+        )
+
+    def revalidate(self, url, res):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+
+    def test_detail_not_modified(self):
+        """Test unchanged objects are revalidated without a body"""
+        urls = [
+            reverse("video:detail", args=[self.video.id]),
+            reverse("comment:detail", args=[self.comment.id]),
+            reverse("reply:detail", args=[self.reply.id]),
+        ]
+        for url in urls:
+            res = self.client.get(url)
+            self.assertTrue(res.has_header("Last-Modified"))
+
+            # Served from the object cache with its validators
+            with self.assertNumQueries(0):
+                second = self.revalidate(url, res)
+
+            self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(second["ETag"], res["ETag"])
+            self.assertEqual(second.content, b"")
+
+    def test_detail_not_modified_uncached(self):
+        """Test revalidating an object missing from the cache"""
+        url = reverse("video:detail", args=[self.video.id])
+        res = self.client.get(url)
+        cache.clear()
+
+        with mock.patch.object(
+            VideoSerializer, "to_representation"
+        ) as serialize:
+            second = self.revalidate(url, res)
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        serialize.assert_not_called()
+
+        # Filled on the next unconditional read
+        third = self.client.get(url)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(third["ETag"], res["ETag"])
+
+    def test_detail_modified(self):
+        """Test changes to the object or its author change the ETag"""
+        url = reverse("video:detail", args=[self.video.id])
+        res = self.client.get(url)
+
+        self.client.patch(url, {"title": "New Title"})
+        second = self.revalidate(url, res)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second["ETag"], res["ETag"])
+
+        self.user.username = "renamed"
+        self.user.save()
+        third = self.revalidate(url, second)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(third.data["created_by"], "renamed")
+
+    def test_like_modifies(self):
+        """Test likes and unlikes change the ETags of the video"""
+        detail_url = reverse("video:detail", args=[self.video.id])
+        list_url = reverse("video:list")
+        like_url = reverse("video:like", args=[self.video.id])
+        detail = self.client.get(detail_url)
+        listing = self.client.get(list_url)
+        self.assertNotIn("updated_at", detail.data)
+
+        for method in (self.client.post, self.client.delete):
+            method(like_url)
+
+            second = self.revalidate(detail_url, detail)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(second["ETag"], detail["ETag"])
+            second_listing = self.revalidate(list_url, listing)
+            self.assertEqual(second_listing.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(second_listing["ETag"], listing["ETag"])
+            detail, listing = second, second_listing
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since is answered from the update time"""
+        url = reverse("video:detail", args=[self.video.id])
+        later = http_date((timezone.now() + timedelta(hours=1)).timestamp())
+        earlier = http_date((timezone.now() - timedelta(hours=1)).timestamp())
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=later)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=earlier)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        """Test unchanged lists are revalidated from the listing cache"""
+        url = reverse("video:list")
+        res = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            second = self.revalidate(url, res)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Revalidated from the validators without building the page
+        cache.clear()
+        with mock.patch.object(VideoList, "list") as build:
+            third = self.revalidate(url, res)
+        self.assertEqual(third.status_code, status.HTTP_304_NOT_MODIFIED)
+        build.assert_not_called()
+
+    def test_list_modified(self):
+        """Test additions, changes and deletions change the list ETag"""
+        url = reverse("video:comment", args=[self.video.id])
+        etags = [self.client.get(url)["ETag"]]
+
+        comment = models.Comment.objects.create(
+            video=self.video, created_by=self.user, text="Second comment"
+        )
+        etags.append(self.client.get(url)["ETag"])
+        comment.text = "Edited comment"
+        comment.save()
+        etags.append(self.client.get(url)["ETag"])
+        comment.delete()
+        etags.append(self.client.get(url)["ETag"])
+        self.user.username = "renamed"
+        self.user.save()
+        etags.append(self.client.get(url)["ETag"])
+
+        # Each change differs from the state before it, the deletion
+        # brings back the list, and the ETag, of the start
+        for before, after in zip(etags, etags[1:]):
+            self.assertNotEqual(before, after)
+
+    def test_list_pages(self):
+        """Test the pages of a list have their own ETags"""
+        models.Video.objects.create(
+            title="Other Video",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        url = reverse("video:list")
+
+        with mock.patch.object(KeysetPagination, "page_size", 1):
+            first = self.client.get(url, {"ordering": "title"})
+            second = self.client.get(first.data["next"])
+
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_error_without_validators(self):
+        """Test error responses carry no validators"""
+        res = self.client.get(reverse("video:list"), {"ordering": "file"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(res.has_header("ETag"))
+
+    def test_users_not_modified(self):
+        """Test the profile and user list answer conditional requests"""
+        for url in (reverse("user:profile"), reverse("user:list")):
+            res = self.client.get(url)
+            second = self.revalidate(url, res)
+            self.assertEqual(
+                second.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+
+        res = self.client.get(reverse("user:profile"))
+        self.user.first_name = "Renamed"
+        self.user.save()
+        second = self.revalidate(reverse("user:profile"), res)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
@@ -0,0 +1,225 @@
+import os
+import tempfile
+import threading
+from time import sleep
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.sqlite3 import base
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import db_backends
+from core.db_backends import PooledDatabaseWrapper, PoolTimeout
+
+
+class DatabaseWrapper(PooledDatabaseWrapper, base.DatabaseWrapper):
+    pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test connections are reused from a bounded pool"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, "pooled.sqlite3")
+        self.addCleanup(db_backends.close_pools, self.name)
+
+    def wrapper(self, **pool):
+        """Database wrapper of the pool, as of another thread"""
+
+        settings_dict = {
+            **connections["default"].settings_dict,
+            "NAME": self.name,
+            "POOL": {"SIZE": 2, "TIMEOUT": 0.1, **pool},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias="pooled")
+        # Closed by the test thread
+        wrapper.inc_thread_sharing()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def stats(self):
+        return db_backends.stats()[f"pooled:{self.name}"]
+
+    def query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    def test_reused(self):
+        """Test closed connections are given back and reused"""
+        wrapper = self.wrapper()
+        self.query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.query(wrapper)
+
+        self.assertIs(wrapper.connection, raw)
+        stats = self.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+        wrapper.close()
+        self.assertEqual(self.stats()["idle"], 1)
+
+    def test_bounded(self):
+        """Test checkouts past the size wait, then time out"""
+        first, second, third = (self.wrapper() for _ in range(3))
+        self.query(first)
+        self.query(second)
+
+        with self.assertRaises(PoolTimeout):
+            self.query(third)
+        self.assertEqual(self.stats()["timeouts"], 1)
+
+        threading.Timer(0.02, first.close).start()
+        self.query(third)
+
+        stats = self.stats()
+        self.assertEqual(stats["open"], 2)
+        self.assertEqual(stats["connects"], 2)
+
+    def test_concurrent(self):
+        """Test threads share the connections of the pool"""
+        peak = []
+
+        def work():
+            wrapper = self.wrapper(TIMEOUT=5)
+            for _ in range(5):
+                self.query(wrapper)
+                peak.append(self.stats()["in_use"])
+                sleep(0.001)
+                wrapper.close()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.stats()
+        self.assertEqual(stats["checkouts"], 40)
+        self.assertLessEqual(stats["connects"], 2)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["waiting"], 0)
+
+    def test_failed_ping(self):
+        """Test broken idle connections are replaced"""
+        wrapper = self.wrapper(PING_AFTER=0)
+        self.query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+        # Closed by the server
+        raw.close()
+
+        self.query(wrapper)
+
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(self.stats()["failed_pings"], 1)
+        self.assertEqual(self.stats()["open"], 1)
+
+    def test_recycled(self):
+        """Test connections past their lifetime are closed"""
+        wrapper = self.wrapper(MAX_LIFETIME=0)
+        self.query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.assertEqual(self.stats()["open"], 0)
+        self.query(wrapper)
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_not_reused_in_doubt(self):
+        """Test connections in doubt are closed rather than given back"""
+        wrapper = self.wrapper()
+        connections["pooled"] = wrapper
+        self.addCleanup(delattr, connections._connections, "pooled")
+
+        def in_transaction():
+            with transaction.atomic(using="pooled"):
+                self.query(wrapper)
+                wrapper.close()
+
+        def marked_for_rollback():
+            with transaction.atomic(using="pooled"):
+                self.query(wrapper)
+                transaction.set_rollback(True, using="pooled")
+                wrapper.close()
+
+        def after_error():
+            with self.assertRaises(DatabaseError):
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT * FROM missing")
+            wrapper.close()
+
+        def autocommit_off():
+            wrapper.set_autocommit(False)
+            self.query(wrapper)
+            wrapper.close()
+
+        for close in (
+            in_transaction,
+            marked_for_rollback,
+            after_error,
+            autocommit_off,
+        ):
+            with self.subTest(close.__name__):
+                close()
+
+                stats = self.stats()
+                self.assertEqual(stats["open"], 0)
+                self.assertEqual(stats["idle"], 0)
+
+                # Still given back otherwise
+                self.query(wrapper)
+                wrapper.close()
+                self.assertEqual(self.stats()["idle"], 1)
+                db_backends.close_pools(self.name)
+
+    def test_not_reused_with_flags(self):
+        """Test each flag of a connection in doubt closes it on checkin"""
+        wrapper = self.wrapper()
+        for flag in ("in_atomic_block", "needs_rollback", "errors_occurred"):
+            with self.subTest(flag):
+                self.query(wrapper)
+                setattr(wrapper, flag, True)
+                try:
+                    wrapper._close()
+                finally:
+                    setattr(wrapper, flag, False)
+                    wrapper.connection = None
+
+                stats = self.stats()
+                self.assertEqual(stats["open"], 0)
+                self.assertEqual(stats["idle"], 0)
+
+
+class PoolStatsApiTests(APITestCase):
+    """Test the pool stats are reported to admins"""
+
+    def test_admins_only(self):
+        """Test only admins can read the pool stats"""
+        url = reverse("core:pool-stats")
+        self.assertEqual(url, "/api/db/pools/")
+        user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=user)
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        user.is_staff = True
+        user.save()
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("pools", res.data)
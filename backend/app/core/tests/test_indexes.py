@@ -0,0 +1,152 @@
+import re
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework.utils.urls import replace_query_param
+from core import models
+from core.pagination import KeysetPagination
+from video import related
+
+# A table read without an index
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+# Tables read in the order of their rowid, which is also a bare SCAN
+SQLITE_ROWID_ORDER = re.compile(r'ORDER BY "(\w+)"\."id"')
+# Rows sorted after being read instead of read in index order
+SQLITE_SORT = re.compile(r"TEMP B-TREE FOR ORDER BY")
+
+
+class HotPathIndexTests(APITestCase):
+    """Test the queries of the hot endpoints are answered from indexes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        self.comment = models.Comment.objects.create(
+            video=self.video, created_by=self.user, text="Test comment"
+        )
+        models.CommentReply.objects.create(
+            comment=self.comment, created_by=self.user, text="Test reply"
+        )
+        tag = models.Tag.objects.create(name="music")
+        models.VideoTag.objects.create(video=self.video, tag=tag)
+        related.rebuild()
+
+    def explain(self, sql, ordered):
+        """
+        Return the lines of the plan of a query that scan a table, or
+        that sort its rows when they should be read in order
+        """
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Tables this small would be scanned anyway
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return [
+                    row[0] for row in cursor.fetchall() if "Seq Scan" in row[0]
+                ]
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            rowid_ordered = SQLITE_ROWID_ORDER.findall(sql)
+            plan = []
+            for row in cursor.fetchall():
+                scan = SQLITE_FULL_SCAN.search(row[-1])
+                if (scan and scan.group(1) not in rowid_ordered) or (
+                    ordered and SQLITE_SORT.search(row[-1])
+                ):
+                    plan.append(row[-1])
+            return plan
+
+    def assertIndexed(self, url, table, ordered=True, method="get"):
+        """
+        Assert every query of a request of the URL reading the table uses
+        an index, and reads the rows in index order when ``ordered`` is set
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.client, method)(url)
+            if res.streaming:
+                b"".join(res.streaming_content)
+
+        sql = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+            and re.search(rf'FROM "?{table}"?\W', query["sql"])
+        ]
+        self.assertTrue(sql, f"{url} does not read {table}")
+        for query in sql:
+            self.assertEqual(self.explain(query, ordered), [], query)
+
+    def test_user_videos(self):
+        url = reverse("user:videos", args=[self.user.id])
+        self.assertIndexed(url, "video")
+
+    def test_video_list(self):
+        self.assertIndexed(reverse("video:list"), "video")
+
+    def test_video_likes(self):
+        url = reverse("video:like", args=[self.video.id])
+        self.assertIndexed(url, "video_like", method="post")
+        self.assertIndexed(url, "video_like", method="delete")
+
+    def test_video_orderings(self):
+        cursors = {
+            "created_at": self.video.created_at.isoformat(),
+            "likes": 0,
+            "title": "Test Video",
+        }
+        for field, value in cursors.items():
+            for ordering in (field, f"-{field}"):
+                url = reverse("video:list") + f"?ordering={ordering}"
+                self.assertIndexed(url, "video")
+
+                cursor = KeysetPagination().encode_cursor([value, 1])
+                url = replace_query_param(url, "cursor", cursor)
+                self.assertIndexed(url, "video")
+
+    def test_video_comments(self):
+        url = reverse("video:comment", args=[self.video.id])
+        self.assertIndexed(url, "comment")
+
+    def test_comment_replies(self):
+        url = reverse("comment:reply", args=[self.comment.id])
+        self.assertIndexed(url, "core_commentreply")
+
+    def test_tagged_videos(self):
+        url = reverse("video:tagged") + "?tag=music"
+        self.assertIndexed(url, "video")
+        self.assertIndexed(url + "&match=any", "video")
+
+    def test_related_videos(self):
+        url = reverse("video:related", args=[self.video.id])
+        self.assertIndexed(url, "video")
+
+    def test_trending_videos(self):
+        self.assertIndexed(reverse("video:trending"), "trending_score")
+
+    def test_popular_tags(self):
+        self.assertIndexed(reverse("tag:popular"), "tag_usage")
+        # The sums of the window are sorted, not the rows
+        self.assertIndexed(
+            reverse("tag:popular") + "?window=7d",
+            "tag_usage_daily",
+            ordered=False,
+        )
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import tempfile
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from django.utils.http import http_date
+from core import media
+from core.media import MediaApp
+
+
+async def not_media(scope, receive, send):
+    await send({"type": "http.response.start", "status": 418, "headers": []})
+    await send({"type": "http.response.body"})
+
+
+class MediaAppTests(SimpleTestCase):
+    """Test media files are streamed by the ASGI application"""
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.content = bytes(range(256)) * 1024
+        self.path = os.path.join(self.root.name, "video.mp4")
+        with open(self.path, "wb") as file:
+            file.write(self.content)
+        self.app = MediaApp(not_media, self.root.name, "media/")
+
+    def request(self, path, method="GET", headers=()):
+        """Status, headers and body of the response"""
+
+        messages = []
+        received = []
+
+        async def receive():
+            if received:
+                # Until the client disconnects
+                await asyncio.Future()
+            received.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": [
+                (name.encode(), value.encode()) for name, value in headers
+            ],
+        }
+        async_to_sync(self.app)(scope, receive, send)
+
+        start, *bodies = messages
+        headers = {
+            name.decode(): value.decode() for name, value in start["headers"]
+        }
+        body = b"".join(message.get("body", b"") for message in bodies)
+        return start["status"], headers, body
+
+    def test_file(self):
+        """Test files are sent whole, in chunks"""
+        status, headers, body = self.request("/media/video.mp4")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(headers["content-type"], "video/mp4")
+        self.assertEqual(headers["content-length"], str(len(self.content)))
+        self.assertEqual(headers["accept-ranges"], "bytes")
+
+    def test_ranges(self):
+        """Test single byte ranges are sent as partial content"""
+        size = len(self.content)
+        cases = [
+            ("bytes=100-199", 100, 199),
+            ("bytes=70000-", 70000, size - 1),
+            ("bytes=-500", size - 500, size - 1),
+            ("bytes=100-999999", 100, size - 1),
+        ]
+        for header, first, last in cases:
+            with self.subTest(header):
+                status, headers, body = self.request(
+                    "/media/video.mp4", headers=[("Range", header)]
+                )
+
+                self.assertEqual(status, 206)
+                self.assertEqual(body, self.content[first:last + 1])
+                self.assertEqual(
+                    headers["content-range"], f"bytes {first}-{last}/{size}"
+                )
+
+    def test_ignored_ranges(self):
+        """Test other ranges are ignored and unsatisfiable ones refused"""
+        for header in ("bytes=0-1,5-9", "items=0-1", "bytes=9-5"):
+            with self.subTest(header):
+                status, _, body = self.request(
+                    "/media/video.mp4", headers=[("Range", header)]
+                )
+                self.assertEqual(status, 200)
+                self.assertEqual(body, self.content)
+
+        status, headers, _ = self.request(
+            "/media/video.mp4", headers=[("Range", "bytes=999999-")]
+        )
+        self.assertEqual(status, 416)
+        self.assertEqual(
+            headers["content-range"], f"bytes */{len(self.content)}"
+        )
+
+    def test_if_range(self):
+        """Test ranges are only sent while If-Range matches the file"""
+        _, headers, _ = self.request("/media/video.mp4", "HEAD")
+        status, _, body = self.request(
+            "/media/video.mp4",
+            headers=[
+                ("Range", "bytes=100-199"),
+                ("If-Range", headers["last-modified"]),
+            ],
+        )
+        self.assertEqual(status, 206)
+        self.assertEqual(body, self.content[100:200])
+
+        modified = http_date(os.stat(self.path).st_mtime - 60)
+        for if_range in (modified, '"etag"', 'W/"etag"'):
+            for byte_range in ("bytes=100-199", "bytes=999999-"):
+                with self.subTest(if_range=if_range, range=byte_range):
+                    status, headers, body = self.request(
+                        "/media/video.mp4",
+                        headers=[
+                            ("Range", byte_range),
+                            ("If-Range", if_range),
+                        ],
+                    )
+                    self.assertEqual(status, 200)
+                    self.assertEqual(body, self.content)
+                    self.assertNotIn("content-range", headers)
+
+    def test_head_and_not_modified(self):
+        """Test HEAD requests and unmodified files get no body"""
+        status, headers, body = self.request("/media/video.mp4", "HEAD")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"")
+
+        status, _, _ = self.request(
+            "/media/video.mp4",
+            headers=[("If-Modified-Since", headers["last-modified"])],
+        )
+        self.assertEqual(status, 304)
+
+        modified = http_date(os.stat(self.path).st_mtime - 60)
+        status, _, _ = self.request(
+            "/media/video.mp4", headers=[("If-Modified-Since", modified)]
+        )
+        self.assertEqual(status, 200)
+
+    def test_not_found(self):
+        """Test missing files, directories and paths outside the root"""
+        os.mkdir(os.path.join(self.root.name, "thumbnails"))
+        for path in ("missing.mp4", "thumbnails", "", "../video.mp4"):
+            with self.subTest(path):
+                status, _, _ = self.request(f"/media/{path}")
+                self.assertEqual(status, 404)
+
+        status, _, _ = self.request("/media/video.mp4", "POST")
+        self.assertEqual(status, 405)
+
+    def test_other_paths(self):
+        """Test requests outside the media are passed to the application"""
+        status, _, _ = self.request("/api/videos/")
+
+        self.assertEqual(status, 418)
+
+    def test_disconnect(self):
+        """Test downloads stop when the client disconnects"""
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 2:
+                disconnected.set()
+            # Slow client
+            await asyncio.sleep(0.01)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/media/video.mp4",
+            "headers": [],
+        }
+        async_to_sync(self.app)(scope, receive, send)
+
+        self.assertLess(len(sent), len(self.content) // media.CHUNK_SIZE)
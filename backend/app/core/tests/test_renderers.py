@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+from uuid import UUID
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from core import renderers
+from core.renderers import FastJSONRenderer, Fragment
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the JSON renderer matches the stdlib JSONRenderer output"""
+
+    data = {
+        "id": 1,
+        "title": "Vidéo \u2028 \u2029 \"quoted\" \U0001F3AC",
+        "description": None,
+        "likes": 3,
+        "ratio": 0.1,
+        "flags": [True, False],
+        "created_at": datetime(2023, 1, 2, 3, 4, 5, 678901, timezone.utc),
+        "naive": datetime(2023, 1, 2, 3, 4, 5),
+        "date": date(2023, 1, 2),
+        "duration": timedelta(minutes=3),
+        "price": Decimal("1.50"),
+        "uuid": UUID("12345678123456781234567812345678"),
+        "lazy": gettext_lazy("video"),
+        "nested": {"tuple": (1, 2), "set": {3}},
+    }
+
+    def assertRendersLikeStdlib(self, data, media_type=None):
+        expected = JSONRenderer().render(data, media_type)
+        self.assertEqual(FastJSONRenderer().render(data, media_type), expected)
+
+    def test_render_matches_stdlib(self):
+        """Test common API values render byte-identically"""
+        self.assertRendersLikeStdlib(self.data)
+        self.assertRendersLikeStdlib([self.data, self.data])
+
+    def test_render_drf_containers(self):
+        """Test ReturnDict and ReturnList render like plain containers"""
+        data = ReturnList(
+            [ReturnDict(self.data, serializer=None)], serializer=None
+        )
+
+        self.assertRendersLikeStdlib(data)
+
+    def test_render_indent_matches_stdlib(self):
+        """Test indented responses render like the stdlib renderer"""
+        self.assertRendersLikeStdlib(
+            self.data, "application/json; indent=4"
+        )
+
+    def test_render_unsupported_by_orjson_falls_back(self):
+        """Test values orjson cannot encode are rendered by the stdlib"""
+        self.assertRendersLikeStdlib({1: "int key", "big": 2**70})
+
+    def test_render_floats_like_stdlib(self):
+        """Test floats orjson writes differently are rendered by the stdlib"""
+        for value in (1e16, 1e22, 9.99e-05, 5e-324, 1.7976931348623157e308):
+            self.assertRendersLikeStdlib({"value": value, "zero": 0.0})
+            self.assertRendersLikeStdlib([[{"nested": (value,)}]])
+
+        self.assertRendersLikeStdlib({"values": (1e-4, 9999999999999998.0)})
+        self.assertEqual(
+            FastJSONRenderer().render({"value": 1e16}), b'{"value":1e+16}'
+        )
+
+    def test_render_non_finite_rejected(self):
+        """Test NaN and infinities are rejected like the stdlib does"""
+        for value in (float("nan"), float("inf"), float("-inf")):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"value": value})
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({"value": value})
+
+    def test_render_floats_of_default_like_stdlib(self):
+        """Test floats returned by the encoder default are checked too"""
+        self.assertRendersLikeStdlib({"price": Decimal("1E+16")})
+        self.assertRendersLikeStdlib({"set": {1e16}})
+
+    def test_render_without_orjson(self):
+        """Test the renderer falls back to the stdlib encoder"""
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertRendersLikeStdlib(self.data)
+
+    def test_render_none(self):
+        """Test empty responses render as empty bytes"""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_render_errors_like_stdlib(self):
+        """Test values the stdlib rejects are still rejected"""
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"point": Point(1, 2)})
+
+    @skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_render_uses_orjson(self):
+        """Test orjson is used when it is installed"""
+        with mock.patch.object(
+            renderers.orjson, "dumps", wraps=renderers.orjson.dumps
+        ) as dumps:
+            FastJSONRenderer().render(self.data)
+
+        dumps.assert_called_once()
+
+
+class DumpsTests(SimpleTestCase):
+    """Test dumps encodes like the renderer"""
+
+    def test_dumps_floats_like_stdlib(self):
+        """Test floats orjson writes differently are encoded by the stdlib"""
+        for value in (0.1, 1e16, 9.99e-05, 5e-324):
+            data = {"value": value, "nested": [(value,)]}
+            self.assertEqual(
+                renderers.dumps(data), FastJSONRenderer().render(data)
+            )
+
+    def test_dumps_unsupported_by_orjson_falls_back(self):
+        """Test values orjson cannot encode are encoded by the stdlib"""
+        self.assertEqual(
+            renderers.dumps({"big": 2**70}), b'{"big":%d}' % 2**70
+        )
+
+    def test_dumps_non_finite_rejected(self):
+        """Test NaN and infinities are rejected like the renderer does"""
+        with self.assertRaises(ValueError):
+            renderers.dumps({"value": float("nan")})
+
+
+class FragmentTests(SimpleTestCase):
+    """Test pre-encoded fragments are spliced into rendered output"""
+
+    def test_splice_fragments_into_list(self):
+        """Test fragments inside a list response are copied verbatim"""
+        video = {"id": 1, "title": "Vidéo \u2028"}
+        encoded = JSONRenderer().render(video)
+        data = {
+            "count": 2,
+            "results": [Fragment(encoded), {"id": 2, "title": "Other"}],
+        }
+        expected = JSONRenderer().render(
+            {"count": 2, "results": [video, {"id": 2, "title": "Other"}]}
+        )
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_splice_fragment_on_fallback(self):
+        """Test fragments survive a fallback to the stdlib encoder"""
+        data = {1: Fragment(b'{"id":1}'), "big": 2**70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            b'{"1":{"id":1},"big":1180591620717411303424}',
+        )
+
+    def test_render_fragment_response(self):
+        """Test a fragment rendered on its own is returned unchanged"""
+        self.assertEqual(
+            FastJSONRenderer().render(Fragment('{"id":1}')), b'{"id":1}'
+        )
+
+    def test_fragment_lookalike_strings_untouched(self):
+        """Test strings resembling placeholders are not replaced"""
+        data = {"text": "__fragment_0000000000000000_0"}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
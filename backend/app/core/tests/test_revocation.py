@@ -0,0 +1,204 @@
+import threading
+from datetime import timedelta
+from time import sleep
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import models, revocation
+
+
+class BloomFilterTests(APITestCase):
+    """Test the Bloom filter of the revoked tokens"""
+
+    def test_members(self):
+        """Test added values are always found"""
+        bloom = revocation.BloomFilter(1000)
+        values = [f"member{i}" for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+
+    def test_false_positive_rate(self):
+        """Test other values are found at about the error rate"""
+        bloom = revocation.BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"member{i}")
+
+        found = sum(f"other{i}" in bloom for i in range(10000))
+
+        self.assertLess(found, 300)
+
+
+class RevocationApiTests(APITestCase):
+    """Test revoked refresh tokens are rejected"""
+
+    def setUp(self):
+        cache.clear()
+        revocation.get_filter().reset()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.refresh_url = reverse("user:refresh-token")
+
+    def refresh(self, token):
+        return self.client.post(self.refresh_url, {"refresh": str(token)})
+
+    def test_not_revoked(self):
+        """Test refreshing tokens that were not revoked reads no table"""
+        self.refresh(RefreshToken.for_user(self.user))
+
+        with self.assertNumQueries(0):
+            res = self.refresh(RefreshToken.for_user(self.user))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revoked(self):
+        """Test revoked tokens can no longer be refreshed"""
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+
+        res = self.client.post(
+            reverse("user:revoke-token"), {"refresh": str(token)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.refresh(token)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            self.refresh(RefreshToken.for_user(self.user)).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_revoke_invalid(self):
+        """Test only valid tokens can be revoked"""
+        res = self.client.post(
+            reverse("user:revoke-token"), {"refresh": "invalid"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(models.RevokedToken.objects.exists())
+
+    def test_false_positive(self):
+        """Test tokens found in the filter only are looked up and allowed"""
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        revocation.get_filter().filter.add(token["jti"])
+
+        with self.assertNumQueries(1):
+            res = self.refresh(token)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats = revocation.get_filter().stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["false_positives"], 1)
+
+    def test_rebuilt_on_new_generation(self):
+        """Test revocations of other processes rebuild the filter"""
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        # Revoked without the signal, as seen by this process
+        models.RevokedToken.objects.bulk_create(
+            [
+                models.RevokedToken(
+                    jti=token["jti"],
+                    expires_at=timezone.now() + timedelta(days=1),
+                )
+            ]
+        )
+        self.assertEqual(self.refresh(token).status_code, status.HTTP_200_OK)
+
+        cache.set(revocation.GENERATION_KEY, "other")
+
+        res = self.refresh(token)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(revocation.get_filter().stats()["rebuilds"], 2)
+
+    def test_rebuilt_on_evicted_generation(self):
+        """Test a generation missing from the cache rebuilds the filter"""
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        models.RevokedToken.objects.bulk_create(
+            [
+                models.RevokedToken(
+                    jti=token["jti"],
+                    expires_at=timezone.now() + timedelta(days=1),
+                )
+            ]
+        )
+
+        cache.delete(revocation.GENERATION_KEY)
+
+        res = self.refresh(token)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(revocation.get_filter().stats()["rebuilds"], 2)
+        self.assertIsNotNone(cache.get(revocation.GENERATION_KEY))
+
+    def test_rebuilt_without_generation(self):
+        """Test filters are rebuilt each time while no generation is kept"""
+        with mock.patch.object(revocation, "cache") as no_cache:
+            no_cache.get.return_value = None
+            for _ in range(2):
+                revocation.get_filter().might_be_revoked("jti")
+
+        self.assertEqual(revocation.get_filter().stats()["rebuilds"], 2)
+
+    def test_rebuilt_once_by_concurrent_threads(self):
+        """Test threads seeing a new generation rebuild the filter once"""
+        with mock.patch.object(models.RevokedToken.objects, "filter") as rows:
+            rows().values_list.side_effect = lambda *args, **kwargs: (
+                sleep(0.05) or []
+            )
+            rows.reset_mock()
+            threads = [
+                threading.Thread(
+                    target=revocation.get_filter().might_be_revoked,
+                    args=["jti"],
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(rows.call_count, 1)
+        stats = revocation.get_filter().stats()
+        self.assertEqual(stats["rebuilds"], 1)
+        self.assertEqual(stats["misses"], 8)
+
+    def test_rebuilt_periodically(self):
+        """Test filters are rebuilt after the rebuild interval"""
+        self.refresh(RefreshToken.for_user(self.user))
+
+        later = revocation.monotonic() + 601
+        with mock.patch.object(revocation, "monotonic", lambda: later):
+            self.refresh(RefreshToken.for_user(self.user))
+
+        self.assertEqual(revocation.get_filter().stats()["rebuilds"], 2)
+
+    def test_expired_not_loaded(self):
+        """Test expired tokens are left out of the filter and pruned"""
+        now = timezone.now()
+        models.RevokedToken.objects.create(
+            jti="expired", expires_at=now - timedelta(days=1)
+        )
+        models.RevokedToken.objects.create(
+            jti="current", expires_at=now + timedelta(days=1)
+        )
+
+        self.assertFalse(revocation.is_revoked("expired"))
+        self.assertTrue(revocation.is_revoked("current"))
+        self.assertEqual(revocation.get_filter().stats()["tokens"], 1)
+
+        self.assertEqual(revocation.prune(), 1)
+        self.assertEqual(models.RevokedToken.objects.count(), 1)
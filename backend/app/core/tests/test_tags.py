@@ -0,0 +1,53 @@
+from django.test import TestCase
+from core import models, tags
+
+
+class TagLookupTests(TestCase):
+    """Test the lookups between tag names and ids"""
+
+    def setUp(self):
+        tags.clear()
+        self.music = models.Tag.objects.create(name="music")
+
+    def tearDown(self):
+        tags.clear()
+
+    def test_get_ids_normalizes_names(self):
+        """Test names are matched lowercase and unknown names left out"""
+        ids = tags.get_ids([" Music", "jazz"])
+
+        self.assertEqual(ids, {"music": self.music.id})
+        self.assertIsNone(tags.get_id("jazz"))
+
+    def test_get_ids_create(self):
+        """Test unknown names are created once"""
+        ids = tags.get_ids(["music", "Jazz"], create=True)
+        again = tags.get_ids(["jazz"], create=True)
+
+        self.assertEqual(ids["music"], self.music.id)
+        self.assertEqual(again, {"jazz": ids["jazz"]})
+        self.assertEqual(models.Tag.objects.count(), 2)
+
+    def test_ids_cached_after_commit(self):
+        """Test ids are cached once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.get_id("music")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(tags.get_id("MUSIC"), self.music.id)
+
+    def test_ids_not_cached_before_commit(self):
+        """Test ids read in an open transaction are not cached yet"""
+        with self.captureOnCommitCallbacks(execute=False):
+            tags.get_id("music")
+
+        with self.assertNumQueries(1):
+            tags.get_id("music")
+
+    def test_deleted_tag_forgotten(self):
+        """Test deleting a tag removes it from the cache"""
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.get_id("music")
+        self.music.delete()
+
+        self.assertIsNone(tags.get_id("music"))
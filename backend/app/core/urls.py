@@ -0,0 +1,13 @@
+from django.urls import path
+from core import views
+
+app_name = "core"
+
+urlpatterns = [
+    path(
+        "cache/stats/", views.CacheStatsView.as_view(), name="cache-stats"
+    ),
+    path(
+        "db/pools/", views.DatabasePoolStatsView.as_view(), name="pool-stats"
+    ),
+]
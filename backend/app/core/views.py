@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core import caching, db_backends
+
+
+class CacheStatsView(APIView):
+    """
+    Cache view reporting the hits and misses of the object and listing
+    caches, and of each tier of the cache backend
+    Allowed methods: GET
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        """
+        Return the hit and miss counts of each cached model and listing,
+        and of each cache tier, counted by the process serving the
+        request since it started
+        """
+
+        try:
+            response = {"objects": caching.stats()}
+            if hasattr(cache, "stats"):
+                response["tiers"] = cache.stats()
+            return Response(response, status=status.HTTP_200_OK)
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error reading the cache stats",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Database view reporting the use of the connection pools
+    Allowed methods: GET
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        """
+        Return the connections open, in use and idle of the pool of each
+        database, the checkouts waiting for one, and the checkout
+        latencies, of the process serving the request
+        """
+
+        try:
+            response = {"pools": db_backends.stats()}
+            return Response(response, status=status.HTTP_200_OK)
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error reading the pool stats",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
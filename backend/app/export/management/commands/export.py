@@ -0,0 +1,51 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from export import streaming
+
+
+class Command(BaseCommand):
+    help = "Export videos, comments, replies or likes as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=sorted(streaming.RESOURCES))
+        parser.add_argument(
+            "--updated-since",
+            help="Only export rows updated at or after this ISO datetime",
+        )
+        parser.add_argument(
+            "--id-after", type=int, help="Only export rows after this id"
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Gzip compress the output"
+        )
+        parser.add_argument(
+            "--output", help="File to write to, defaults to stdout"
+        )
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options["updated_since"]:
+            updated_since = parse_datetime(options["updated_since"])
+            if updated_since is None:
+                raise CommandError("--updated-since must be an ISO datetime")
+
+        try:
+            content = streaming.export_rows(
+                options["resource"],
+                updated_since=updated_since,
+                id_after=options["id_after"],
+            )
+        except streaming.ExportError as e:
+            raise CommandError(str(e))
+
+        if options["gzip"]:
+            content = streaming.gzip_stream(content)
+
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(content)
+        else:
+            output = getattr(self.stdout, "buffer", None) or sys.stdout.buffer
+            output.writelines(content)
+            output.flush()
@@ -0,0 +1,59 @@
+from core.serializers import ValuesSerializer
+
+
+def format_isoformat(value):
+    return value.isoformat()
+
+
+class VideoExportSerializer(ValuesSerializer):
+    """Export row of a video"""
+
+    fields = (
+        ("id", "id"),
+        ("title", "title"),
+        ("description", "description"),
+        ("thumbnail", "thumbnail"),
+        ("file", "file"),
+        ("likes", "likes"),
+        ("created_by", "created_by_id"),
+        ("created_at", "created_at", format_isoformat),
+        ("updated_at", "updated_at", format_isoformat),
+    )
+
+
+class CommentExportSerializer(ValuesSerializer):
+    """Export row of a video comment"""
+
+    fields = (
+        ("id", "id"),
+        ("video", "video_id"),
+        ("text", "text"),
+        ("likes", "likes"),
+        ("created_by", "created_by_id"),
+        ("created_at", "created_at", format_isoformat),
+        ("updated_at", "updated_at", format_isoformat),
+    )
+
+
+class ReplyExportSerializer(ValuesSerializer):
+    """Export row of a comment reply"""
+
+    fields = (
+        ("id", "id"),
+        ("comment", "comment_id"),
+        ("text", "text"),
+        ("likes", "likes"),
+        ("created_by", "created_by_id"),
+        ("created_at", "created_at", format_isoformat),
+        ("updated_at", "updated_at", format_isoformat),
+    )
+
+
+class LikeExportSerializer(ValuesSerializer):
+    """Export row of a video like"""
+
+    fields = (
+        ("id", "id"),
+        ("video", "video_id"),
+        ("liked_by", "liked_by_id"),
+    )
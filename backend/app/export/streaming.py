@@ -0,0 +1,203 @@
+import asyncio
+import queue
+import threading
+import zlib
+from django.db import connections
+from core import models
+from core.renderers import dumps
+from export import serializers
+
+CHUNK_SIZE = 2000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class Resource:
+    """An exportable model and the serializer used for its rows"""
+
+    def __init__(self, model, serializer_class, updated_field=None):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.updated_field = updated_field
+
+
+RESOURCES = {
+    "videos": Resource(
+        models.Video, serializers.VideoExportSerializer, "updated_at"
+    ),
+    "comments": Resource(
+        models.Comment, serializers.CommentExportSerializer, "updated_at"
+    ),
+    "replies": Resource(
+        models.CommentReply, serializers.ReplyExportSerializer, "updated_at"
+    ),
+    "likes": Resource(models.VideoLike, serializers.LikeExportSerializer),
+}
+
+
+class ExportError(ValueError):
+    """Raised when an export is requested with invalid filters"""
+
+
+def export_rows(resource, updated_since=None, id_after=None):
+    """
+    Yield the rows of a resource as NDJSON lines ordered by id.
+
+    Rows are read with a server-side cursor where the database supports
+    it, so memory use does not grow with the size of the table.
+    """
+
+    resource = RESOURCES[resource]
+    queryset = resource.model.objects.order_by("id")
+
+    if updated_since is not None:
+        if resource.updated_field is None:
+            raise ExportError(
+                "This resource does not support the updated_since filter"
+            )
+        queryset = queryset.filter(
+            **{f"{resource.updated_field}__gte": updated_since}
+        )
+    if id_after is not None:
+        queryset = queryset.filter(id__gt=id_after)
+
+    serializer_class = resource.serializer_class
+    rows = serializer_class.rows_for(queryset).iterator(CHUNK_SIZE)
+    return _lines(rows, serializer_class.to_representation)
+
+
+def _lines(rows, to_representation):
+    """Encode rows as NDJSON, grouping lines into chunks of ~64 KiB"""
+
+    buffer = []
+    size = 0
+    for row in rows:
+        line = dumps(to_representation(row)) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer.clear()
+            size = 0
+
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzip_stream(chunks, level=6):
+    """Compress an iterable of byte chunks into a gzip stream"""
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header accepts gzip, by name or with ``*``,
+    with a quality above 0, e.g. not for ``gzip;q=0``
+    """
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class ThreadedStream:
+    """
+    Iterable of the chunks of another, produced in a thread of its own.
+
+    Under ASGI, Django 4.1 iterates streaming responses on the event loop,
+    where the queries of ``export_rows`` raise SynchronousOnlyOperation.
+    The chunks are produced in a thread instead, with its own database
+    connection, and handed over through a queue of ``prefetch`` chunks so
+    that memory use stays bounded. The stream is also an async iterable,
+    which waits for the chunks in the default executor of the loop, as
+    ``core.asgi.ASGIHandler`` sends it.
+    """
+
+    _done = object()
+
+    def __init__(self, chunks, prefetch=2):
+        self.chunks = chunks
+        self.queue = queue.Queue(prefetch)
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        self._start()
+        while True:
+            item = self._get()
+            if item is self._done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def __aiter__(self):
+        self._start()
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._get)
+            if item is self._done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        """Stop the thread, e.g. once the client went away"""
+
+        self.closed.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _start(self):
+        threading.Thread(target=self._produce, daemon=True).start()
+
+    def _get(self):
+        # Waits in steps, to give up once the stream is closed
+        while True:
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.closed.is_set():
+                    return self._done
+
+    def _produce(self):
+        try:
+            for chunk in self.chunks:
+                if not self._put(chunk):
+                    return
+            self._put(self._done)
+        except Exception as e:
+            self._put(e)
+        finally:
+            if hasattr(self.chunks, "close"):
+                self.chunks.close()
+            connections.close_all()
+
+    def _put(self, item):
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
@@ -0,0 +1,256 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from django.test import AsyncClient, SimpleTestCase, TransactionTestCase
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from core import models
+from core.asgi import ASGIHandler
+from export import streaming
+
+
+def read_lines(response):
+    content = b"".join(response.streaming_content)
+    if response.get("Content-Encoding") == "gzip":
+        content = gzip.decompress(content)
+    return [json.loads(line) for line in content.splitlines()]
+
+
+class ExportApiTests(APITestCase):
+    """Test the NDJSON export API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+
+        self.videos = [
+            models.Video.objects.create(
+                title=f"Test Video {i}",
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=self.user,
+            )
+            for i in range(3)
+        ]
+        self.comment = models.Comment.objects.create(
+            text="Test comment", video=self.videos[0], created_by=self.user
+        )
+        models.CommentReply.objects.create(
+            text="Test reply", comment=self.comment, created_by=self.user
+        )
+        models.VideoLike.objects.create(
+            video=self.videos[0], liked_by=self.user
+        )
+
+    def test_export_videos(self):
+        """Test exporting videos streams one JSON object per line"""
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url)
+        lines = read_lines(res)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            [line["id"] for line in lines], [v.id for v in self.videos]
+        )
+        self.assertEqual(lines[0]["title"], "Test Video 0")
+        self.assertEqual(lines[0]["created_by"], self.user.id)
+        self.assertEqual(
+            lines[0]["created_at"], self.videos[0].created_at.isoformat()
+        )
+
+    def test_export_all_resources(self):
+        """Test comments, replies and likes can be exported"""
+        for resource in ("comments", "replies", "likes"):
+            url = reverse("export:resource", args=[resource])
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(read_lines(res)), 1)
+
+    def test_export_id_after(self):
+        """Test exporting only the rows after an id"""
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url, {"id_after": self.videos[0].id})
+
+        self.assertEqual(
+            [line["id"] for line in read_lines(res)],
+            [v.id for v in self.videos[1:]],
+        )
+
+    def test_export_updated_since(self):
+        """Test exporting only the rows updated since a datetime"""
+        models.Video.objects.filter(id=self.videos[0].id).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url, {"updated_since": since})
+
+        self.assertEqual(len(read_lines(res)), 2)
+
+    def test_export_invalid_filter(self):
+        """Test invalid filters are rejected"""
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url, {"id_after": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse("export:resource", args=["likes"])
+        res = self.client.get(url, {"updated_since": timezone.now()})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_unknown_resource(self):
+        """Test exporting an unknown resource returns 404"""
+        url = reverse("export:resource", args=["users"])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_gzip(self):
+        """Test the export is gzip compressed when the client accepts it"""
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(len(read_lines(res)), 3)
+
+    def test_export_gzip_refused(self):
+        """Test the export is not compressed when gzip has a zero quality"""
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0, *")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(len(read_lines(res)), 3)
+
+    def test_export_requires_staff(self):
+        """Test non staff users cannot export"""
+        self.user.is_staff = False
+        self.user.save()
+
+        url = reverse("export:resource", args=["videos"])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        """Test the export management command writes gzip NDJSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "videos.ndjson.gz")
+            call_command(
+                "export",
+                "videos",
+                "--gzip",
+                "--id-after",
+                str(self.videos[1].id),
+                "--output",
+                path,
+            )
+            with gzip.open(path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual([line["id"] for line in lines], [self.videos[2].id])
+
+
+class AsyncExportApiTests(TransactionTestCase):
+    """Test the NDJSON export streamed by the ASGI handler"""
+
+    def setUp(self):
+        user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        user.is_staff = True
+        user.save()
+        self.token = str(AccessToken.for_user(user))
+        for i in range(3):
+            models.Video.objects.create(
+                title=f"Test Video {i}",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=user,
+            )
+
+    async def test_export_on_event_loop(self):
+        """Test the rows are read off the event loop iterating the stream"""
+        url = reverse("export:resource", args=["videos"])
+        authorization = f"Bearer {self.token}"
+
+        for encoding in ("identity", "gzip"):
+            res = await AsyncClient().get(
+                url,
+                authorization=authorization,
+                **{"accept-encoding": encoding},
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            # Iterated on the event loop, like the ASGI handler does
+            self.assertEqual(len(read_lines(res)), 3)
+
+    async def test_export_sent_async(self):
+        """Test the ASGI handler sends the stream with async for"""
+        url = reverse("export:resource", args=["videos"])
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": url,
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {self.token}".encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        # Blocking the event loop, the stream must not be iterated
+        with mock.patch.object(
+            streaming.ThreadedStream, "__iter__", lambda self: iter(())
+        ):
+            await ASGIHandler()(scope, receive, send)
+
+        self.assertEqual(messages[0]["status"], status.HTTP_200_OK)
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        self.assertEqual(len(body.splitlines()), 3)
+        self.assertFalse(messages[-1].get("more_body", False))
+
+
+class AcceptsGzipTests(SimpleTestCase):
+    """Test the Accept-Encoding header is parsed with its qualities"""
+
+    def test_accepts_gzip(self):
+        """Test gzip is accepted by name or with a wildcard"""
+        for header in ("gzip", "deflate, gzip;q=0.5", "*", "GZIP;Q=1"):
+            self.assertTrue(streaming.accepts_gzip(header), header)
+
+    def test_refuses_gzip(self):
+        """Test gzip is refused when missing or of a zero quality"""
+        for header in ("", "identity", "gzip;q=0", "gzip;q=0.0, *;q=1"):
+            self.assertFalse(streaming.accepts_gzip(header), header)
@@ -0,0 +1,8 @@
+from django.urls import path
+from export import views
+
+app_name = "export"
+
+urlpatterns = [
+    path("<str:resource>/", views.ExportView.as_view(), name="resource"),
+]
@@ -0,0 +1,87 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.asgi import StreamingHttpResponse
+from export import streaming
+
+
+class ExportView(APIView):
+    """
+    Export view streaming every row of a resource as NDJSON
+    Allowed methods: GET
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, resource, format=None):
+        """
+        Stream the rows of a resource ordered by id, optionally filtered
+        with updated_since and id_after, gzip compressed when accepted
+        """
+
+        try:
+            if resource not in streaming.RESOURCES:
+                response = {
+                    "status": "404",
+                    "title": "Not Found",
+                    "detail": "The export resource was not found",
+                }
+                return Response(response, status=status.HTTP_404_NOT_FOUND)
+
+            params = request.query_params
+            updated_since = None
+            id_after = None
+            try:
+                if "updated_since" in params:
+                    updated_since = parse_datetime(params["updated_since"])
+                    if updated_since is None:
+                        raise ValueError
+                if "id_after" in params:
+                    id_after = int(params["id_after"])
+            except ValueError:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": "updated_since must be an ISO 8601 datetime"
+                    + " and id_after an integer",
+                }
+                return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                content = streaming.export_rows(
+                    resource, updated_since=updated_since, id_after=id_after
+                )
+            except streaming.ExportError as e:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": str(e),
+                }
+                return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+            accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+            gzip = streaming.accepts_gzip(accept_encoding)
+            if gzip:
+                content = streaming.gzip_stream(content)
+            if isinstance(request._request, ASGIRequest):
+                content = streaming.ThreadedStream(content)
+
+            response = StreamingHttpResponse(
+                content, content_type="application/x-ndjson"
+            )
+            response["Vary"] = "Accept-Encoding"
+            if gzip:
+                response["Content-Encoding"] = "gzip"
+            return response
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error exporting the resource",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from core import models
 
@@ -18,9 +17,5 @@ class ReplySerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-
-        created_by = get_user_model().objects.get(
-            id=representation["created_by"]
-        )
-        representation["created_by"] = created_by.username
+        representation["created_by"] = instance.created_by.username
         return representation
@@ -2,7 +2,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from core import models
+from core import conditional, models
 from reply import serializers
 
 
@@ -13,9 +13,9 @@ class ReplyDetail(APIView):
 
     def get(self, request, id, format=None):
         try:
-            reply = self.queryset.get(id=id)
-            serializer = self.serializer_class(reply)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.detail_response(
+                request, self.queryset, id, self.serializer_class
+            )
         except models.CommentReply.DoesNotExist:
             """Return a 404 response if the reply does not exist."""
             response = {
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TagConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "tag"
+
+    def ready(self):
+        from tag import signals  # noqa: F401
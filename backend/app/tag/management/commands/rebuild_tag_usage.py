@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from tag import usage
+
+
+class Command(BaseCommand):
+    help = "Recompute the tag usage counters from the video tags"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        corrected = usage.rebuild(options["database"])
+        self.stdout.write(f"Tag usage rebuilt, {corrected} rows corrected")
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from core import models
+from tag import usage
+
+
+@receiver(post_save, sender=models.VideoTag)
+def count_video_tag(sender, instance, created, using=None, **kwargs):
+    if created:
+        day = timezone.localdate(instance.created_at)
+        usage.record(instance.tag_id, day, 1, using)
+
+
+@receiver(post_delete, sender=models.VideoTag)
+def uncount_video_tag(sender, instance, using=None, **kwargs):
+    """Also called for the tags of deleted videos and deleted tags"""
+
+    day = timezone.localdate(instance.created_at)
+    usage.record(instance.tag_id, day, -1, using)
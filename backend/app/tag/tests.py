@@ -0,0 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import models
+from tag import usage
+
+
+class PopularTagApiTests(APITestCase):
+    """Test the popular tags API and the tag usage counters"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.videos = [
+            models.Video.objects.create(
+                title=f"Test Video {i}",
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=self.user,
+            )
+            for i in range(3)
+        ]
+        self.tags = {
+            name: models.Tag.objects.create(name=name)
+            for name in ("live", "music", "rock")
+        }
+        for video, names in zip(
+            self.videos, (["music"], ["music", "live"], ["music", "rock"])
+        ):
+            for name in names:
+                models.VideoTag.objects.create(
+                    video=video, tag=self.tags[name]
+                )
+
+    def popular(self, params=None):
+        cache.clear()
+        res = self.client.get(reverse("tag:popular"), params)
+        results = res.data.get("results", [])
+        return res, [(tag["tag"], tag["count"]) for tag in results]
+
+    def counts(self):
+        return dict(
+            models.TagUsage.objects.values_list("tag__name", "count")
+        )
+
+    def test_popular_tags(self):
+        """Test listing tags by number of videos"""
+        res, tags = self.popular({"limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(tags, [("music", 3), ("live", 1)])
+
+    def test_popular_tags_window(self):
+        """Test the 7 day window only counts recently added tags"""
+        old = timezone.localdate() - timedelta(days=7)
+        models.TagUsageDaily.objects.filter(tag=self.tags["music"]).update(
+            day=old
+        )
+
+        res, tags = self.popular({"window": "7d"})
+
+        self.assertEqual(tags, [("live", 1), ("rock", 1)])
+        self.assertEqual(self.popular()[1][0], ("music", 3))
+
+    def test_popular_tags_cached(self):
+        """Test the list is cached"""
+        url = reverse("tag:popular")
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_popular_tags_invalid(self):
+        """Test invalid windows and limits are rejected"""
+        res, _ = self.popular({"window": "30d"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res, _ = self.popular({"limit": "many"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_counters_follow_deletes(self):
+        """Test removing tags, videos and tags updates the counters"""
+        models.VideoTag.objects.filter(tag=self.tags["live"]).delete()
+        self.videos[0].delete()
+        self.tags["rock"].delete()
+
+        self.assertEqual(self.counts(), {"live": 0, "music": 2})
+        self.assertEqual(
+            models.TagUsageDaily.objects.get(tag=self.tags["music"]).count,
+            2,
+        )
+
+    def test_rebuild_corrects_drift(self):
+        """Test the rebuild command recomputes the counters"""
+        models.TagUsage.objects.filter(tag=self.tags["music"]).update(
+            count=10
+        )
+        models.TagUsageDaily.objects.filter(tag=self.tags["live"]).delete()
+        models.TagUsageDaily.objects.create(
+            tag=self.tags["rock"],
+            day=timezone.localdate() - timedelta(days=usage.RETENTION_DAYS),
+            count=1,
+        )
+        out = StringIO()
+
+        call_command("rebuild_tag_usage", stdout=out)
+
+        self.assertIn("2 rows corrected", out.getvalue())
+        self.assertEqual(self.counts(), {"live": 1, "music": 3, "rock": 1})
+        self.assertEqual(
+            set(
+                models.TagUsageDaily.objects.values_list(
+                    "tag__name", "count"
+                )
+            ),
+            {("live", 1), ("music", 3), ("rock", 1)},
+        )
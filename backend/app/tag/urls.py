@@ -0,0 +1,8 @@
+from rest_framework.urls import path
+from tag import views
+
+app_name = "tag"
+
+urlpatterns = (
+    path("popular/", views.PopularTagListView.as_view(), name="popular"),
+)
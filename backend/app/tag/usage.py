@@ -0,0 +1,151 @@
+"""
+Tag popularity counters.
+
+``tag_usage`` holds the number of videos of each tag and
+``tag_usage_daily`` the number of videos tagged on each of the last
+``RETENTION_DAYS`` days, bucketed by the day the tag was added. Both are
+updated in the transaction that adds or removes a video tag, so reading
+the top tags never aggregates ``video_tag``. ``rebuild`` recomputes them
+from ``video_tag`` to correct any drift.
+"""
+
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from core import models
+
+# Days of each window, None for all time
+WINDOWS = {"all": None, "7d": 7}
+RETENTION_DAYS = 30
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CACHE_TTL = 60
+CACHE_KEY = "tag:popular:{window}:{limit}"
+
+
+def record(tag_id, day, delta, using="default"):
+    """Add ``delta`` videos to the counters of a tag"""
+
+    _increment(models.TagUsage, {"tag_id": tag_id}, delta, using)
+    if day > timezone.localdate() - timedelta(days=RETENTION_DAYS):
+        keys = {"tag_id": tag_id, "day": day}
+        _increment(models.TagUsageDaily, keys, delta, using)
+
+
+def _increment(model, keys, delta, using):
+    rows = model.objects.using(using).filter(**keys)
+    if rows.update(count=F("count") + delta) or delta < 0:
+        # A missing row is not created by a decrement, whose tag may be
+        # being deleted, the rebuild corrects the difference if any
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            model.objects.using(using).create(count=delta, **keys)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(count=F("count") + delta)
+
+
+def popular(window="all", limit=DEFAULT_LIMIT):
+    """
+    Return up to ``limit`` ``(tag, count)`` pairs of the most used tags
+    over the window, most used first
+    """
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    key = CACHE_KEY.format(window=window, limit=limit)
+    results = cache.get(key)
+    if results is None:
+        results = _popular(WINDOWS[window], limit)
+        cache.set(key, results, CACHE_TTL)
+    return results
+
+
+def _popular(days, limit):
+    if days is None:
+        rows = (
+            models.TagUsage.objects.filter(count__gt=0)
+            .order_by("-count", "tag")
+            .values_list("tag__name", "count")
+        )
+    else:
+        since = timezone.localdate() - timedelta(days=days - 1)
+        rows = (
+            models.TagUsageDaily.objects.filter(day__gte=since)
+            .values("tag")
+            .annotate(total=Sum("count"))
+            .filter(total__gt=0)
+            .order_by("-total", "tag")
+            .values_list("tag__name", "total")
+        )
+    return list(rows[:limit])
+
+
+def rebuild(using="default"):
+    """
+    Recompute the counters from ``video_tag`` and drop the daily buckets
+    older than the retention. Return the number of rows corrected.
+    """
+
+    video_tags = models.VideoTag.objects.using(using)
+    usages = models.TagUsage.objects.using(using)
+    daily_usages = models.TagUsageDaily.objects.using(using)
+    since = timezone.localdate() - timedelta(days=RETENTION_DAYS - 1)
+
+    with transaction.atomic(using=using):
+        totals = {
+            (tag_id,): total
+            for tag_id, total in video_tags.values("tag")
+            .annotate(total=Count("id"))
+            .values_list("tag", "total")
+        }
+        corrected = _sync(usages, ("tag_id",), totals)
+
+        daily = {
+            (tag_id, day): total
+            for tag_id, day, total in video_tags.annotate(
+                day=TruncDate("created_at")
+            )
+            .filter(day__gte=since)
+            .values("tag", "day")
+            .annotate(total=Count("id"))
+            .values_list("tag", "day", "total")
+        }
+        corrected += _sync(
+            daily_usages.filter(day__gte=since), ("tag_id", "day"), daily
+        )
+        daily_usages.filter(day__lt=since).delete()
+
+    return corrected
+
+
+def _sync(rows, key_fields, counts):
+    """
+    Make the counts of the rows match ``counts``, a dict keyed by the
+    values of ``key_fields``. Return the number of rows changed.
+    """
+
+    stale = []
+    changed = []
+    for row in rows.iterator():
+        count = counts.pop(tuple(getattr(row, f) for f in key_fields), 0)
+        if not count:
+            stale.append(row.id)
+        elif row.count != count:
+            row.count = count
+            changed.append(row)
+
+    rows.filter(id__in=stale).delete()
+    rows.bulk_update(changed, ["count"], batch_size=1000)
+    rows.bulk_create(
+        [
+            rows.model(count=count, **dict(zip(key_fields, key)))
+            for key, count in counts.items()
+        ],
+        batch_size=1000,
+    )
+    return len(stale) + len(changed) + len(counts)
@@ -0,0 +1,57 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from tag import usage
+
+
+class PopularTagListView(APIView):
+    """
+    Tag view for listing the most used tags
+    Allowed methods: GET
+    """
+
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, format=None):
+        """
+        List the most used tags over the window parameter, all time or
+        the last 7 days, with the number of videos of each
+        """
+
+        try:
+            params = request.query_params
+            window = params.get("window", "all")
+            try:
+                limit = int(params.get("limit", usage.DEFAULT_LIMIT))
+            except ValueError:
+                limit = None
+            if window not in usage.WINDOWS or limit is None:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": "window must be one of "
+                    + ", ".join(usage.WINDOWS)
+                    + " and limit an integer",
+                }
+                return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+            tags = usage.popular(window, limit)
+            response = {
+                "window": window,
+                "results": [
+                    {"tag": tag, "count": count} for tag, count in tags
+                ],
+            }
+            return Response(response, status=status.HTTP_200_OK)
+        except Exception:
+            """Return 500 Internal Server Error if there was an error"""
+
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error listing the popular tags",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -0,0 +1,181 @@
+"""
+Username prefix lookups for the user picker.
+
+Usernames are matched and ordered by their uppercased form compared by
+code point, i.e. the "C" collation, then by id. PostgreSQL answers them
+from a btree index on ``(UPPER(username) COLLATE "C", id)``, which the
+``LIKE 'X%'`` of the prefix scans as a range whatever the collation of
+the database, in the order of the results, so the scan stops at the
+limit. Other databases use an in-process sorted array of usernames in
+the same order, kept up to date from the user signals and refreshed with
+the users created by other processes. Results of each prefix are cached
+for a few seconds.
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+from time import monotonic
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.functions import Collate, Upper
+
+PREFIX_RE = re.compile(r"^[\w.@+-]+$")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+CACHE_TTL = 30
+CACHE_KEY = "user:autocomplete:{limit}:{prefix}"
+
+
+class PostgreSQLUsernameIndex:
+    """Prefix lookups answered by a "C" collation expression index"""
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    def install(self):
+        table = get_user_model()._meta.db_table
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_username_upper_idx"
+                f' ON {table} ((UPPER(username::text) COLLATE "C"), id)'
+            )
+            # Indexes of earlier versions: trigrams, unused by prefix
+            # scans, and pattern ops, unused by the order of the results
+            cursor.execute(f"DROP INDEX IF EXISTS {table}_username_trgm_idx")
+            cursor.execute(
+                f"DROP INDEX IF EXISTS {table}_username_prefix_idx"
+            )
+
+    def search(self, prefix, limit):
+        users = get_user_model().objects.using(self.using)
+        return list(
+            users.annotate(key=Collate(Upper("username"), "C"))
+            .filter(key__startswith=prefix.upper())
+            .order_by("key", "id")
+            .values_list("id", "username")[:limit]
+        )
+
+
+class PrefixIndex:
+    """
+    Sorted array of ``(uppercased username, id, username)`` entries.
+
+    The array is loaded on first use, then users created by other
+    processes are appended every ``refresh_interval`` seconds and the
+    whole array is reloaded every ``reload_interval`` seconds to pick up
+    their renames and deletions.
+    """
+
+    refresh_interval = 5
+    reload_interval = 600
+
+    def __init__(self, using="default"):
+        self.using = using
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries = []
+            self.keys = {}
+            self.max_id = 0
+            self.loaded_at = None
+            self.refreshed_at = None
+
+    def install(self):
+        pass
+
+    def search(self, prefix, limit):
+        self._ensure_fresh()
+        prefix = prefix.upper()
+
+        with self.lock:
+            start = bisect_left(self.entries, (prefix,))
+            end = start + limit
+            results = []
+            for key, user_id, username in self.entries[start:end]:
+                if not key.startswith(prefix):
+                    break
+                results.append((user_id, username))
+            return results
+
+    def add(self, user_id, username):
+        with self.lock:
+            self._remove(user_id)
+            key = username.upper()
+            insort(self.entries, (key, user_id, username))
+            self.keys[user_id] = key
+            self.max_id = max(self.max_id, user_id)
+
+    def remove(self, user_id):
+        with self.lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        key = self.keys.pop(user_id, None)
+        if key is not None:
+            index = bisect_left(self.entries, (key, user_id))
+            del self.entries[index]
+
+    def _ensure_fresh(self):
+        now = monotonic()
+        loaded_at = self.loaded_at
+        if loaded_at is None or now - loaded_at > self.reload_interval:
+            self._load(now)
+        elif now - self.refreshed_at > self.refresh_interval:
+            self._refresh(now)
+
+    def _users(self):
+        users = get_user_model().objects.using(self.using)
+        return users.values_list("id", "username")
+
+    def _load(self, now):
+        rows = self._users().order_by("id")
+        entries = sorted(
+            (username.upper(), user_id, username)
+            for user_id, username in rows
+        )
+        with self.lock:
+            self.entries = entries
+            self.keys = {user_id: key for key, user_id, _ in entries}
+            self.max_id = max(self.keys, default=0)
+            self.loaded_at = self.refreshed_at = now
+
+    def _refresh(self, now):
+        rows = self._users().filter(id__gt=self.max_id)
+        for user_id, username in rows:
+            self.add(user_id, username)
+        self.refreshed_at = now
+
+
+_indexes = {}
+
+
+def get_index(using="default"):
+    if using not in _indexes:
+        if connections[using].vendor == "postgresql":
+            _indexes[using] = PostgreSQLUsernameIndex(using)
+        else:
+            _indexes[using] = PrefixIndex(using)
+    return _indexes[using]
+
+
+def autocomplete(prefix, limit=DEFAULT_LIMIT):
+    """
+    Return up to ``limit`` ``(id, username)`` pairs of the users whose
+    username starts with ``prefix``, case-insensitively, in the order of
+    their uppercased usernames then ids
+    """
+
+    if not PREFIX_RE.match(prefix):
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    key = CACHE_KEY.format(limit=limit, prefix=prefix.lower())
+    results = cache.get(key)
+    if results is None:
+        results = get_index().search(prefix, limit)
+        cache.set(key, results, CACHE_TTL)
+    return results
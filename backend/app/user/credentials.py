@@ -0,0 +1,102 @@
+"""
+Credential checks of the async token endpoint, off the event loop.
+
+Checking a password runs PBKDF2 for about 100ms, which would block the
+event loop of an ASGI worker. The checks are run in a pool of
+``settings.LOGIN_POOL_SIZE`` threads instead; hashlib releases the GIL
+while hashing, so the threads hash in parallel. At most
+``settings.LOGIN_QUEUE_DEPTH`` checks wait for a thread, and further
+checks are rejected at once with ``PoolSaturated`` rather than queued
+behind them, so that a login storm is answered with fast 503s instead
+of timeouts.
+"""
+
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class CredentialPool:
+    """Bounded pool of threads running credential checks"""
+
+    def __init__(self, size, queue_depth):
+        self.size = size
+        self.limit = size + queue_depth
+        self.executor = ThreadPoolExecutor(size, thread_name_prefix="login")
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.counts = Counter()
+
+    async def run(self, func, *args):
+        """
+        Return the result of ``func(*args)`` run in the pool, raising
+        ``PoolSaturated`` when the queue is full
+        """
+
+        with self.lock:
+            if self.in_flight >= self.limit:
+                self.counts["rejected"] += 1
+                raise PoolSaturated
+            self.in_flight += 1
+            self.counts["accepted"] += 1
+
+        future = self.executor.submit(_run, func, *args)
+        # Released when the check ends, even if the request is cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": self.size,
+                "in_flight": self.in_flight,
+                "accepted": self.counts["accepted"],
+                "rejected": self.counts["rejected"],
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def _release(self, future):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def _run(func, *args):
+    # Connections of the pool threads follow CONN_MAX_AGE like requests
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CredentialPool(
+                settings.LOGIN_POOL_SIZE, settings.LOGIN_QUEUE_DEPTH
+            )
+        return _pool
+
+
+def reset_pool():
+    """Shut the pool down, to be created again from the settings"""
+
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
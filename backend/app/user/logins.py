@@ -0,0 +1,134 @@
+"""
+Last login times, written in batches.
+
+Issuing a token records the login time of the user in a buffer of the
+process instead of updating the user row at once. The buffer keeps the
+latest time of each user, and is written in one ``UPDATE`` at most
+``settings.LAST_LOGIN_FLUSH_INTERVAL`` seconds after the first login it
+holds, or as soon as it holds ``MAX_PENDING`` users. Times are only
+written over earlier ones, so batches of several processes written out
+of order keep the latest login of each user.
+
+Logins of a failed flush are put back in the buffer and written with
+the next one, and the buffer is flushed when the process exits, so
+logins are only lost if the process dies without exiting, e.g. when it
+is killed, or if the database is unreachable as it exits.
+"""
+
+import atexit
+import threading
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+MAX_PENDING = 1000
+
+_pending = {}
+_lock = threading.Lock()
+_timer = None
+
+
+def record(user, using="default"):
+    """Record a login of the user now, as ``update_last_login`` does"""
+
+    user.last_login = timezone.now()
+    with _lock:
+        pending = _pending.setdefault(using, {})
+        last_login = pending.get(user.pk)
+        if last_login is None or last_login < user.last_login:
+            pending[user.pk] = user.last_login
+        full = len(pending) >= MAX_PENDING
+        if not full:
+            _schedule()
+    if full:
+        flush()
+
+
+def flush(retry=True):
+    """Write the pending logins, put back to retry when they fail"""
+
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = None
+        batches = dict(_pending)
+        _pending.clear()
+
+    for using, logins in batches.items():
+        try:
+            _write(using, logins)
+        except DatabaseError:
+            if retry:
+                _requeue(using, logins)
+
+
+def pending(using="default"):
+    with _lock:
+        return dict(_pending.get(using, {}))
+
+
+def reset():
+    """Drop the pending logins, e.g. in tests"""
+
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = None
+        _pending.clear()
+
+
+def _schedule():
+    """Arm the flush timer, with the lock held"""
+
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(settings.LAST_LOGIN_FLUSH_INTERVAL, _flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _flush():
+    try:
+        flush()
+    finally:
+        # Opened by this thread only
+        connections.close_all()
+
+
+def _write(using, logins):
+    users = get_user_model().objects.using(using)
+    users.filter(id__in=logins).update(
+        last_login=Case(
+            *(
+                When(
+                    Q(id=user_id)
+                    & (
+                        Q(last_login__isnull=True)
+                        | Q(last_login__lt=last_login)
+                    ),
+                    then=Value(last_login),
+                )
+                for user_id, last_login in logins.items()
+            ),
+            default=F("last_login"),
+        )
+    )
+
+
+def _requeue(using, logins):
+    """Put back the logins of a failed flush, written with the next one"""
+
+    with _lock:
+        pending = _pending.setdefault(using, {})
+        for user_id, last_login in logins.items():
+            if user_id not in pending or pending[user_id] < last_login:
+                pending[user_id] = last_login
+        _schedule()
+
+
+# No timer would be left to retry at exit
+atexit.register(flush, retry=False)
@@ -0,0 +1,79 @@
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.authentication import TokenUserAuthentication
+from core.views import CacheStatsView
+from user.serializers import PairTokenSerializer
+from user.views import UserProfileView
+
+
+class Command(BaseCommand):
+    """
+    Measure the throughput of authenticated requests when the user is read
+    on every request against the token user built from the claims. The
+    user is seeded inside a transaction that is rolled back, so the
+    database is left untouched.
+    """
+
+    help = "Benchmark JWT authentication with and without token users"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create(
+                first_name="Bench",
+                last_name="User",
+                username="benchuser",
+                email="benchuser@example.com",
+                password="!",
+            )
+            user.is_staff = True
+            user.save()
+            token = PairTokenSerializer.get_token(user).access_token
+            header = f"Bearer {token}"
+
+            views = (
+                # Only uses the claims
+                ("cache stats", CacheStatsView),
+                # Reads the other fields of the user
+                ("profile", UserProfileView),
+            )
+            modes = (
+                ("user read", JWTAuthentication),
+                ("token user", TokenUserAuthentication),
+            )
+            for name, view_class in views:
+                for mode, authentication_class in modes:
+                    view = view_class.as_view(
+                        authentication_classes=[authentication_class]
+                    )
+                    self._report(
+                        f"{name}, {mode}", view, header, options["requests"]
+                    )
+            transaction.set_rollback(True)
+
+    def _report(self, name, view, header, count):
+        factory = APIRequestFactory()
+
+        def request():
+            response = view(factory.get("/", HTTP_AUTHORIZATION=header))
+            assert response.status_code == 200, response.status_code
+
+        # Warm the caches
+        request()
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            for _ in range(count):
+                request()
+            elapsed = perf_counter() - start
+
+        self.stdout.write(
+            f"{name}: {count / elapsed:.0f} req/s,"
+            f" {len(queries) / count:.2f} queries/request"
+        )
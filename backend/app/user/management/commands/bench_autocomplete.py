@@ -0,0 +1,89 @@
+import random
+import string
+from statistics import quantiles
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from user import autocomplete
+
+
+class Command(BaseCommand):
+    """
+    Measure username autocomplete latency against the username__icontains
+    filter of the user list. Users are seeded inside a transaction that is
+    rolled back, so the database is left untouched.
+    """
+
+    help = "Benchmark username autocomplete over seeded users"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        alphabet = string.ascii_lowercase + string.digits
+        queries = [
+            "".join(rng.choices(alphabet, k=rng.randint(1, 4)))
+            for _ in range(options["queries"])
+        ]
+
+        with transaction.atomic():
+            self._seed(rng, alphabet, options["users"], options["batch_size"])
+
+            index = autocomplete.get_index()
+            start = perf_counter()
+            index.search("a", autocomplete.DEFAULT_LIMIT)
+            self.stdout.write(f"Index ready in {perf_counter() - start:.2f}s")
+
+            self._report(
+                "autocomplete",
+                queries,
+                lambda q: index.search(q, autocomplete.DEFAULT_LIMIT),
+            )
+            self._report("icontains", queries, self._icontains)
+            transaction.set_rollback(True)
+
+        if isinstance(index, autocomplete.PrefixIndex):
+            index.reset()
+
+    def _seed(self, rng, alphabet, count, batch_size):
+        users = get_user_model().objects
+        start = perf_counter()
+        for offset in range(0, count, batch_size):
+            users.bulk_create(
+                get_user_model()(
+                    first_name="Bench",
+                    last_name="User",
+                    username=f"{name}{offset + i}",
+                    email=f"bench{offset + i}@example.com",
+                    password="!",
+                )
+                for i, name in enumerate(
+                    "".join(rng.choices(alphabet, k=rng.randint(3, 10)))
+                    for _ in range(min(batch_size, count - offset))
+                )
+            )
+        self.stdout.write(
+            f"Seeded {count} users in {perf_counter() - start:.1f}s"
+        )
+
+    def _icontains(self, query):
+        users = get_user_model().objects.filter(username__icontains=query)
+        users = users.order_by("-id").values_list("id", "username")
+        list(users[: autocomplete.DEFAULT_LIMIT])
+
+    def _report(self, name, queries, func):
+        timings = []
+        for query in queries:
+            start = perf_counter()
+            func(query)
+            timings.append((perf_counter() - start) * 1000)
+
+        cuts = quantiles(timings, n=100)
+        self.stdout.write(
+            f"{name}: p50 {cuts[49]:.3f}ms, p99 {cuts[98]:.3f}ms,"
+            f" max {max(timings):.3f}ms"
+        )
@@ -0,0 +1,69 @@
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from user import credentials
+
+
+class Command(BaseCommand):
+    """
+    Measure the password checks per second of the credential pool of the
+    async token endpoint for several pool sizes. Checks are submitted
+    all at once, as in a login storm; the user is built in memory, so
+    the database is not touched.
+    """
+
+    help = "Benchmark login throughput against the credential pool size"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=64)
+        parser.add_argument(
+            "--pool-sizes", type=lambda value: list(map(int, value.split(",")))
+        )
+        parser.add_argument(
+            "--queue-depth",
+            type=int,
+            help="Checks waiting for a thread, default all of them",
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model()(username="benchuser")
+        user.set_password("benchpass")
+        count = options["logins"]
+        queue_depth = options["queue_depth"]
+        if queue_depth is None:
+            queue_depth = count
+
+        for size in options["pool_sizes"] or [1, 2, 4, 8]:
+            pool = credentials.CredentialPool(size, queue_depth)
+            try:
+                elapsed, timings, rejected = asyncio.run(
+                    self._storm(pool, user.check_password, count)
+                )
+            finally:
+                pool.shutdown()
+
+            accepted = count - rejected
+            cuts = quantiles(timings, n=100) if len(timings) > 1 else [0] * 99
+            self.stdout.write(
+                f"pool {size}: {accepted / elapsed:.1f} logins/s,"
+                f" p50 {cuts[49]:.0f}ms, p99 {cuts[98]:.0f}ms,"
+                f" {rejected} rejected"
+            )
+
+    async def _storm(self, pool, check, count):
+        timings = []
+
+        async def login():
+            start = perf_counter()
+            try:
+                await pool.run(check, "benchpass")
+            except credentials.PoolSaturated:
+                return False
+            timings.append((perf_counter() - start) * 1000)
+            return True
+
+        start = perf_counter()
+        results = await asyncio.gather(*(login() for _ in range(count)))
+        return perf_counter() - start, timings, results.count(False)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core import revocation
+
+
+class Command(BaseCommand):
+    help = "Delete the revoked refresh tokens that have expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        deleted = revocation.prune(options["database"])
+        self.stdout.write(f"{deleted} expired revoked tokens deleted")
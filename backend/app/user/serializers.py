@@ -1,15 +1,35 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.serializers import (
     TokenObtainPairSerializer,
     TokenRefreshSerializer,
 )
-from core import models
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import models, revocation
+from user import logins
 
 
 class PairTokenSerializer(TokenObtainPairSerializer):
     """Pair token serializer"""
 
+    @classmethod
+    def get_token(cls, user):
+        """Token with the claims the token user is built from"""
+
+        token = super().get_token(user)
+        for claim in models.TokenUser.CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def validate(self, attrs):
+        """Record the login, as UPDATE_LAST_LOGIN does, in a batch"""
+
+        data = super().validate(attrs)
+        logins.record(self.user)
+        return data
+
     def to_representation(self, instance):
         """Custom representation of the token"""
 
@@ -26,6 +46,14 @@ class PairTokenSerializer(TokenObtainPairSerializer):
 class RefreshTokenSerializer(TokenRefreshSerializer):
     """Refresh token serializer"""
 
+    def validate(self, attrs):
+        """Reject revoked refresh tokens"""
+
+        refresh = self.token_class(attrs["refresh"])
+        if revocation.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is revoked")
+        return super().validate(attrs)
+
     def to_representation(self, instance):
         """Custom representation of the token"""
 
@@ -38,6 +66,18 @@ class RefreshTokenSerializer(TokenRefreshSerializer):
         return representation
 
 
+class RevokeTokenSerializer(serializers.Serializer):
+    """Revoke token serializer"""
+
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        """Revoke the refresh token, raising when it is not valid"""
+
+        revocation.revoke(RefreshToken(attrs["refresh"]))
+        return {}
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer"""
 
@@ -88,7 +128,7 @@ class UserVideoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Video
-        fields = "__all__"
+        exclude = ("updated_at",)
         read_only_fields = ("id",)
 
     def to_representation(self, instance):
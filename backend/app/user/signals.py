@@ -0,0 +1,31 @@
+from functools import partial
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import models
+from user import autocomplete
+
+
+def install_autocomplete(sender, using, **kwargs):
+    autocomplete.get_index(using).install()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_save, sender=models.TokenUser)
+def index_username(sender, instance, using=None, **kwargs):
+    """Add the username to the in-process index once committed"""
+
+    index = autocomplete.get_index(using)
+    if isinstance(index, autocomplete.PrefixIndex):
+        transaction.on_commit(
+            partial(index.add, instance.id, instance.username), using=using
+        )
+
+
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_delete, sender=models.TokenUser)
+def unindex_username(sender, instance, using=None, **kwargs):
+    index = autocomplete.get_index(using)
+    if isinstance(index, autocomplete.PrefixIndex):
+        transaction.on_commit(partial(index.remove, instance.id), using=using)
@@ -1,8 +1,19 @@
+import importlib
+import threading
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from core import models
+from user import autocomplete, credentials, logins
 
 format = "json"
 
@@ -10,6 +21,9 @@ format = "json"
 class PublicUserApiTests(APITestCase):
     """Test the users API (public)"""
 
+    def tearDown(self):
+        logins.reset()
+
     def test_register_valid_user_success(self):
         """Test registering user with valid payload is successful"""
         url = reverse("user:list")
@@ -282,3 +296,286 @@ class PrivateUserApiTests(APITestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(data), 1)
+
+
+class UserAutocompleteApiTests(APITestCase):
+    """Test the username autocomplete API"""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.get_index().reset()
+        for username in ("alice", "Alicia", "albert", "bob"):
+            get_user_model().objects.create(
+                first_name="test",
+                last_name="name",
+                email=f"{username}@example.com",
+                username=username,
+                password="testpass123",
+            )
+
+    def search(self, params):
+        return self.client.get(reverse("user:autocomplete"), params)
+
+    def test_autocomplete_prefix(self):
+        """Test usernames are matched by prefix, case-insensitively"""
+        res = self.search({"q": "ALI"})
+        usernames = [user["username"] for user in res.data["results"]]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(usernames, ["alice", "Alicia"])
+
+    def test_autocomplete_order(self):
+        """Test results are ordered by uppercased username, then id"""
+        for username in ("al_x", "ALICE"):
+            get_user_model().objects.create(
+                first_name="test",
+                last_name="name",
+                email=f"{username}@example.org",
+                username=username,
+                password="testpass123",
+            )
+
+        res = self.search({"q": "al"})
+        usernames = [user["username"] for user in res.data["results"]]
+
+        self.assertEqual(
+            usernames, ["albert", "alice", "ALICE", "Alicia", "al_x"]
+        )
+
+    def test_autocomplete_limit(self):
+        """Test the number of results is capped"""
+        res = self.search({"q": "al", "limit": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        res = self.search({"q": "a", "limit": 1000})
+        self.assertEqual(len(res.data["results"]), 3)
+
+        res = self.search({"q": "a", "limit": "many"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_invalid_prefix(self):
+        """Test prefixes that cannot start a username return nothing"""
+        res = self.search({"q": "a%"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [])
+
+    def test_autocomplete_cached(self):
+        """Test repeated prefixes are served from the cache"""
+        self.search({"q": "al"})
+
+        with self.assertNumQueries(0):
+            res = self.search({"q": "AL"})
+
+        self.assertEqual(len(res.data["results"]), 3)
+
+    def test_autocomplete_follows_changes(self):
+        """Test committed creations, renames and deletions are indexed"""
+        self.search({"q": "b"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = get_user_model().objects.get(username="bob")
+            user.username = "bobby"
+            user.save()
+            get_user_model().objects.get(username="albert").delete()
+            get_user_model().objects.create(
+                first_name="test",
+                last_name="name",
+                email="bea@example.com",
+                username="bea",
+                password="testpass123",
+            )
+        cache.clear()
+
+        res = self.search({"q": "b"})
+        usernames = [user["username"] for user in res.data["results"]]
+        self.assertEqual(usernames, ["bea", "bobby"])
+
+        res = self.search({"q": "alb"})
+        self.assertEqual(res.data["results"], [])
+
+
+class LastLoginTests(APITestCase):
+    """Test last logins are written in batches"""
+
+    def setUp(self):
+        logins.reset()
+        self.users = [
+            get_user_model().objects.create(
+                first_name="test",
+                last_name="name",
+                email=f"test{i}@example.com",
+                username=f"testuser{i}",
+                password="testpass123",
+            )
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        logins.reset()
+
+    def login(self, user):
+        payload = {"username": user.username, "password": "testpass123"}
+        res = self.client.post(reverse("user:pair-token"), payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def last_login(self, user):
+        user.refresh_from_db(fields=["last_login"])
+        return user.last_login
+
+    def test_written_on_flush(self):
+        """Test logins are buffered and written together"""
+        for user in self.users:
+            self.login(user)
+        self.assertIsNone(self.last_login(self.users[0]))
+
+        with self.assertNumQueries(1):
+            logins.flush()
+
+        pending = [self.last_login(user) for user in self.users]
+        self.assertTrue(all(pending))
+        self.assertEqual(logins.pending(), {})
+
+    def test_coalesced(self):
+        """Test repeated logins of a user keep the latest"""
+        self.login(self.users[0])
+        first = logins.pending()[self.users[0].id]
+        self.login(self.users[0])
+
+        pending = logins.pending()
+        self.assertEqual(list(pending), [self.users[0].id])
+        self.assertGreater(pending[self.users[0].id], first)
+
+    def test_later_login_kept(self):
+        """Test earlier logins of a batch do not overwrite later ones"""
+        later = timezone.now() + timedelta(hours=1)
+        get_user_model().objects.filter(id=self.users[0].id).update(
+            last_login=later
+        )
+        self.login(self.users[0])
+
+        logins.flush()
+
+        self.assertEqual(self.last_login(self.users[0]), later)
+
+    def test_flush_interval(self):
+        """Test a flush is scheduled within the interval of a login"""
+        with mock.patch.object(logins.threading, "Timer") as timer:
+            self.login(self.users[0])
+            self.login(self.users[1])
+
+        timer.assert_called_once_with(
+            settings.LAST_LOGIN_FLUSH_INTERVAL, logins._flush
+        )
+        timer.return_value.start.assert_called_once()
+
+    def test_failed_flush_retried(self):
+        """Test logins of a failed flush are written by the next timer"""
+        self.login(self.users[0])
+        with mock.patch.object(
+            logins, "_write", side_effect=DatabaseError
+        ), mock.patch.object(logins.threading, "Timer") as timer:
+            logins.flush()
+
+        self.assertIn(self.users[0].id, logins.pending())
+        timer.assert_called_once_with(
+            settings.LAST_LOGIN_FLUSH_INTERVAL, logins._flush
+        )
+        timer.return_value.start.assert_called_once()
+
+    def test_flushed_at_exit(self):
+        """Test pending logins are flushed, without retry, at exit"""
+        with mock.patch("atexit.register") as register:
+            importlib.reload(logins)
+        register.assert_called_once_with(logins.flush, retry=False)
+
+        self.login(self.users[0])
+        with mock.patch.object(
+            logins, "_write", side_effect=DatabaseError
+        ), mock.patch.object(logins.threading, "Timer") as timer:
+            logins.flush(retry=False)
+
+        timer.assert_not_called()
+        self.assertEqual(logins.pending(), {})
+
+    def test_full_buffer(self):
+        """Test full buffers are written at once"""
+        with mock.patch.object(logins, "MAX_PENDING", 2):
+            for user in self.users:
+                self.login(user)
+
+        self.assertEqual(logins.pending(), {})
+        self.assertIsNotNone(self.last_login(self.users[1]))
+
+
+class AsyncPairTokenTests(TransactionTestCase):
+    """Test the token endpoint checking credentials in the pool"""
+
+    def setUp(self):
+        credentials.reset_pool()
+        logins.reset()
+        self.user = get_user_model().objects.create(
+            first_name="test",
+            last_name="name",
+            email="test@example.com",
+            username="testuser",
+            password="testpass123",
+        )
+        self.url = reverse("user:async-pair-token")
+
+    def tearDown(self):
+        credentials.reset_pool()
+        logins.reset()
+
+    def login(self, password="testpass123"):
+        payload = {"username": "testuser", "password": password}
+        return self.client.post(
+            self.url, payload, content_type="application/json"
+        )
+
+    def test_login(self):
+        """Test valid credentials get a pair of tokens"""
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("access", res.json())
+        self.assertIn("refresh", res.json())
+        self.assertIn(self.user.id, logins.pending())
+
+    def test_invalid_credentials(self):
+        """Test invalid credentials and payloads are refused"""
+        res = self.login("wrongpass")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("detail", res.json())
+
+        res = self.client.post(
+            self.url, {"username": "testuser"}, content_type="application/json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("password", res.json())
+
+        res = self.client.post(
+            self.url, "{", content_type="application/json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOGIN_POOL_SIZE=1, LOGIN_QUEUE_DEPTH=0)
+    def test_saturated(self):
+        """Test logins are refused at once when the pool is saturated"""
+        pool = credentials.get_pool()
+        release = threading.Event()
+        busy = threading.Thread(
+            target=async_to_sync(pool.run), args=(release.wait,)
+        )
+        busy.start()
+        while pool.stats()["in_flight"] == 0:
+            release.wait(0.01)
+
+        res = self.login()
+        release.set()
+        busy.join()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertEqual(pool.stats()["rejected"], 1)
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
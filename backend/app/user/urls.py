@@ -5,12 +5,27 @@ app_name = "user"
 
 urlpatterns = (
     path("token/", views.PairTokenView.as_view(), name="pair-token"),
+    path(
+        "token/async/",
+        views.AsyncPairTokenView.as_view(),
+        name="async-pair-token",
+    ),
     path(
         "token/refresh/",
         views.RefreshTokenView.as_view(),
         name="refresh-token",
     ),
+    path(
+        "token/revoke/",
+        views.RevokeTokenView.as_view(),
+        name="revoke-token",
+    ),
     path("", views.UserListView.as_view(), name="list"),
+    path(
+        "autocomplete/",
+        views.UserAutocompleteView.as_view(),
+        name="autocomplete",
+    ),
     path("<int:user_id>/", views.UserDetailView.as_view(), name="detail"),
     path(
         "<int:user_id>/videos/",
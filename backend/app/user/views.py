@@ -1,16 +1,21 @@
+import json
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
 from django.urls import reverse
+from django.views import View
 from rest_framework import permissions, status
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
+    TokenViewBase,
 )
-from core import models
-from user import serializers
+from core import conditional, models
+from user import autocomplete, credentials, serializers
 
 
 def user_detail_url(user_id):
@@ -28,6 +33,74 @@ class PairTokenView(TokenObtainPairView):
     serializer_class = serializers.PairTokenSerializer
 
 
+class AsyncPairTokenView(View):
+    """
+    Pair token view checking the credentials in the credential pool,
+    answering 503 when the pool is saturated
+    Allowed methods: POST
+    """
+
+    serializer_class = serializers.PairTokenSerializer
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, format=None):
+        """Check the credentials and issue a pair of tokens"""
+
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": "The request body is not valid JSON",
+                }
+                return JsonResponse(
+                    response, status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            data = request.POST
+
+        try:
+            tokens = await credentials.get_pool().run(
+                _obtain_tokens, self.serializer_class, data
+            )
+            return JsonResponse(tokens, status=status.HTTP_200_OK)
+        except credentials.PoolSaturated:
+            response = {
+                "status": "503",
+                "title": "Service Unavailable",
+                "detail": "Too many logins in progress, retry shortly",
+            }
+            return JsonResponse(
+                response,
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except APIException as error:
+            # As rendered by the exception handler of the sync view
+            response = error.detail
+            if not isinstance(response, (dict, list)):
+                response = {"detail": response}
+            return JsonResponse(
+                response, status=error.status_code, safe=False
+            )
+
+
+def _obtain_tokens(serializer_class, data):
+    serializer = serializer_class(data=data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError as error:
+        raise InvalidToken(error.args[0])
+    return serializer.validated_data
+
+
 class RefreshTokenView(TokenRefreshView):
     """
     Refresh token view
@@ -37,6 +110,15 @@ class RefreshTokenView(TokenRefreshView):
     serializer_class = serializers.RefreshTokenSerializer
 
 
+class RevokeTokenView(TokenViewBase):
+    """
+    Revoke token view, for refresh tokens that leaked or were logged out
+    Allowed methods: POST
+    """
+
+    serializer_class = serializers.RevokeTokenSerializer
+
+
 class UserListView(APIView):
     """
     User view for listing and creating users
@@ -60,13 +142,19 @@ class UserListView(APIView):
             if "username" in params:
                 users = users.filter(username__icontains=params["username"])
 
+            validators = conditional.collection_validators(
+                request, users, authors=False
+            )
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
+
             paginator = self.pagination_class()
 
             page = paginator.paginate_queryset(users, request)
             serializer = self.serializer_class(page, many=True)
-            response = serializer.data
-
-            return Response(response, status=status.HTTP_200_OK)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.add_validators(response, validators)
         except NotFound:
             """Return 404 Not Found if there are no users"""
 
@@ -143,6 +231,53 @@ class UserListView(APIView):
             )
 
 
+class UserAutocompleteView(APIView):
+    """
+    User view for autocompleting usernames from a prefix
+    Allowed methods: GET
+    """
+
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, format=None):
+        """
+        List the users whose username starts with the q parameter
+        """
+
+        try:
+            params = request.query_params
+            try:
+                limit = int(params.get("limit", autocomplete.DEFAULT_LIMIT))
+            except ValueError:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": "The limit parameter must be an integer",
+                }
+                return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+            users = autocomplete.autocomplete(params.get("q", ""), limit)
+            response = {
+                "results": [
+                    {"id": user_id, "username": username}
+                    for user_id, username in users
+                ],
+            }
+            return Response(response, status=status.HTTP_200_OK)
+        except Exception:
+            """Return 500 Internal Server Error if there was an error"""
+
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error autocompleting the users",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class UserDetailView(APIView):
     """
     User view for retrieve, update and delete specific user
@@ -158,13 +293,14 @@ class UserDetailView(APIView):
 
         try:
             user = self.queryset.get(id=user_id)
-            serializer = self.serializer_class(user, many=False)
+            validators = conditional.object_validators(user)
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
 
-            response = serializer.data
-            return Response(
-                response,
-                status=status.HTTP_200_OK,
-            )
+            serializer = self.serializer_class(user, many=False)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.add_validators(response, validators)
         except get_user_model().DoesNotExist:
             """Return 404 Not Found if user not found"""
 
@@ -309,10 +445,14 @@ class UserProfileView(APIView):
                 return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
             user = request.user
-            serializer = self.serializer_class(user, many=False)
+            validators = conditional.object_validators(user)
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
 
-            response = serializer.data
-            return Response(response, status=status.HTTP_200_OK)
+            serializer = self.serializer_class(user, many=False)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.add_validators(response, validators)
         except Exception:
             """Return 500 status code if there was an error"""
 
@@ -408,13 +548,13 @@ class UserVideosView(APIView):
                 created_by__id=user_id
             ).order_by("-id")
 
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(videos, request)
-
-            serializer = self.serializer_class(page, many=True)
-            response = serializer.data
-
-            return Response(response, status=status.HTTP_200_OK)
+            return conditional.list_response(
+                request,
+                "user-videos",
+                videos,
+                lambda: self.list(request, videos),
+                scope=user_id,
+            )
         except get_user_model().DoesNotExist:
             """Return 404 status code if user not found"""
 
@@ -439,3 +579,14 @@ class UserVideosView(APIView):
                 response,
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    def list(self, request, videos):
+        """List a page of the videos of the user"""
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            videos.select_related("created_by"), request
+        )
+
+        serializer = self.serializer_class(page, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
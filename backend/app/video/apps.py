@@ -1,6 +1,14 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_migrate
 
 
 class VideoConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "video"
+
+    def ready(self):
+        from video import signals
+
+        post_migrate.connect(
+            signals.install_search, sender=apps.get_app_config("core")
+        )
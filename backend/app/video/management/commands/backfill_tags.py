@@ -0,0 +1,122 @@
+from collections import defaultdict
+from time import sleep
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from core import models, tags
+
+
+class Command(BaseCommand):
+    """
+    Move the tags of a database created before the tag dictionary, where
+    ``video_tag`` still has its varchar ``tag`` column, to integer tag
+    ids without locking the table:
+
+    1. add ``video_tag.tag_id`` as a nullable column referencing ``tag``,
+       and drop the not null constraint of ``video_tag.tag``, which the
+       site no longer writes:
+       ``ALTER TABLE video_tag ALTER COLUMN tag DROP NOT NULL``
+    2. deploy, and run this command while the site keeps serving, it can
+       be stopped and run again at any time. The site reads tags from
+       ``tag_id`` only: until the command reports nothing left, the rows
+       not backfilled yet are missing from the tags of their videos, in
+       responses, tag filters and search
+    3. once it reports nothing left, drop ``video_tag.tag`` and make
+       ``tag_id`` not null
+
+    Rows are handled in primary key order, one short transaction per
+    batch. Rows whose lowercased tag duplicates another tag of the same
+    video are deleted.
+    """
+
+    help = "Fill video_tag.tag_id from the legacy varchar tag column"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to wait between batches",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        connection = connections[using]
+        table = models.VideoTag._meta.db_table
+
+        with connection.cursor() as cursor:
+            columns = {
+                column.name: column
+                for column in connection.introspection.get_table_description(
+                    cursor, table
+                )
+            }
+        if not {"tag", "tag_id"} <= columns.keys():
+            self.stdout.write("No legacy tag column, nothing to backfill")
+            return
+        if not columns["tag"].null_ok:
+            raise CommandError(
+                f"{table}.tag is not null, new tags would fail to insert:"
+                f" run ALTER TABLE {table} ALTER COLUMN tag DROP NOT NULL"
+            )
+
+        last_id = 0
+        total = 0
+        while True:
+            with transaction.atomic(using=using):
+                rows = self._fetch(connection, table, last_id, options)
+                if not rows:
+                    break
+                self._backfill(connection, table, rows, using)
+
+            last_id = rows[-1][0]
+            total += len(rows)
+            self.stdout.write(f"Backfilled {total} rows, last id {last_id}")
+            sleep(options["pause"])
+
+        self.stdout.write(f"Done, {total} rows backfilled")
+
+    def _fetch(self, connection, table, last_id, options):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, video_id, tag FROM {table}"
+                " WHERE id > %s AND tag_id IS NULL ORDER BY id LIMIT %s",
+                [last_id, options["batch_size"]],
+            )
+            return cursor.fetchall()
+
+    def _backfill(self, connection, table, rows, using):
+        ids = tags.get_ids(
+            {name for _, _, name in rows}, create=True, using=using
+        )
+        video_ids = {video_id for _, video_id, _ in rows}
+        seen = set(
+            models.VideoTag.objects.using(using)
+            .filter(video_id__in=video_ids, tag_id__isnull=False)
+            .values_list("video_id", "tag_id")
+        )
+
+        updates = defaultdict(list)
+        duplicates = []
+        for row_id, video_id, name in rows:
+            tag_id = ids[tags.normalize(name)]
+            if (video_id, tag_id) in seen:
+                duplicates.append(row_id)
+            else:
+                seen.add((video_id, tag_id))
+                updates[tag_id].append(row_id)
+
+        with connection.cursor() as cursor:
+            for tag_id, row_ids in updates.items():
+                cursor.execute(
+                    f"UPDATE {table} SET tag_id = %s"
+                    f" WHERE id IN ({', '.join(['%s'] * len(row_ids))})",
+                    [tag_id] + row_ids,
+                )
+            if duplicates:
+                cursor.execute(
+                    f"DELETE FROM {table}"
+                    f" WHERE id IN ({', '.join(['%s'] * len(duplicates))})",
+                    duplicates,
+                )
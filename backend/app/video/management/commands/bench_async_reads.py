@@ -0,0 +1,138 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from types import ModuleType
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+from comment.views import ReplyView
+from core import models
+from user.views import UserVideosView
+from video import views
+
+UNCACHED = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+def urlconf():
+    """URLs of the read views"""
+
+    urls = ModuleType("bench_async_reads_urls")
+    urls.urlpatterns = [
+        path("videos/", views.VideoList.as_view()),
+        path("videos/<int:id>/", views.VideoDetailView.as_view()),
+        path("videos/<int:id>/comments/", views.CommentListView.as_view()),
+        path("comments/<int:id>/reply/", ReplyView.as_view()),
+        path("users/<int:user_id>/videos/", UserVideosView.as_view()),
+    ]
+    return urls
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the read endpoints served under WSGI and
+    under ASGI, where each request runs its view in a thread. Requests
+    go through the handlers of Django in this process, as a server would
+    pass them, from as many threads or tasks as the concurrency. Videos
+    are seeded for the run and deleted afterwards.
+    """
+
+    help = "Benchmark the read endpoints under WSGI and ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--videos", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument(
+            "--uncached",
+            action="store_true",
+            help="Read the database on every request",
+        )
+
+    def handle(self, *args, **options):
+        user, paths = self._seed(options["videos"])
+        count = options["requests"]
+        concurrency = options["concurrency"]
+        urls = [paths[i % len(paths)] for i in range(count)]
+
+        overrides = {
+            "ALLOWED_HOSTS": ["testserver"],
+            "ROOT_URLCONF": urlconf(),
+        }
+        if options["uncached"]:
+            overrides["CACHES"] = UNCACHED
+        try:
+            with override_settings(**overrides):
+                runs = (("wsgi", self._wsgi), ("asgi", self._asgi))
+                for name, run in runs:
+                    elapsed, failures = run(urls, concurrency)
+                    self.stdout.write(
+                        f"{name}: {count / elapsed:.0f} requests/s,"
+                        f" {failures} failed"
+                    )
+        finally:
+            user.delete()
+
+    def _seed(self, count):
+        user = get_user_model().objects.create(
+            first_name="Bench",
+            last_name="User",
+            username="benchasyncreads",
+            email="benchasyncreads@example.com",
+            password="benchpass",
+        )
+        videos = models.Video.objects.bulk_create(
+            models.Video(
+                title=f"Video {i}",
+                description="Description " * 10,
+                thumbnail=f"{i}.jpg",
+                file=f"{i}.mp4",
+                likes=i,
+                created_by=user,
+            )
+            for i in range(count)
+        )
+        comments = models.Comment.objects.bulk_create(
+            models.Comment(text=f"Comment {i}", video=video, created_by=user)
+            for i, video in enumerate(videos[:10])
+        )
+        models.CommentReply.objects.bulk_create(
+            models.CommentReply(
+                text=f"Reply {i}", comment=comment, created_by=user
+            )
+            for i, comment in enumerate(comments)
+        )
+
+        paths = ["/videos/", f"/users/{user.id}/videos/"]
+        for video in videos[:10]:
+            paths.append(f"/videos/{video.id}/")
+            paths.append(f"/videos/{video.id}/comments/")
+        for comment in comments:
+            paths.append(f"/comments/{comment.id}/reply/")
+        return user, paths
+
+    def _wsgi(self, urls, concurrency):
+        def get(url):
+            return Client().get(url).status_code
+
+        start = perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            codes = list(executor.map(get, urls))
+        return perf_counter() - start, sum(code != 200 for code in codes)
+
+    def _asgi(self, urls, concurrency):
+        async def storm():
+            client = AsyncClient()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def get(url):
+                async with slots:
+                    return (await client.get(url)).status_code
+
+            start = perf_counter()
+            codes = await asyncio.gather(*(get(url) for url in urls))
+            return perf_counter() - start, sum(code != 200 for code in codes)
+
+        return asyncio.run(storm())
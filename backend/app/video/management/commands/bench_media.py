@@ -0,0 +1,121 @@
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.views.static import serve
+from core import media
+
+
+class Command(BaseCommand):
+    """
+    Compare slow downloads of a media file streamed by the ASGI media
+    application with downloads served by Django in a pool of threads, as
+    a WSGI server serves them. Clients read at ``--rate`` bytes per
+    second; the file is written to a temporary directory.
+    """
+
+    help = "Benchmark concurrent slow media downloads under WSGI and ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--downloads", type=int, default=2000)
+        parser.add_argument("--size", type=int, default=1024 * 1024)
+        parser.add_argument("--rate", type=int, default=2 * 1024 * 1024)
+        parser.add_argument(
+            "--threads", type=int, default=40, help="Threads of the WSGI run"
+        )
+
+    def handle(self, *args, **options):
+        count = options["downloads"]
+        size = options["size"]
+        rate = options["rate"]
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "video.mp4"), "wb") as file:
+                file.write(os.urandom(size))
+
+            runs = (
+                ("wsgi", lambda: self._wsgi(root, count, rate, options)),
+                ("asgi", lambda: asyncio.run(self._asgi(root, count, rate))),
+            )
+            for name, run in runs:
+                self.peak = self.active = self.threads = 0
+                self.lock = threading.Lock()
+                start = perf_counter()
+                sizes = run()
+                elapsed = perf_counter() - start
+
+                complete = sizes.count(size)
+                self.stdout.write(
+                    f"{name}: {complete}/{count} downloads in {elapsed:.1f}s,"
+                    f" {self.peak} at once, {self.threads} threads"
+                )
+
+    def _started(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.threads = max(self.threads, threading.active_count())
+
+    def _finished(self):
+        with self.lock:
+            self.active -= 1
+
+    def _wsgi(self, root, count, rate, options):
+        factory = RequestFactory()
+
+        def download(_):
+            self._started()
+            response = serve(
+                factory.get("/media/video.mp4"), "video.mp4", root
+            )
+            response.block_size = media.CHUNK_SIZE
+            received = 0
+            for chunk in response:
+                received += len(chunk)
+                # The thread is held while the client reads
+                sleep(len(chunk) / rate)
+            response.close()
+            self._finished()
+            return received
+
+        with ThreadPoolExecutor(options["threads"]) as executor:
+            return list(executor.map(download, range(count)))
+
+    async def _asgi(self, root, count, rate):
+        app = media.MediaApp(None, root, "media/")
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/media/video.mp4",
+            "headers": [],
+        }
+
+        async def download():
+            received = 0
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if requested:
+                    # Until the client disconnects
+                    await asyncio.Future()
+                requested = True
+                return {"type": "http.request"}
+
+            async def send(message):
+                nonlocal received
+                body = message.get("body", b"")
+                received += len(body)
+                # Backpressure of the server while the client reads
+                await asyncio.sleep(len(body) / rate)
+
+            self._started()
+            await app(scope, receive, send)
+            self._finished()
+            return received
+
+        return await asyncio.gather(*(download() for _ in range(count)))
@@ -0,0 +1,100 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import models
+from video import search
+
+SYLLABLES = "ka lo mi nu re sa ti vo ze bu da fe gi ho ju".split()
+
+
+def vocabulary(rng, size):
+    """Synthetic words and the cumulative weights of a Zipf distribution"""
+
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    weights = list(accumulate(1 / rank for rank in range(1, size + 1)))
+    return words, weights
+
+
+class Command(BaseCommand):
+    """
+    Compare the indexed search with the title__icontains filter used by
+    the video list. Videos are seeded inside a transaction that is rolled
+    back, so the database is left untouched.
+    """
+
+    help = "Benchmark full-text search against icontains over seeded videos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--videos", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--vocabulary", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        words, weights = vocabulary(rng, options["vocabulary"])
+        with transaction.atomic():
+            self._seed(
+                rng, words, weights, options["videos"], options["batch_size"]
+            )
+            queries = rng.sample(words, options["queries"])
+
+            icontains = self._time(queries, self._icontains)
+            indexed = self._time(queries, self._search)
+
+            self.stdout.write(
+                f"{options['videos']} videos, {len(queries)} queries\n"
+                f"icontains: {icontains * 1000:.2f}ms/query\n"
+                f"search:    {indexed * 1000:.2f}ms/query\n"
+                f"speedup:   {icontains / indexed:.1f}x"
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, rng, words, weights, count, batch_size):
+        user = get_user_model().objects.create(
+            first_name="Bench",
+            last_name="User",
+            username="benchsearch",
+            email="benchsearch@example.com",
+            password="benchpass",
+        )
+        start = perf_counter()
+        for offset in range(0, count, batch_size):
+            models.Video.objects.bulk_create(
+                models.Video(
+                    title=" ".join(
+                        rng.choices(words, cum_weights=weights, k=5)
+                    ),
+                    description=" ".join(
+                        rng.choices(words, cum_weights=weights, k=30)
+                    ),
+                    thumbnail="bench.jpg",
+                    file="bench.mp4",
+                    created_by=user,
+                )
+                for _ in range(min(batch_size, count - offset))
+            )
+        search.get_backend().rebuild()
+        self.stdout.write(f"Seeded in {perf_counter() - start:.1f}s")
+
+    def _icontains(self, query):
+        videos = models.Video.objects.filter(title__icontains=query)
+        videos.count()
+        list(videos.order_by("-id").values_list("id", flat=True)[:100])
+
+    def _search(self, query):
+        search.get_backend().search(query, 101)
+
+    def _time(self, queries, func):
+        func(queries[0])
+        start = perf_counter()
+        for query in queries:
+            func(query)
+        return (perf_counter() - start) / len(queries)
@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models.fields.files import FieldFile
+from core import models
+from video import serializers
+
+
+class Command(BaseCommand):
+    """
+    Compare the per-row cost of the list serializers against the model
+    serializers. Rows are built in memory, the database is not touched.
+    """
+
+    help = "Micro-benchmark the video and comment list serializers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        created_at = datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        user = get_user_model()(id=1, username="benchuser")
+
+        videos = []
+        video_rows = []
+        comments = []
+        comment_rows = []
+        for i in range(rows):
+            video = models.Video(
+                id=i,
+                title=f"Video {i}",
+                description="Description " * 10,
+                thumbnail=f"{i}.jpg",
+                file=f"{i}.mp4",
+                likes=i,
+                created_by=user,
+                created_at=created_at,
+            )
+            videos.append(video)
+            video_rows.append(
+                tuple(
+                    _lookup(video, lookup)
+                    for lookup in serializers.VideoListSerializer.lookups
+                )
+            )
+            comment = models.Comment(
+                id=i,
+                text=f"Comment {i}",
+                video=video,
+                likes=i,
+                created_by=user,
+                created_at=created_at,
+            )
+            comments.append(comment)
+            comment_rows.append(
+                tuple(
+                    _lookup(comment, lookup)
+                    for lookup in serializers.CommentListSerializer.lookups
+                )
+            )
+
+        self._compare(
+            "video",
+            lambda: serializers.VideoSerializer(videos, many=True).data,
+            lambda: serializers.VideoListSerializer(video_rows).data,
+            rows,
+            repeat,
+        )
+        self._compare(
+            "comment",
+            lambda: serializers.CommentSerializer(comments, many=True).data,
+            lambda: serializers.CommentListSerializer(comment_rows).data,
+            rows,
+            repeat,
+        )
+
+    def _compare(self, name, slow, fast, rows, repeat):
+        slow_time = _per_row(slow, rows, repeat)
+        fast_time = _per_row(fast, rows, repeat)
+        self.stdout.write(
+            f"{name}: serializer {slow_time:.2f}us/row, "
+            f"fast path {fast_time:.2f}us/row, "
+            f"speedup {slow_time / fast_time:.1f}x"
+        )
+
+
+def _lookup(instance, lookup):
+    """Resolve an ORM lookup such as created_by__username on an instance"""
+
+    value = instance
+    for part in lookup.split("__"):
+        value = getattr(value, part)
+    return value.name if isinstance(value, FieldFile) else value
+
+
+def _per_row(func, rows, repeat):
+    func()
+    start = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - start) / (repeat * rows) * 1_000_000
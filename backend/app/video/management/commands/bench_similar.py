@@ -0,0 +1,102 @@
+import os
+import random
+import resource
+import tempfile
+from time import perf_counter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import models
+from video import search, similar
+from video.management.commands.bench_search import vocabulary
+
+
+class Command(BaseCommand):
+    """
+    Time a rebuild of the text-similarity neighbour table, an update with
+    new videos and neighbour lookups. Videos are seeded inside a
+    transaction that is rolled back and the table is written to a
+    temporary directory, so nothing is left behind.
+    """
+
+    help = "Benchmark the text-similarity neighbour table over seeded videos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--videos", type=int, default=1_000_000)
+        parser.add_argument("--new-videos", type=int, default=1000)
+        parser.add_argument("--lookups", type=int, default=10_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--vocabulary", type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        words, weights = vocabulary(rng, options["vocabulary"])
+        with transaction.atomic(), tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "neighbours.bin")
+            user = get_user_model().objects.create(
+                first_name="Bench",
+                last_name="User",
+                username="benchsimilar",
+                email="benchsimilar@example.com",
+                password="benchpass",
+            )
+            self._seed(rng, words, weights, user, options["videos"], options)
+
+            start = perf_counter()
+            similar.rebuild(path)
+            rebuild = perf_counter() - start
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            self._seed(
+                rng, words, weights, user, options["new_videos"], options
+            )
+            start = perf_counter()
+            similar.update(path)
+            update = perf_counter() - start
+
+            ids = list(models.Video.objects.values_list("id", flat=True))
+            table = similar.NeighbourTable(path)
+            table.lookup(ids[0])
+            timings = []
+            for video_id in rng.choices(ids, k=options["lookups"]):
+                start = perf_counter()
+                table.lookup(video_id)
+                timings.append(perf_counter() - start)
+            table.close()
+            timings.sort()
+
+            self.stdout.write(
+                f"{options['videos']} videos\n"
+                f"rebuild:     {rebuild:.1f}s, peak RSS {peak / 1024:.0f}MB,"
+                f" table {os.path.getsize(path) / 2**20:.0f}MB\n"
+                f"update:      {options['new_videos']} videos in"
+                f" {update:.1f}s\n"
+                f"lookup p50:  {timings[len(timings) // 2] * 1e6:.1f}us\n"
+                f"lookup p99:  {timings[len(timings) * 99 // 100] * 1e6:.1f}us"
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, rng, words, weights, user, count, options):
+        """Create videos and their search documents, used by updates"""
+
+        start = perf_counter()
+        batch_size = options["batch_size"]
+        for offset in range(0, count, batch_size):
+            videos = models.Video.objects.bulk_create(
+                models.Video(
+                    title=" ".join(
+                        rng.choices(words, cum_weights=weights, k=5)
+                    ),
+                    description=" ".join(
+                        rng.choices(words, cum_weights=weights, k=30)
+                    ),
+                    thumbnail="bench.jpg",
+                    file="bench.mp4",
+                    created_by=user,
+                )
+                for _ in range(min(batch_size, count - offset))
+            )
+            search.get_backend().index([video.id for video in videos])
+        self.stdout.write(
+            f"Seeded {count} videos in {perf_counter() - start:.1f}s"
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from video import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every video"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        backend = search.get_backend(options["database"])
+        with transaction.atomic(using=options["database"]):
+            backend.install()
+            backend.rebuild()
+        self.stdout.write("Search index rebuilt")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from video import related
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the related videos of the videos whose tags changed,"
+        " or of every video with --rebuild"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--rebuild", action="store_true")
+        parser.add_argument(
+            "--batch-size", type=int, default=related.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if options["rebuild"]:
+            count = related.rebuild(using)
+            self.stdout.write(f"Related videos rebuilt for {count} videos")
+        else:
+            count = related.update(options["batch_size"], using)
+            self.stdout.write(f"Related videos updated for {count} videos")
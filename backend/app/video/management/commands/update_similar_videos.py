@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from video import similar
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the videos uploaded since the last run to the text-similarity"
+        " neighbour table, or rebuild it with --rebuild"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--rebuild", action="store_true")
+        parser.add_argument("--path", help="Neighbour table file")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        using = options["database"]
+        if options["rebuild"]:
+            count = similar.rebuild(path, using)
+            self.stdout.write(f"Neighbour table rebuilt with {count} videos")
+            return
+
+        try:
+            count = similar.update(path, using)
+        except FileNotFoundError:
+            raise CommandError("No neighbour table, run with --rebuild first")
+        self.stdout.write(f"Neighbour table updated with {count} videos")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from video import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the uploads, likes and comments since the last run to the"
+        " trending scores, meant to be run every minute"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--batch-size", type=int, default=trending.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        count = trending.update(
+            batch_size=options["batch_size"], using=options["database"]
+        )
+        self.stdout.write(f"Trending scores updated with {count} events")
@@ -0,0 +1,243 @@
+"""
+Related videos by shared tags.
+
+Each video is a vector over tags weighted by the smoothed inverse
+document frequency of the tag, ``log((1 + videos) / (1 + df)) + 1``, and
+two videos are as similar as the cosine of their vectors. Tags of more
+than ``MAX_DF`` videos are left out like stop words: they say little
+about a video and would make every pair of their videos a candidate.
+
+The similarities of a video are the row of the sparse product of the
+video-tag matrix with its transpose, computed from the inverted index of
+the tags, so only videos sharing a tag are ever compared. The best ``K``
+of each video are stored in ``related_video``.
+
+``rebuild`` recomputes every row. Tag changes queue their video in
+``related_video_queue`` and ``update`` recomputes only the rows of the
+queued videos and of the videos whose rows hold them, then inserts the
+queued videos in the rows of their other neighbours.
+"""
+
+import math
+from collections import defaultdict
+from heapq import nlargest
+from django.db import transaction
+from core import models
+
+K = 20
+MAX_DF = 1000
+BATCH_SIZE = 500
+
+
+def idf(df, videos):
+    return math.log((1 + videos) / (1 + df)) + 1
+
+
+def neighbours(video_id, video_tags, postings, weights, norms):
+    """
+    Return the best ``K`` ``(video_id, similarity)`` pairs of a video,
+    given the tags of the videos, the videos of the tags, the weights of
+    the tags and the norms of the video vectors
+    """
+
+    scores = defaultdict(float)
+    for tag_id in video_tags[video_id]:
+        weight = weights.get(tag_id)
+        if weight is None:
+            continue
+        for other_id in postings[tag_id]:
+            scores[other_id] += weight * weight
+    scores.pop(video_id, None)
+
+    norm = norms[video_id]
+    return nlargest(
+        K,
+        (
+            (other_id, score / (norm * norms[other_id]))
+            for other_id, score in scores.items()
+        ),
+        key=lambda pair: (pair[1], -pair[0]),
+    )
+
+
+def _norms(video_tags, weights):
+    norms = {}
+    for video_id, tag_ids in video_tags.items():
+        norm = math.sqrt(sum(weights.get(t, 0) ** 2 for t in tag_ids))
+        if norm:
+            norms[video_id] = norm
+    return norms
+
+
+def _group(pairs):
+    video_tags = defaultdict(list)
+    postings = defaultdict(list)
+    for video_id, tag_id in pairs:
+        video_tags[video_id].append(tag_id)
+        postings[tag_id].append(video_id)
+    return video_tags, postings
+
+
+def queue(video_ids, using="default"):
+    """Mark the related videos of the videos as out of date"""
+
+    # Skip the videos deleted since, e.g. those whose deletion removed tags
+    videos = models.Video.objects.using(using).filter(id__in=video_ids)
+    models.RelatedVideoQueue.objects.using(using).bulk_create(
+        [
+            models.RelatedVideoQueue(video_id=video_id)
+            for video_id in videos.values_list("id", flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(using="default"):
+    """Recompute the related videos of every video"""
+
+    video_count = models.Video.objects.using(using).count()
+    pairs = models.VideoTag.objects.using(using).values_list(
+        "video_id", "tag_id"
+    )
+    video_tags, postings = _group(pairs.iterator(chunk_size=10_000))
+    weights = {
+        tag_id: idf(len(video_ids), video_count)
+        for tag_id, video_ids in postings.items()
+        if len(video_ids) <= MAX_DF
+    }
+    norms = _norms(video_tags, weights)
+
+    related = models.RelatedVideo.objects.using(using)
+    with transaction.atomic(using=using):
+        models.RelatedVideoQueue.objects.using(using).all().delete()
+        related.all().delete()
+        batch = []
+        for video_id in norms:
+            batch += [
+                models.RelatedVideo(
+                    video_id=video_id, related_id=other_id, score=score
+                )
+                for other_id, score in neighbours(
+                    video_id, video_tags, postings, weights, norms
+                )
+            ]
+            if len(batch) >= 10_000:
+                related.bulk_create(batch)
+                batch = []
+        related.bulk_create(batch)
+    return len(norms)
+
+
+def update(batch_size=BATCH_SIZE, using="default"):
+    """Recompute the related videos of the queued videos"""
+
+    total = 0
+    while True:
+        with transaction.atomic(using=using):
+            entries = list(
+                models.RelatedVideoQueue.objects.using(using)
+                .select_for_update()
+                .order_by("id")
+                .values_list("id", "video_id")[:batch_size]
+            )
+            if not entries:
+                return total
+            _update([video_id for _, video_id in entries], using)
+            models.RelatedVideoQueue.objects.using(using).filter(
+                id__in=[entry_id for entry_id, _ in entries]
+            ).delete()
+        total += len(entries)
+
+
+def _update(video_ids, using):
+    video_tag_rows = models.VideoTag.objects.using(using)
+    related = models.RelatedVideo.objects.using(using)
+
+    # Rows holding a queued video may lose it, and are recomputed rather
+    # than left with fewer than K videos
+    affected = set(
+        related.filter(related_id__in=video_ids).values_list(
+            "video_id", flat=True
+        )
+    )
+    targets = set(video_ids) | affected
+
+    # Document frequencies from the maintained tag usage counters
+    tag_ids = set(
+        video_tag_rows.filter(video_id__in=targets).values_list(
+            "tag_id", flat=True
+        )
+    )
+    dfs = dict(
+        models.TagUsage.objects.using(using)
+        .filter(tag_id__in=tag_ids, count__lte=MAX_DF)
+        .values_list("tag_id", "count")
+    )
+
+    # Every video sharing a tag with the recomputed ones, with all its tags
+    candidates = video_tag_rows.filter(tag_id__in=dfs).values("video_id")
+    video_tags, postings = _group(
+        video_tag_rows.filter(video_id__in=candidates)
+        .values_list("video_id", "tag_id")
+        .iterator(chunk_size=10_000)
+    )
+    dfs.update(
+        models.TagUsage.objects.using(using)
+        .filter(tag_id__in=postings.keys() - dfs.keys(), count__lte=MAX_DF)
+        .values_list("tag_id", "count")
+    )
+    video_count = models.Video.objects.using(using).count()
+    weights = {tag_id: idf(df, video_count) for tag_id, df in dfs.items()}
+    norms = _norms(video_tags, weights)
+
+    # The postings only hold the videos sharing a tag with a recomputed one
+    shared = {t: postings[t] for t in tag_ids if t in weights}
+    rows = {
+        video_id: neighbours(video_id, video_tags, shared, weights, norms)
+        if video_id in norms
+        else []
+        for video_id in targets
+    }
+
+    # Every row holding a queued video is among the recomputed ones
+    related.filter(video_id__in=targets).delete()
+    related.bulk_create(
+        models.RelatedVideo(video_id=video_id, related_id=other, score=score)
+        for video_id, pairs in rows.items()
+        for other, score in pairs
+    )
+    queued = {video_id: rows[video_id] for video_id in video_ids}
+    _insert_reverse(queued, rows, related)
+
+
+def _insert_reverse(queued, rows, related):
+    """
+    Add the queued videos to the rows of their neighbours, but those of
+    ``rows`` which are already recomputed
+    """
+
+    reverse = defaultdict(list)
+    for video_id, pairs in queued.items():
+        for other_id, score in pairs:
+            if other_id not in rows:
+                reverse[other_id].append((video_id, score))
+
+    current = defaultdict(list)
+    for row in related.filter(video_id__in=reverse):
+        current[row.video_id].append(row)
+
+    new_rows = []
+    stale = []
+    for video_id, pairs in reverse.items():
+        entries = [(r.related_id, r.score, r) for r in current[video_id]]
+        entries += [(other, score, None) for other, score in pairs]
+        entries.sort(key=lambda entry: (-entry[1], entry[0]))
+        new_rows += [
+            models.RelatedVideo(video_id=video_id, related_id=other, score=s)
+            for other, s, row in entries[:K]
+            if row is None
+        ]
+        stale += [row.id for _, _, row in entries[K:] if row is not None]
+
+    related.filter(id__in=stale).delete()
+    related.bulk_create(new_rows)
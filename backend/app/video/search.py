@@ -0,0 +1,260 @@
+"""
+Full-text search over video titles, descriptions and tags.
+
+The search document of each video is kept in a ``video_search`` table
+next to ``video``: a ``tsvector`` column with a GIN index on PostgreSQL
+and an FTS5 virtual table on SQLite. The table is created after
+migrations and kept in sync by the signals in ``video.signals``.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from django.db import connections
+from core import models
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Title, tags and description of every video, tags joined with spaces
+SOURCE_SQL = """
+    SELECT
+        v.id,
+        v.title,
+        COALESCE(v.description, '') AS description,
+        COALESCE((
+            SELECT {aggregate} FROM video_tag vt
+            INNER JOIN tag t ON t.id = vt.tag_id
+            WHERE vt.video_id = v.id
+        ), '') AS tags
+    FROM video v
+"""
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+class SearchBackend(ABC):
+    """
+    Base class of the per-database search backends, whose documents are
+    kept by the methods other than ``search``, none by default
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        """Create the search table and its index if they do not exist"""
+
+    def index(self, video_ids):
+        """Add or refresh the search documents of the given videos"""
+
+    def remove(self, video_ids):
+        """Remove the search documents of the given videos"""
+
+    def rebuild(self):
+        """Rebuild the search documents of every video"""
+
+    @abstractmethod
+    def search(self, query, limit, after=None):
+        """
+        Return ``(video_id, rank)`` pairs matching every word of the
+        query, best ranked first, starting after the ``(rank, video_id)``
+        key of a previous page.
+        """
+
+    def _in_clause(self, video_ids):
+        return ", ".join(["%s"] * len(video_ids))
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """tsvector documents with a GIN index, ranked with ts_rank_cd"""
+
+    config = "english"
+    document_sql = (
+        "setweight(to_tsvector(%(config)s, s.title), 'A')"
+        " || setweight(to_tsvector(%(config)s, s.tags), 'A')"
+        " || setweight(to_tsvector(%(config)s, s.description), 'B')"
+    )
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS video_search (
+                    video_id bigint PRIMARY KEY
+                        REFERENCES video (id) ON DELETE CASCADE,
+                    document tsvector NOT NULL
+                )
+                """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS video_search_document_idx"
+                " ON video_search USING GIN (document)"
+            )
+
+    def index(self, video_ids):
+        if video_ids:
+            self._upsert(
+                f"WHERE s.id IN ({self._in_clause(video_ids)})",
+                list(video_ids),
+            )
+
+    def remove(self, video_ids):
+        if video_ids:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM video_search"
+                    f" WHERE video_id IN ({self._in_clause(video_ids)})",
+                    list(video_ids),
+                )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("TRUNCATE video_search")
+        self._upsert("", [])
+
+    def search(self, query, limit, after=None):
+        words = " ".join(tokenize(query))
+        if not words:
+            return []
+
+        params = [self.config, words]
+        where = ""
+        if after is not None:
+            where = "WHERE (rank, video_id) < (%s::real, %s)"
+            params += list(after)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT video_id, rank FROM (
+                    SELECT video_id, ts_rank_cd(document, query) AS rank
+                    FROM video_search, plainto_tsquery(%s, %s) query
+                    WHERE document @@ query
+                ) ranked
+                {where}
+                ORDER BY rank DESC, video_id DESC
+                LIMIT %s
+                """,
+                params + [limit],
+            )
+            return cursor.fetchall()
+
+    def _upsert(self, where, params):
+        source = SOURCE_SQL.format(aggregate="string_agg(t.name, ' ')")
+        document = self.document_sql % {"config": "%s"}
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO video_search (video_id, document)
+                SELECT s.id, {document} FROM ({source}) s {where}
+                ON CONFLICT (video_id)
+                DO UPDATE SET document = EXCLUDED.document
+                """,
+                [self.config] * 3 + params,
+            )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table keyed by video id, ranked with bm25"""
+
+    # bm25 weights of the title, description and tags columns
+    rank_sql = "-bm25(video_search, 10.0, 1.0, 5.0)"
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS video_search"
+                " USING fts5(title, description, tags,"
+                " tokenize='porter unicode61')"
+            )
+
+    def index(self, video_ids):
+        if video_ids:
+            self.remove(video_ids)
+            self._insert(
+                f"WHERE s.id IN ({self._in_clause(video_ids)})",
+                list(video_ids),
+            )
+
+    def remove(self, video_ids):
+        if video_ids:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM video_search"
+                    f" WHERE rowid IN ({self._in_clause(video_ids)})",
+                    list(video_ids),
+                )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM video_search")
+        self._insert("", [])
+
+    def search(self, query, limit, after=None):
+        words = tokenize(query)
+        if not words:
+            return []
+
+        params = [" ".join(f'"{word}"' for word in words)]
+        where = ""
+        if after is not None:
+            where = "WHERE (rank, rowid) < (%s, %s)"
+            params += list(after)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid, rank FROM (
+                    SELECT rowid, {self.rank_sql} AS rank
+                    FROM video_search WHERE video_search MATCH %s
+                ) ranked
+                {where}
+                ORDER BY rank DESC, rowid DESC
+                LIMIT %s
+                """,
+                params + [limit],
+            )
+            return cursor.fetchall()
+
+    def _insert(self, where, params):
+        source = SOURCE_SQL.format(aggregate="group_concat(t.name, ' ')")
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO video_search (rowid, title, description, tags)
+                SELECT s.id, s.title, s.description, s.tags
+                FROM ({source}) s {where}
+                """,
+                params,
+            )
+
+
+class FallbackSearchBackend(SearchBackend):
+    """Unindexed substring search for databases without a backend"""
+
+    def search(self, query, limit, after=None):
+        words = tokenize(query)
+        if not words:
+            return []
+
+        videos = models.Video.objects.using(self.connection.alias)
+        for word in words:
+            videos = videos.filter(title__icontains=word)
+        if after is not None:
+            videos = videos.filter(id__lt=after[1])
+
+        ids = videos.order_by("-id").values_list("id", flat=True)[:limit]
+        return [(video_id, 0.0) for video_id in ids]
+
+
+BACKENDS = {
+    "postgresql": PostgreSQLSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_backend(using="default"):
+    connection = connections[using]
+    backend_class = BACKENDS.get(connection.vendor, FallbackSearchBackend)
+    return backend_class(connection)
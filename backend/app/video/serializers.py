@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from core import models
+from core import models, tags
+from core.serializers import ValuesSerializer, format_datetime
 
 
 class VideoSerializer(serializers.ModelSerializer):
@@ -10,7 +11,7 @@ class VideoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Video
-        fields = "__all__"
+        exclude = ("updated_at",)
         read_only_fields = ("id", "likes", "created_at")
 
     def update(self, instance, validated_data):
@@ -51,7 +52,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Comment
-        fields = "__all__"
+        exclude = ("updated_at",)
         read_only_fields = ("id", "created_at", "created_by", "likes")
 
     def get_created_at(self, obj):
@@ -62,6 +63,71 @@ class CommentSerializer(serializers.ModelSerializer):
         return user.username
 
 
+class VideoListSerializer(ValuesSerializer):
+    """Read-only fast path of VideoSerializer for list responses"""
+
+    fields = (
+        ("id", "id"),
+        (
+            "thumbnail",
+            ("created_by_id", "thumbnail"),
+            "/media/{}/thumbnails/{}",
+        ),
+        ("file", ("created_by_id", "file"), "/media/{}/videos/{}"),
+        ("created_at", "created_at", format_datetime),
+        ("created_by", "created_by__username"),
+        ("title", "title"),
+        ("description", "description"),
+        ("likes", "likes"),
+    )
+
+
+class CommentListSerializer(ValuesSerializer):
+    """Read-only fast path of CommentSerializer for list responses"""
+
+    fields = (
+        ("id", "id"),
+        ("created_at", "created_at", format_datetime),
+        ("created_by", "created_by__username"),
+        ("text", "text"),
+        ("likes", "likes"),
+        ("video", "video_id"),
+    )
+
+
+class VideoTagsSerializer(serializers.Serializer):
+    """Serializer for the set of tags of a video"""
+
+    tags = serializers.ListField(
+        child=serializers.CharField(
+            max_length=50,
+            validators=models.Tag._meta.get_field("name").validators,
+        ),
+        allow_empty=True,
+        max_length=50,
+    )
+
+    def validate_tags(self, value):
+        return sorted({tags.normalize(tag) for tag in value})
+
+    def update(self, instance, validated_data):
+        """Replace the tags of the video with the given ones"""
+
+        names = validated_data["tags"]
+        tag_ids = set(tags.get_ids(names, create=True).values())
+        current = set(instance.videotag_set.values_list("tag_id", flat=True))
+
+        instance.videotag_set.filter(tag_id__in=current - tag_ids).delete()
+        for tag_id in sorted(tag_ids - current):
+            models.VideoTag.objects.create(video=instance, tag_id=tag_id)
+
+        return instance
+
+    def to_representation(self, instance):
+        names = instance.videotag_set.values_list("tag__name", flat=True)
+        return {"tags": list(names.order_by("tag__name"))}
+
+
 class LikeSerializer(serializers.ModelSerializer):
     """Serializer for video likes"""
 
@@ -75,7 +141,7 @@ class LikeSerializer(serializers.ModelSerializer):
 
         video = validated_data["video"]
         video.likes += 1
-        video.save()
+        video.save(update_fields=["likes", "updated_at"])
 
         return super().create(validated_data)
 
@@ -83,6 +149,6 @@ class LikeSerializer(serializers.ModelSerializer):
         """Deletes a like and updates the video likes count"""
         video = instance.video
         video.likes -= 1
-        video.save()
+        video.save(update_fields=["likes", "updated_at"])
 
         instance.delete()
@@ -0,0 +1,42 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import models
+from video import related, search
+
+SEARCH_FIELDS = {"title", "description"}
+
+
+def install_search(sender, using, **kwargs):
+    """Create the search table once the video table exists"""
+
+    search.get_backend(using).install()
+
+
+@receiver(post_save, sender=models.Video)
+def index_video(sender, instance, update_fields=None, using=None, **kwargs):
+    """Refresh the search document when a searchable field changes"""
+
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.get_backend(using).index([instance.id])
+
+
+@receiver(post_delete, sender=models.Video)
+def unindex_video(sender, instance, using=None, **kwargs):
+    search.get_backend(using).remove([instance.id])
+
+
+@receiver(post_save, sender=models.VideoTag)
+@receiver(post_delete, sender=models.VideoTag)
+def index_video_tags(sender, instance, using=None, **kwargs):
+    search.get_backend(using).index([instance.video_id])
+
+
+@receiver(post_save, sender=models.VideoTag)
+@receiver(post_delete, sender=models.VideoTag)
+def queue_related_videos(sender, instance, using=None, **kwargs):
+    transaction.on_commit(
+        partial(related.queue, [instance.video_id], using), using=using
+    )
@@ -0,0 +1,376 @@
+"""
+Related videos by text similarity, for the videos without shared tags.
+
+Titles and descriptions are TF-IDF vectors: sublinear term frequencies,
+title words counted ``TITLE_WEIGHT`` times, times the smoothed inverse
+document frequency, normalized to unit length. Words of more than
+``MAX_DF_RATIO`` of the videos are dropped like stop words.
+
+Vectors are pruned to their ``QUERY_TERMS`` heaviest words shared with
+another video, and the postings of each word to its ``MAX_POSTINGS``
+heaviest videos, so the similarities of a video are accumulated from at
+most ``QUERY_TERMS * MAX_POSTINGS`` products whatever the number of
+videos. Neighbours are computed in blocks of videos and written as they
+go, so a rebuild only holds the pruned index in memory.
+
+The ``K`` nearest neighbours of every video are stored in a file of
+fixed size records sorted by video id, which workers map in memory and
+binary search without reading it into the heap. A rebuild writes a new
+file and swaps it in; ``update`` copies the file, appends the videos
+uploaded since and inserts them in the records of their neighbours in
+the copy, then swaps it in too, so workers mapping the previous file
+never see a record half written. Only one rebuild or update may run at
+a time.
+"""
+
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import threading
+from array import array
+from collections import Counter, defaultdict
+from heapq import nlargest
+from operator import itemgetter
+from time import monotonic
+from django.conf import settings
+from core import models
+from video import search
+
+K = 20
+TITLE_WEIGHT = 2
+MAX_DF_RATIO = 0.5
+QUERY_TERMS = 10
+MAX_POSTINGS = 200
+BLOCK_SIZE = 10_000
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the"
+    " this to was were will with".split()
+)
+
+MAGIC = b"VNT1"
+# Magic, neighbours per record, number of records and last video id
+HEADER = struct.Struct("<4sIQQ")
+# Video id then K (neighbour id, similarity) pairs, unused pairs zeroed
+RECORD = struct.Struct("<Q" + "Qf" * K)
+
+
+def terms(title, description):
+    """Counts of the words of a video, title words counted more"""
+
+    counts = Counter(
+        word
+        for word in search.tokenize(description or "")
+        if len(word) > 1 and word not in STOP_WORDS
+    )
+    for word in search.tokenize(title):
+        if len(word) > 1 and word not in STOP_WORDS:
+            counts[word] += TITLE_WEIGHT
+    return counts
+
+
+class Vocabulary:
+    """Document frequencies of the words of the videos"""
+
+    def __init__(self, videos=0, df=None):
+        self.videos = videos
+        self.df = Counter(df or {})
+
+    def add(self, counts):
+        self.videos += 1
+        self.df.update(counts.keys())
+
+    def vector(self, counts):
+        """
+        Return the ``QUERY_TERMS`` heaviest ``(word, weight)`` pairs of
+        the normalized vector of word counts, among the shared words
+        """
+
+        max_df = max(2, self.videos * MAX_DF_RATIO)
+        weights = {}
+        for word, count in counts.items():
+            df = self.df.get(word, 0)
+            if df <= max_df:
+                idf = math.log((1 + self.videos) / (1 + df)) + 1
+                weights[word] = (1 + math.log(count)) * idf
+
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        shared = (
+            (word, weight / norm)
+            for word, weight in weights.items()
+            if self.df[word] > 1
+        )
+        return nlargest(QUERY_TERMS, shared, key=itemgetter(1))
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump({"videos": self.videos, "df": self.df}, file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["videos"], data["df"])
+
+
+def vocabulary_path(path):
+    return f"{path}.vocab.json"
+
+
+def pack(video_id, neighbours):
+    values = [video_id]
+    for other_id, score in neighbours:
+        values += [other_id, score]
+    values += [0, 0.0] * (K - len(neighbours))
+    return RECORD.pack(*values)
+
+
+def unpack(record, offset=0):
+    values = RECORD.unpack_from(record, offset)
+    return values[0], [
+        (values[i], values[i + 1])
+        for i in range(1, len(values), 2)
+        if values[i]
+    ]
+
+
+def _videos(using):
+    videos = models.Video.objects.using(using).order_by("id")
+    return videos.values_list("id", "title", "description")
+
+
+def rebuild(path=None, using="default", block_size=BLOCK_SIZE):
+    """Recompute the neighbours of every video, return the video count"""
+
+    path = path or settings.TEXT_NEIGHBOURS_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    vocabulary = Vocabulary()
+    for _, title, description in _videos(using).iterator(chunk_size=2000):
+        vocabulary.add(terms(title, description))
+
+    # Pruned vectors, flattened with the offset of each video, and the
+    # postings of each word as (video index, weight) arrays
+    ids = array("Q")
+    offsets = array("L", [0])
+    query_words = array("L")
+    query_weights = array("f")
+    word_ids = {}
+    postings = defaultdict(lambda: (array("L"), array("f")))
+    for video_id, title, description in _videos(using).iterator(
+        chunk_size=2000
+    ):
+        index = len(ids)
+        ids.append(video_id)
+        for word, weight in vocabulary.vector(terms(title, description)):
+            word_id = word_ids.setdefault(word, len(word_ids))
+            query_words.append(word_id)
+            query_weights.append(weight)
+            indexes, weights = postings[word_id]
+            indexes.append(index)
+            weights.append(weight)
+        offsets.append(len(query_words))
+
+    for word_id, (indexes, weights) in postings.items():
+        if len(indexes) > MAX_POSTINGS:
+            best = sorted(
+                range(len(weights)), key=weights.__getitem__, reverse=True
+            )[:MAX_POSTINGS]
+            postings[word_id] = (
+                array("L", (indexes[i] for i in best)),
+                array("f", (weights[i] for i in best)),
+            )
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, K, len(ids), ids[-1] if ids else 0))
+        for start in range(0, len(ids), block_size):
+            block = bytearray()
+            for index in range(start, min(start + block_size, len(ids))):
+                scores = defaultdict(float)
+                for i in range(offsets[index], offsets[index + 1]):
+                    weight = query_weights[i]
+                    indexes, weights = postings[query_words[i]]
+                    for other, other_weight in zip(indexes, weights):
+                        scores[other] += weight * other_weight
+                scores.pop(index, None)
+                best = nlargest(K, scores.items(), key=itemgetter(1))
+                block += pack(
+                    ids[index], [(ids[other], score) for other, score in best]
+                )
+            file.write(block)
+
+    vocabulary.save(vocabulary_path(path))
+    os.replace(temp_path, path)
+    return len(ids)
+
+
+def update(path=None, using="default"):
+    """
+    Add the videos uploaded since the last rebuild or update to the
+    table, return the number of videos added
+    """
+
+    path = path or settings.TEXT_NEIGHBOURS_PATH
+    vocabulary = Vocabulary.load(vocabulary_path(path))
+    with open(path, "rb") as file:
+        _, _, count, last_id = HEADER.unpack(file.read(HEADER.size))
+
+    new = list(_videos(using).filter(id__gt=last_id))
+    if not new:
+        return 0
+    vectors = {}
+    for video_id, title, description in new:
+        counts = terms(title, description)
+        vocabulary.add(counts)
+        vectors[video_id] = counts
+
+    # Candidates are the best search matches of each word of the vector
+    backend = search.get_backend(using)
+    rows = {video_id: [] for video_id in vectors}
+    inserts = defaultdict(list)
+    for video_id, counts in vectors.items():
+        vector = dict(vocabulary.vector(counts))
+        candidates = {
+            other_id
+            for word in vector
+            for other_id, _ in backend.search(word, MAX_POSTINGS)
+        } - {video_id}
+
+        scores = []
+        for other_id, title, description in _videos(using).filter(
+            id__in=candidates
+        ):
+            other = vocabulary.vector(terms(title, description))
+            score = sum(w * vector.get(word, 0) for word, w in other)
+            if score > 0:
+                scores.append((other_id, score))
+
+        best = nlargest(K, scores, key=itemgetter(1))
+        rows[video_id] += best
+        for other_id, score in best:
+            target = rows if other_id in rows else inserts
+            target[other_id].append((video_id, score))
+
+    temp_path = f"{path}.tmp"
+    shutil.copyfile(path, temp_path)
+    with open(temp_path, "r+b") as file:
+        with mmap.mmap(file.fileno(), 0) as table:
+            for other_id, pairs in inserts.items():
+                offset = _find(table, count, other_id)
+                if offset is not None:
+                    _, neighbours = unpack(table, offset)
+                    table[offset:offset + RECORD.size] = pack(
+                        other_id, _merge(neighbours, pairs)
+                    )
+            table.flush()
+
+        file.seek(HEADER.size + count * RECORD.size)
+        for video_id, pairs in rows.items():
+            file.write(pack(video_id, _merge([], pairs)))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, K, count + len(rows), new[-1][0]))
+
+    vocabulary.save(vocabulary_path(path))
+    os.replace(temp_path, path)
+    return len(rows)
+
+
+def _merge(neighbours, pairs):
+    scores = dict(neighbours)
+    scores.update(pairs)
+    return nlargest(K, scores.items(), key=itemgetter(1))
+
+
+def _find(table, count, video_id):
+    """Offset of the record of a video, binary searched"""
+
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        offset = HEADER.size + middle * RECORD.size
+        (current,) = struct.unpack_from("<Q", table, offset)
+        if current < video_id:
+            low = middle + 1
+        elif current > video_id:
+            high = middle
+        else:
+            return offset
+    return None
+
+
+class NeighbourTable:
+    """
+    Read-only memory map of a neighbour table file, mapped again when the
+    file is rebuilt or grows
+    """
+
+    check_interval = 5
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.table = None
+        self.stat = None
+        self.checked_at = None
+
+    def lookup(self, video_id):
+        """Return the ``(video_id, similarity)`` neighbours of a video"""
+
+        with self.lock:
+            self._ensure_fresh()
+            if self.table is None:
+                return []
+            _, _, count, _ = HEADER.unpack_from(self.table)
+            count = min(
+                count, (len(self.table) - HEADER.size) // RECORD.size
+            )
+            offset = _find(self.table, count, video_id)
+            if offset is None:
+                return []
+            return unpack(self.table, offset)[1]
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def _ensure_fresh(self):
+        now = monotonic()
+        if (
+            self.checked_at is not None
+            and now - self.checked_at < self.check_interval
+        ):
+            return
+        self.checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key != self.stat:
+            self._close()
+            with open(self.path, "rb") as file:
+                self.table = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            self.stat = key
+
+    def _close(self):
+        if self.table is not None:
+            self.table.close()
+        self.table = None
+        self.stat = None
+
+
+_tables = {}
+
+
+def get_table(path=None):
+    path = path or settings.TEXT_NEIGHBOURS_PATH
+    if path not in _tables:
+        _tables[path] = NeighbourTable(path)
+    return _tables[path]
@@ -1,8 +1,20 @@
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
 from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
 from core import models
+from core.pagination import KeysetPagination
+from video import related, search, serializers, similar, trending
 
 
 class PublicVideoApiTests(APITestCase):
@@ -175,3 +187,784 @@ class PrivateVideoApiTests(APITestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(self.video.likes, 0)
+
+
+class ListSerializerTests(APITestCase):
+    """Test the list fast path renders the same JSON as the serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.other = get_user_model().objects.create(
+            first_name="Other",
+            last_name="User",
+            username="otheruser",
+            email="otheruser@example.com",
+            password="testpass",
+        )
+        self.video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        models.Video.objects.create(
+            title="Vidéo \u2028 \"quoted\" \U0001F3AC",
+            description=None,
+            thumbnail="other.png",
+            file="other.mp4",
+            likes=3,
+            created_by=self.other,
+        )
+        models.Video.objects.filter(id=self.video.id).update(
+            created_at=datetime(2023, 1, 2, 3, 4, 5, 678901, timezone.utc)
+        )
+        models.Comment.objects.create(
+            text="First comment", video=self.video, created_by=self.user
+        )
+        models.Comment.objects.create(
+            text="Ünïcode comment", video=self.video, created_by=self.other
+        )
+
+    def test_video_list_serializer_matches(self):
+        """Test the video fast path matches VideoSerializer output"""
+        videos = models.Video.objects.order_by("-id")
+        expected = serializers.VideoSerializer(videos, many=True).data
+
+        rows = serializers.VideoListSerializer.rows_for(videos)
+        data = serializers.VideoListSerializer(rows).data
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data), renderer.render(expected))
+
+    def test_comment_list_serializer_matches(self):
+        """Test the comment fast path matches CommentSerializer output"""
+        comments = models.Comment.objects.order_by("id")
+        expected = serializers.CommentSerializer(comments, many=True).data
+
+        rows = serializers.CommentListSerializer.rows_for(comments)
+        data = serializers.CommentListSerializer(rows).data
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data), renderer.render(expected))
+
+    def test_video_list_single_query(self):
+        """Test listing videos does not query the author of each video"""
+        url = reverse("video:list")
+
+        # The validators, the count and the page
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][1]["created_by"], "testuser")
+
+
+class VideoSearchApiTests(APITestCase):
+    """Test the full-text video search API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.title_match = self.create_video(
+            "Guitar lesson", "Learn to play"
+        )
+        self.description_match = self.create_video(
+            "Music lesson", "A guitar and piano duet"
+        )
+        self.tag_match = self.create_video("Campfire songs", "Evening")
+        models.VideoTag.objects.create(
+            video=self.tag_match,
+            tag=models.Tag.objects.create(name="guitar"),
+        )
+        self.create_video("Cooking pasta", "A recipe")
+
+    def create_video(self, title, description):
+        return models.Video.objects.create(
+            title=title,
+            description=description,
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+
+    def search(self, params):
+        return self.client.get(reverse("video:search"), params)
+
+    def test_search_ranks_title_first(self):
+        """Test titles, tags and descriptions match, titles ranked first"""
+        res = self.search({"q": "guitar"})
+        ids = [video["id"] for video in res.data["results"]]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[0], self.title_match.id)
+        self.assertEqual(ids[-1], self.description_match.id)
+        self.assertEqual(res.data["results"][0]["title"], "Guitar lesson")
+        self.assertIsNone(res.data["next"])
+
+    def test_search_matches_every_word(self):
+        """Test every word of the query must match"""
+        res = self.search({"q": "guitar learning"})
+        ids = [video["id"] for video in res.data["results"]]
+
+        self.assertEqual(ids, [self.title_match.id])
+
+    def test_search_follows_updates(self):
+        """Test the index follows video updates, deletes and tags"""
+        self.title_match.title = "Drum lesson"
+        self.title_match.save()
+        models.VideoTag.objects.filter(video=self.tag_match).delete()
+        self.description_match.delete()
+
+        self.assertEqual(self.search({"q": "guitar"}).data["results"], [])
+        self.assertEqual(len(self.search({"q": "drum"}).data["results"]), 1)
+
+    def test_search_cursor_pagination(self):
+        """Test paging through results with the next cursor"""
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            res = self.search({"q": "guitar"})
+            first = [video["id"] for video in res.data["results"]]
+            res = self.client.get(res.data["next"])
+            second = [video["id"] for video in res.data["results"]]
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, [self.description_match.id])
+        self.assertIsNone(res.data["next"])
+
+    def test_search_invalid_cursor(self):
+        """Test an invalid cursor returns 404"""
+        res = self.search({"q": "guitar", "cursor": "invalid"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_without_words(self):
+        """Test searching without a word returns 400"""
+        res = self.search({"q": " !"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backends_implement_search(self):
+        """Test backends without a search method cannot be created"""
+
+        class Unsearchable(search.SearchBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Unsearchable(connection)
+        self.assertIsInstance(
+            search.get_backend(), search.SQLiteSearchBackend
+        )
+
+
+class VideoTagApiTests(APITestCase):
+    """Test the video tags API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.videos = [
+            models.Video.objects.create(
+                title=f"Test Video {i}",
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=self.user,
+            )
+            for i in range(3)
+        ]
+        tags = {
+            name: models.Tag.objects.create(name=name)
+            for name in ("live", "music")
+        }
+        for video, names in zip(
+            self.videos, (["music"], ["music", "live"], ["live"])
+        ):
+            for name in names:
+                models.VideoTag.objects.create(video=video, tag=tags[name])
+
+    def tagged(self, params):
+        res = self.client.get(reverse("video:tagged"), params)
+        return res, [video["id"] for video in res.data.get("results", [])]
+
+    def test_retrieve_tags(self):
+        """Test reading the tags of a video"""
+        url = reverse("video:tags", args=[self.videos[1].id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"tags": ["live", "music"]})
+
+    def test_replace_tags(self):
+        """Test replacing the tags of a video"""
+        url = reverse("video:tags", args=[self.videos[1].id])
+        res = self.client.put(
+            url, {"tags": ["live", "rock", "rock"]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"tags": ["live", "rock"]})
+        self.assertEqual(
+            set(
+                models.VideoTag.objects.filter(
+                    video=self.videos[1]
+                ).values_list("tag__name", flat=True)
+            ),
+            {"live", "rock"},
+        )
+
+    def test_replace_tags_normalized(self):
+        """Test tags are stored lowercase and reuse existing tags"""
+        url = reverse("video:tags", args=[self.videos[0].id])
+        res = self.client.put(
+            url, {"tags": ["Live", " MUSIC"]}, format="json"
+        )
+
+        self.assertEqual(res.data, {"tags": ["live", "music"]})
+        self.assertEqual(models.Tag.objects.count(), 2)
+
+    def test_replace_tags_invalid(self):
+        """Test tags must be words"""
+        url = reverse("video:tags", args=[self.videos[1].id])
+        res = self.client.put(url, {"tags": ["no spaces"]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replace_tags_forbidden(self):
+        """Test only the uploader can tag a video"""
+        other = get_user_model().objects.create(
+            first_name="Other",
+            last_name="User",
+            username="otheruser",
+            email="otheruser@example.com",
+            password="testpass",
+        )
+        self.client.force_authenticate(user=other)
+
+        url = reverse("video:tags", args=[self.videos[1].id])
+        res = self.client.put(url, {"tags": ["rock"]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_tagged_all(self):
+        """Test listing the videos with every tag"""
+        res, ids = self.tagged({"tag": "music,live"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [self.videos[1].id])
+
+    def test_tagged_any(self):
+        """Test listing the videos with any of the tags, newest first"""
+        res, ids = self.tagged({"tag": "music,live", "match": "any"})
+
+        self.assertEqual(ids, [video.id for video in self.videos[::-1]])
+
+    def test_tagged_unknown_tag(self):
+        """Test unknown tags match nothing and are ignored by any"""
+        res, ids = self.tagged({"tag": "Music,jazz"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [])
+
+        res, ids = self.tagged({"tag": "Music,jazz", "match": "any"})
+        self.assertEqual(ids, [self.videos[1].id, self.videos[0].id])
+
+    def test_tagged_cursor_pagination(self):
+        """Test paging through tagged videos with the next cursor"""
+        with mock.patch.object(KeysetPagination, "page_size", 1):
+            res, first = self.tagged({"tag": "music"})
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(first, [self.videos[1].id])
+        self.assertEqual(res.data["results"][0]["id"], self.videos[0].id)
+        self.assertIsNone(res.data["next"])
+
+    def test_tagged_invalid(self):
+        """Test invalid tag queries are rejected"""
+        res, _ = self.tagged({"tag": ","})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res, _ = self.tagged({"tag": "music", "match": "some"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res, _ = self.tagged({"tag": "music", "cursor": "WyJhIl0"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BackfillTagsTests(TestCase):
+    """Test the backfill of the legacy tag column"""
+
+    def backfill(self):
+        out = StringIO()
+        call_command("backfill_tags", stdout=out)
+        return out.getvalue()
+
+    def test_no_legacy_column(self):
+        """Test nothing is backfilled without the legacy column"""
+        self.assertIn("nothing to backfill", self.backfill())
+
+    def test_legacy_column_not_null(self):
+        """Test the backfill requires the legacy column to be nullable"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE video_tag"
+                " ADD COLUMN tag varchar(50) NOT NULL DEFAULT ''"
+            )
+
+        with self.assertRaisesMessage(CommandError, "DROP NOT NULL"):
+            self.backfill()
+
+
+class TrendingApiTests(APITestCase):
+    """Test the trending scores and the trending videos API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.now = datetime(2023, 6, 1, tzinfo=timezone.utc)
+        self.videos = [
+            models.Video.objects.create(
+                title=f"Test Video {i}",
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                created_by=self.user,
+            )
+            for i in range(3)
+        ]
+        # Uploaded two days apart, the newest last
+        for days, video in zip((4, 2, 0), self.videos):
+            models.Video.objects.filter(id=video.id).update(
+                created_at=self.now - timedelta(days=days)
+            )
+
+    def like(self, video, days=0, user=None):
+        like = models.VideoLike.objects.create(
+            video=video, liked_by=user or self.user
+        )
+        models.VideoLike.objects.filter(id=like.id).update(
+            created_at=self.now - timedelta(days=days)
+        )
+
+    def update(self):
+        return trending.update(now=self.now + trending.SETTLE_TIME)
+
+    def trending_ids(self, params=None):
+        res = self.client.get(reverse("video:trending"), params)
+        return res, [video["id"] for video in res.data.get("results", [])]
+
+    def test_score_is_decayed_sum(self):
+        """Test the stored score is the log of the grown event weights"""
+        self.like(self.videos[0], days=1)
+        self.update()
+
+        score = models.TrendingScore.objects.get(video=self.videos[0])
+        grown = 5.0 * 2 ** ((self.now - trending.EPOCH).days - 4) + 2 ** (
+            (self.now - trending.EPOCH).days - 1
+        )
+        self.assertAlmostEqual(score.score, math.log(grown))
+
+    def test_trending_order(self):
+        """Test recent uploads come first unless older ones are liked"""
+        res, ids = self.trending_ids()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [])
+
+        self.update()
+        self.assertEqual(
+            self.trending_ids()[1], [video.id for video in self.videos[::-1]]
+        )
+
+        for i in range(5):
+            user = get_user_model().objects.create(
+                first_name="Fan",
+                last_name="User",
+                username=f"fan{i}",
+                email=f"fan{i}@example.com",
+                password="testpass",
+            )
+            self.like(self.videos[1], user=user)
+        comment = models.Comment.objects.create(
+            video=self.videos[0], created_by=self.user, text="Nice"
+        )
+        models.Comment.objects.filter(id=comment.id).update(
+            created_at=self.now
+        )
+        self.assertEqual(self.update(), 6)
+
+        _, ids = self.trending_ids()
+        self.assertEqual(ids[0], self.videos[1].id)
+
+    def test_update_is_incremental(self):
+        """Test events are counted once and recent events left for later"""
+        self.assertEqual(self.update(), 3)
+        self.assertEqual(self.update(), 0)
+
+        like = models.VideoLike.objects.create(
+            video=self.videos[0], liked_by=self.user
+        )
+        self.assertEqual(self.update(), 0)
+        now = like.created_at + timedelta(minutes=1)
+        self.assertEqual(trending.update(now=now), 1)
+        self.assertEqual(
+            models.TrendingCheckpoint.objects.get(source="like").last_id,
+            like.id,
+        )
+
+    def test_late_commits_counted(self):
+        """Test rows committed after later ids were counted are not missed"""
+        self.like(self.videos[0])
+        later = models.VideoLike.objects.create(
+            video=self.videos[1], liked_by=self.user
+        )
+        late = models.VideoLike.objects.get(video=self.videos[0])
+        late_id = late.id
+        # Not committed yet when the later like is counted
+        late.delete()
+        models.VideoLike.objects.filter(id=later.id).update(
+            created_at=self.now
+        )
+        self.assertEqual(self.update(), 4)
+        checkpoint = models.TrendingCheckpoint.objects.get(source="like")
+        self.assertEqual(checkpoint.last_id, later.id)
+        self.assertEqual([gap[0] for gap in checkpoint.gaps], [late_id])
+
+        late.id = late_id
+        late.save(force_insert=True)
+        self.assertEqual(self.update(), 1)
+        self.assertEqual(self.update(), 0)
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.gaps, [])
+
+    def test_gaps_forgotten(self):
+        """Test gaps of rows never committed are given up on"""
+        self.like(self.videos[0])
+        models.VideoLike.objects.all().delete()
+        self.like(self.videos[1])
+        self.update()
+        self.assertEqual(
+            len(models.TrendingCheckpoint.objects.get(source="like").gaps), 1
+        )
+
+        trending.update(
+            now=self.now + timedelta(seconds=trending.GAP_TIME) * 2
+        )
+        self.assertEqual(
+            models.TrendingCheckpoint.objects.get(source="like").gaps, []
+        )
+
+    def test_trending_cursor_pagination(self):
+        """Test paging through trending videos with the next cursor"""
+        self.update()
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            res, first = self.trending_ids()
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(first, [self.videos[2].id, self.videos[1].id])
+        self.assertEqual(res.data["results"][0]["id"], self.videos[0].id)
+        self.assertIsNone(res.data["next"])
+
+    def test_deleted_and_pruned_videos(self):
+        """Test deleted and hopeless videos leave the ranking"""
+        self.update()
+        self.videos[2].delete()
+        with mock.patch.object(trending, "TOP_N", 1):
+            with mock.patch.object(trending, "PRUNE_MARGIN", 1.0):
+                trending.prune()
+
+        self.assertEqual(self.trending_ids()[1], [self.videos[1].id])
+
+
+class RelatedVideoApiTests(APITestCase):
+    """Test the related videos index and API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.tags = {
+            name: models.Tag.objects.create(name=name)
+            for name in ("jazz", "live", "rock")
+        }
+        self.videos = [
+            self.create_video(names)
+            for names in (["rock", "live"], ["rock", "live"], ["rock"], [])
+        ]
+        self.create_video(["jazz"])
+
+    def create_video(self, names):
+        video = models.Video.objects.create(
+            title="Test Video",
+            description="Test Video Description",
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+        for name in names:
+            models.VideoTag.objects.create(video=video, tag=self.tags[name])
+        return video
+
+    def related_ids(self, video):
+        res = self.client.get(reverse("video:related", args=[video.id]))
+        return [row["id"] for row in res.data["results"]]
+
+    def test_rebuild(self):
+        """Test videos are related by shared tags, rarest tags first"""
+        related.rebuild()
+
+        with self.assertNumQueries(1):
+            ids = self.related_ids(self.videos[0])
+        self.assertEqual(ids, [self.videos[1].id, self.videos[2].id])
+        self.assertEqual(
+            self.related_ids(self.videos[2]),
+            [self.videos[0].id, self.videos[1].id],
+        )
+        self.assertEqual(self.related_ids(self.videos[3]), [])
+
+        score = models.RelatedVideo.objects.get(
+            video=self.videos[0], related=self.videos[1]
+        ).score
+        self.assertAlmostEqual(score, 1.0)
+
+    def test_update_queued_videos(self):
+        """Test newly tagged videos are related without a rebuild"""
+        related.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            video = self.create_video(["live"])
+
+        self.assertEqual(related.update(), 1)
+        self.assertEqual(
+            self.related_ids(video), [self.videos[0].id, self.videos[1].id]
+        )
+        self.assertIn(video.id, self.related_ids(self.videos[0]))
+        self.assertEqual(models.RelatedVideoQueue.objects.count(), 0)
+
+    def test_update_removed_tags(self):
+        """Test videos whose tags were removed lose their related videos"""
+        related.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            models.VideoTag.objects.filter(video=self.videos[1]).delete()
+        related.update()
+
+        self.assertEqual(self.related_ids(self.videos[1]), [])
+        self.assertEqual(self.related_ids(self.videos[0]), [self.videos[2].id])
+
+    def test_update_refills_rows(self):
+        """Test rows losing a queued video are refilled with the next best"""
+        with mock.patch.object(related, "K", 1):
+            related.rebuild()
+            self.assertEqual(
+                self.related_ids(self.videos[2]), [self.videos[0].id]
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                models.VideoTag.objects.filter(video=self.videos[0]).delete()
+            related.update()
+
+        self.assertEqual(self.related_ids(self.videos[2]), [self.videos[1].id])
+        self.assertEqual(self.related_ids(self.videos[0]), [])
+
+    def test_related_video_not_found(self):
+        """Test listing the related videos of a missing video returns 404"""
+        res = self.client.get(reverse("video:related", args=[999]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SimilarVideoTests(APITestCase):
+    """Test the text-similarity neighbour table"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.videos = [
+            self.create_video(title, description)
+            for title, description in (
+                ("Guitar lesson", "Learn chords and strumming on guitar"),
+                ("Acoustic guitar chords", "Strumming patterns"),
+                ("Pasta recipe", "Cooking fresh pasta with tomato sauce"),
+                ("Tomato sauce recipe", "Cooking a quick sauce"),
+                ("Mountain hiking", "Trail views"),
+            )
+        ]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "neighbours.bin")
+        settings = override_settings(TEXT_NEIGHBOURS_PATH=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(lambda: similar.get_table(self.path).close())
+
+    def create_video(self, title, description):
+        return models.Video.objects.create(
+            title=title,
+            description=description,
+            thumbnail="wii.jpg",
+            file="wii.mp4",
+            created_by=self.user,
+        )
+
+    def neighbour_ids(self, video):
+        table = similar.NeighbourTable(self.path)
+        ids = [video_id for video_id, _ in table.lookup(video.id)]
+        table.close()
+        return ids
+
+    def test_rebuild(self):
+        """Test videos are related to the videos sharing rare words"""
+        self.assertEqual(similar.rebuild(block_size=2), 5)
+
+        ids = [self.neighbour_ids(video) for video in self.videos]
+        self.assertEqual(ids[0], [self.videos[1].id])
+        self.assertEqual(ids[3], [self.videos[2].id])
+        self.assertEqual(ids[4], [])
+
+    def test_update_appends_new_videos(self):
+        """Test new videos are added and inserted in their neighbours"""
+        similar.rebuild()
+        video = self.create_video("Beginner strumming", "Guitar chords")
+
+        self.assertEqual(similar.update(), 1)
+        self.assertEqual(similar.update(), 0)
+        self.assertEqual(
+            set(self.neighbour_ids(video)),
+            {self.videos[0].id, self.videos[1].id},
+        )
+        self.assertIn(video.id, self.neighbour_ids(self.videos[1]))
+
+    def test_update_leaves_mapped_file(self):
+        """Test tables mapped before an update keep reading the old file"""
+        similar.rebuild()
+        table = similar.NeighbourTable(self.path)
+        self.addCleanup(table.close)
+        before = table.lookup(self.videos[1].id)
+        video = self.create_video("Beginner strumming", "Guitar chords")
+
+        similar.update()
+
+        self.assertEqual(table.lookup(self.videos[1].id), before)
+        self.assertEqual(table.lookup(video.id), [])
+        table.checked_at = None
+        self.assertIn(video.id, dict(table.lookup(self.videos[1].id)))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_related_falls_back_to_text(self):
+        """Test videos without shared tags list their similar videos"""
+        similar.rebuild()
+        res = self.client.get(
+            reverse("video:related", args=[self.videos[2].id])
+        )
+
+        self.assertEqual(
+            [video["id"] for video in res.data["results"]],
+            [self.videos[3].id],
+        )
+
+
+class VideoOrderingApiTests(APITestCase):
+    """Test ordering the video list with cursor pagination"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            first_name="Test",
+            last_name="User",
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass",
+        )
+        self.videos = [
+            models.Video.objects.create(
+                title=title,
+                description="Test Video Description",
+                thumbnail="wii.jpg",
+                file="wii.mp4",
+                likes=likes,
+                created_by=self.user,
+            )
+            for title, likes in (("b", 5), ("a", 1), ("c", 5), ("d", 0))
+        ]
+
+    def list_all(self, ordering, page_size=1):
+        """Follow the next links, return the ids in order"""
+
+        ids = []
+        url = reverse("video:list")
+        params = {"ordering": ordering}
+        with mock.patch.object(KeysetPagination, "page_size", page_size):
+            while url:
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                ids += [video["id"] for video in res.data["results"]]
+                url, params = res.data["next"], None
+        return ids
+
+    def test_ordering_with_ties(self):
+        """Test pages follow the ordering, ties broken by id"""
+        a, b, c, d = (
+            self.videos[1].id,
+            self.videos[0].id,
+            self.videos[2].id,
+            self.videos[3].id,
+        )
+
+        self.assertEqual(self.list_all("-likes"), [c, b, a, d])
+        self.assertEqual(self.list_all("likes", 3), [d, a, b, c])
+        self.assertEqual(self.list_all("title", 2), [a, b, c, d])
+        self.assertEqual(self.list_all("-created_at"), [d, c, a, b])
+
+    def test_ordering_with_search(self):
+        """Test the ordering applies to the search results"""
+        res = self.client.get(
+            reverse("video:list"), {"ordering": "-title", "search": "c"}
+        )
+
+        self.assertEqual(
+            [video["id"] for video in res.data["results"]],
+            [self.videos[2].id],
+        )
+
+    def test_unsupported_ordering(self):
+        """Test orderings without an index are rejected"""
+        for ordering in ("description", "-created_by", ""):
+            res = self.client.get(
+                reverse("video:list"), {"ordering": ordering}
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_ordering_cursor(self):
+        """Test a cursor of the wrong type returns 404"""
+        cursor = KeysetPagination().encode_cursor(["x", 1])
+        res = self.client.get(
+            reverse("video:list"), {"ordering": "likes", "cursor": cursor}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
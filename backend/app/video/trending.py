@@ -0,0 +1,183 @@
+"""
+Trending videos.
+
+The trending score of a video is the sum of the weights of its events,
+its upload, likes and comments, each decayed by half every
+``HALF_LIFE``. Decaying every score by the same factor keeps their
+order, so instead of decaying the scores, each event is stored grown
+from a fixed epoch, ``weight * 2 ** ((time - EPOCH) / HALF_LIFE)``, and
+in log space to stay within float range. Adding an event to a score is
+then a single ``logaddexp`` computed once, and ordering by the stored
+score is the trending order at any time.
+
+``update`` adds the events created since the checkpoint of each source
+to the scores and drops the scores that can no longer reach the top
+``TOP_N`` without new events. It is meant to run every minute or so.
+
+The checkpoint is the last id counted. Ids are taken when rows are
+inserted rather than when they are committed, so the ids below it not
+seen yet are kept as gaps, and counted by the next runs once their rows
+are committed. Gaps are forgotten after ``GAP_TIME``, as rows rolled back
+or deleted leave gaps never filled.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from django.db import transaction
+from django.utils import timezone as django_timezone
+from core import models
+
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = timedelta(hours=24)
+TOP_N = 1000
+# Scores this far below the TOP_N-th one, a factor of 10^6, are dropped
+PRUNE_MARGIN = math.log(1e6)
+BATCH_SIZE = 5000
+# Events newer than this are left to the next run, so that few rows of
+# transactions committing out of id order are missed and left as gaps
+SETTLE_TIME = timedelta(seconds=30)
+# Seconds the rows of gaps are waited for, and the most gaps kept
+GAP_TIME = 3600
+MAX_GAPS = 1000
+
+# Event model, field of the video id and weight of each source
+SOURCES = {
+    "video": (models.Video, "id", 5.0),
+    "like": (models.VideoLike, "video_id", 1.0),
+    "comment": (models.Comment, "video_id", 2.0),
+}
+
+
+def log_weight(weight, time):
+    """Log of the weight of an event grown from the epoch"""
+
+    age = (time - EPOCH) / HALF_LIFE
+    return math.log(weight) + age * math.log(2)
+
+
+def logaddexp(a, b):
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def update(now=None, batch_size=BATCH_SIZE, using="default"):
+    """Add the new events to the scores, return the number of events"""
+
+    now = now or django_timezone.now()
+    total = 0
+    for source in SOURCES:
+        models.TrendingCheckpoint.objects.using(using).get_or_create(
+            source=source
+        )
+        while True:
+            count = _update_batch(source, now, batch_size, using)
+            total += count
+            if count < batch_size:
+                break
+    prune(using)
+    return total
+
+
+def _update_batch(source, now, batch_size, using):
+    model, video_field, weight = SOURCES[source]
+    with transaction.atomic(using=using):
+        checkpoint = (
+            models.TrendingCheckpoint.objects.using(using)
+            .select_for_update()
+            .get(source=source)
+        )
+        rows = model.objects.using(using).values_list(
+            "id", video_field, "created_at"
+        )
+        events = list(
+            rows.filter(
+                id__gt=checkpoint.last_id,
+                created_at__lte=now - SETTLE_TIME,
+            ).order_by("id")[:batch_size]
+        )
+        gaps = dict(checkpoint.gaps)
+        # Committed since their ids were passed
+        late = list(rows.filter(id__in=gaps)) if gaps else []
+
+        timestamp = now.timestamp()
+        for row_id, _, _ in late:
+            del gaps[row_id]
+        if events:
+            seen = {row_id for row_id, _, _ in events}
+            missed = range(
+                max(checkpoint.last_id + 1, events[-1][0] - MAX_GAPS),
+                events[-1][0],
+            )
+            for row_id in missed:
+                if row_id not in seen:
+                    gaps[row_id] = timestamp
+        gaps = sorted(
+            [row_id, missed_at]
+            for row_id, missed_at in gaps.items()
+            if timestamp - missed_at < GAP_TIME
+        )[-MAX_GAPS:]
+        if not events and not late and gaps == checkpoint.gaps:
+            return 0
+
+        increments = {}
+        for _, video_id, created_at in events + late:
+            increments[video_id] = logaddexp(
+                increments.get(video_id), log_weight(weight, created_at)
+            )
+        if increments:
+            _add(increments, using)
+
+        if events:
+            checkpoint.last_id = events[-1][0]
+        checkpoint.gaps = gaps
+        checkpoint.save(update_fields=["last_id", "gaps"])
+        return len(events) + len(late)
+
+
+def _add(increments, using):
+    scores = models.TrendingScore.objects.using(using)
+    existing = list(scores.filter(video_id__in=increments))
+    for score in existing:
+        score.score = logaddexp(score.score, increments.pop(score.video_id))
+    scores.bulk_update(existing, ["score"], batch_size=1000)
+
+    # Videos deleted since their events were read have no score
+    video_ids = models.Video.objects.using(using).filter(id__in=increments)
+    scores.bulk_create(
+        [
+            models.TrendingScore(video_id=video_id, score=increments[video_id])
+            for video_id in video_ids.values_list("id", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+def prune(using="default"):
+    """Drop the scores too low to reach the top without new events"""
+
+    scores = models.TrendingScore.objects.using(using)
+    threshold = scores.order_by("-score").values_list("score", flat=True)
+    threshold = list(threshold[TOP_N - 1:TOP_N])
+    if threshold:
+        scores.filter(score__lt=threshold[0] - PRUNE_MARGIN).delete()
+
+
+def rank(limit, after=None, using="default"):
+    """
+    Return ``(video_id, score)`` pairs of the trending videos, best first,
+    starting after the ``(score, video_id)`` key of a previous page
+    """
+
+    scores = models.TrendingScore.objects.using(using)
+    if after is not None:
+        score, video_id = after
+        scores = scores.filter(score__lte=score).exclude(
+            score=score, video_id__gte=video_id
+        )
+    return list(
+        scores.order_by("-score", "-video_id").values_list(
+            "video_id", "score"
+        )[:limit]
+    )
@@ -5,9 +5,20 @@ app_name = "video"
 
 urlpatterns = [
     path("", views.VideoList.as_view(), name="list"),
+    path("search/", views.VideoSearchView.as_view(), name="search"),
+    path(
+        "trending/", views.TrendingVideoListView.as_view(), name="trending"
+    ),
+    path("tagged/", views.TaggedVideoListView.as_view(), name="tagged"),
     path("<int:id>/", views.VideoDetailView.as_view(), name="detail"),
     path(
         "<int:id>/comments/", views.CommentListView.as_view(), name="comment"
     ),
     path("<int:id>/likes/", views.LikeListView.as_view(), name="like"),
+    path("<int:id>/tags/", views.VideoTagsView.as_view(), name="tags"),
+    path(
+        "<int:id>/related/",
+        views.RelatedVideoListView.as_view(),
+        name="related",
+    ),
 ]
@@ -1,13 +1,44 @@
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
 )
-from core import models
-from video import serializers
+from core import conditional, models, tags
+from core.pagination import KeysetPagination
+from video import related, search, serializers, similar, trending
+
+MATCHES = ("all", "any")
+# Fields the video list can be ordered by, with the type of their value
+# in cursors and the function decoding it
+ORDERINGS = {
+    "created_at": (str, datetime.fromisoformat),
+    "likes": (int, int),
+    "title": (str, str),
+}
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def rows_in_order(serializer_class, queryset, ids):
+    """Rows of the videos with the given ids, in the order of the ids"""
+
+    id_index = serializer_class.lookups.index("id")
+    rows = {
+        row[id_index]: row
+        for row in serializer_class.rows_for(queryset.filter(id__in=ids))
+    }
+    return [rows[video_id] for video_id in ids if video_id in rows]
 
 
 class VideoList(APIView):
@@ -17,28 +48,37 @@ class VideoList(APIView):
     """
 
     serializer_class = serializers.VideoSerializer
+    list_serializer_class = serializers.VideoListSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = PageNumberPagination
     queryset = models.Video.objects
 
     def get(self, request, format=None):
         """
-        List all videos with pagination
+        List all videos with pagination, newest first, or in the order of
+        the ordering parameter with cursor pagination
         """
 
         try:
-            videos = self.queryset.all().order_by("-id")
+            videos = self.queryset.all()
 
             params = request.query_params
             if "search" in params:
                 videos = videos.filter(title__icontains=params["search"])
 
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(videos, request)
-            serializer = self.serializer_class(page, many=True)
-
-            response = paginator.get_paginated_response(serializer.data)
-            return Response(response.data, status=status.HTTP_200_OK)
+            return conditional.list_response(
+                request, "videos", videos, lambda: self.list(request, videos)
+            )
+        except NotFound:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The requested page is not available",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
         except Exception:
             response = {
                 "status": "500",
@@ -50,6 +90,75 @@ class VideoList(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    def list(self, request, videos):
+        """List a page of the videos"""
+
+        params = request.query_params
+        if "ordering" in params:
+            return self.list_ordered(request, videos, params["ordering"])
+
+        rows = self.list_serializer_class.rows_for(videos.order_by("-id"))
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(rows, request)
+        serializer = self.list_serializer_class(page)
+
+        response = paginator.get_paginated_response(serializer.data)
+        return Response(response.data, status=status.HTTP_200_OK)
+
+    def list_ordered(self, request, videos, ordering):
+        """
+        List the videos by one of the ``ORDERINGS``, each read in the
+        order of an index ending in id, a page at a time from the sort
+        key of the cursor
+        """
+
+        field = ordering.lstrip("-")
+        if field not in ORDERINGS:
+            response = {
+                "status": "400",
+                "title": "Bad Request",
+                "detail": "ordering must be one of "
+                + ", ".join(ORDERINGS)
+                + ", optionally prefixed with -",
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+        cursor_type, decode = ORDERINGS[field]
+        paginator = KeysetPagination()
+        cursor = paginator.get_cursor(request, cursor_type, int)
+        descending = ordering.startswith("-")
+        if cursor is not None:
+            try:
+                value = decode(cursor[0])
+            except ValueError:
+                raise NotFound(paginator.invalid_cursor_message)
+            lookup = "lt" if descending else "gt"
+            # The range on the field starts the index scan at the cursor
+            videos = videos.filter(
+                Q(**{f"{field}__{lookup}e": value})
+                & (
+                    Q(**{f"{field}__{lookup}": value})
+                    | Q(**{f"id__{lookup}": cursor[1]})
+                )
+            )
+
+        serializer_class = self.list_serializer_class
+        sign = "-" if descending else ""
+        rows = serializer_class.rows_for(
+            videos.order_by(f"{sign}{field}", f"{sign}id")
+        )
+        field_index = serializer_class.lookups.index(field)
+        id_index = serializer_class.lookups.index("id")
+        page = paginator.paginate(
+            rows[: paginator.page_size + 1],
+            request,
+            lambda row: (_cursor_value(row[field_index]), row[id_index]),
+        )
+        serializer = serializer_class(page)
+
+        response = paginator.get_paginated_data(serializer.data)
+        return Response(response, status=status.HTTP_200_OK)
+
     def post(self, request, format=None):
         """
         Create a video and return its location in the Location header
@@ -95,6 +204,229 @@ class VideoList(APIView):
             )
 
 
+class VideoSearchView(APIView):
+    """
+    Video view for full-text search over titles, descriptions and tags
+    Allowed methods: GET
+    """
+
+    list_serializer_class = serializers.VideoListSerializer
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = KeysetPagination
+    queryset = models.Video.objects
+
+    def get(self, request, format=None):
+        """
+        List the videos matching every word of the q parameter, best
+        ranked first, with cursor pagination
+        """
+
+        try:
+            query = request.query_params.get("q", "")
+            if not search.tokenize(query):
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": "The q parameter must contain a word",
+                }
+                return Response(
+                    response,
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            paginator = self.pagination_class()
+            after = paginator.get_cursor(request, (int, float), int)
+            matches = search.get_backend().search(
+                query, paginator.page_size + 1, after=after
+            )
+            matches = paginator.paginate(
+                matches, request, lambda match: (match[1], match[0])
+            )
+
+            serializer = self.list_serializer_class(
+                rows_in_order(
+                    self.list_serializer_class,
+                    self.queryset,
+                    [match[0] for match in matches],
+                )
+            )
+
+            response = paginator.get_paginated_data(serializer.data)
+            return Response(response, status=status.HTTP_200_OK)
+        except NotFound:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The requested page is not available",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error searching the videos",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class TrendingVideoListView(APIView):
+    """
+    Video view for listing the trending videos
+    Allowed methods: GET
+    """
+
+    list_serializer_class = serializers.VideoListSerializer
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = KeysetPagination
+    queryset = models.Video.objects
+
+    def get(self, request, format=None):
+        """
+        List the videos by trending score, recently uploaded, liked and
+        commented first, with cursor pagination
+        """
+
+        try:
+            paginator = self.pagination_class()
+            after = paginator.get_cursor(request, (int, float), int)
+            scores = paginator.paginate(
+                trending.rank(paginator.page_size + 1, after=after),
+                request,
+                lambda score: (score[1], score[0]),
+            )
+
+            serializer = self.list_serializer_class(
+                rows_in_order(
+                    self.list_serializer_class,
+                    self.queryset,
+                    [score[0] for score in scores],
+                )
+            )
+
+            response = paginator.get_paginated_data(serializer.data)
+            return Response(response, status=status.HTTP_200_OK)
+        except NotFound:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The requested page is not available",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error listing the trending videos",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class TaggedVideoListView(APIView):
+    """
+    Video view for listing the videos with some tags
+    Allowed methods: GET
+    """
+
+    list_serializer_class = serializers.VideoListSerializer
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = KeysetPagination
+    queryset = models.Video.objects
+    max_tags = 10
+
+    def get(self, request, format=None):
+        """
+        List the videos tagged with all (match=all, the default) or any
+        (match=any) of the comma separated tags of the tag parameter,
+        newest first, with cursor pagination
+        """
+
+        try:
+            params = request.query_params
+            names = params.get("tag", "").split(",")
+            names = {tags.normalize(name) for name in names} - {""}
+            match = params.get("match", MATCHES[0])
+            if not names or len(names) > self.max_tags or match not in MATCHES:
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": f"tag must list 1 to {self.max_tags} tags"
+                    + " and match must be all or any",
+                }
+                return Response(
+                    response,
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            tag_ids = tags.get_ids(names)
+            videos = self.queryset.all()
+            video_tags = models.VideoTag.objects
+            if match == "all" and len(tag_ids) < len(names):
+                videos = videos.none()
+            elif match == "all":
+                for tag_id in tag_ids.values():
+                    videos = videos.filter(
+                        id__in=video_tags.filter(tag_id=tag_id).values(
+                            "video_id"
+                        )
+                    )
+            else:
+                videos = videos.filter(
+                    id__in=video_tags.filter(
+                        tag_id__in=tag_ids.values()
+                    ).values("video_id")
+                )
+
+            paginator = self.pagination_class()
+            cursor = paginator.get_cursor(request, int)
+            if cursor is not None:
+                videos = videos.filter(id__lt=cursor[0])
+
+            serializer_class = self.list_serializer_class
+            rows = serializer_class.rows_for(videos.order_by("-id"))
+            id_index = serializer_class.lookups.index("id")
+            page = paginator.paginate(
+                rows[: paginator.page_size + 1],
+                request,
+                lambda row: (row[id_index],),
+            )
+            serializer = serializer_class(page)
+
+            response = paginator.get_paginated_data(serializer.data)
+            return Response(response, status=status.HTTP_200_OK)
+        except NotFound:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The requested page is not available",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error listing the videos",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class VideoDetailView(APIView):
     """
     Video view for retrieving, updating, and deleting videos
@@ -111,10 +443,9 @@ class VideoDetailView(APIView):
         """
 
         try:
-            video = self.queryset.get(id=id)
-            serializer = self.serializer_class(video, many=False)
-            response = serializer.data
-            return Response(response, status=status.HTTP_200_OK)
+            return conditional.detail_response(
+                request, self.queryset, id, self.serializer_class
+            )
         except models.Video.DoesNotExist:
             response = {
                 "status": "404",
@@ -261,6 +592,7 @@ class CommentListView(APIView):
     """
 
     serializer_class = serializers.CommentSerializer
+    list_serializer_class = serializers.CommentListSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     queryset = models.Comment.objects
 
@@ -271,10 +603,18 @@ class CommentListView(APIView):
 
         try:
             video = models.Video.objects.get(id=id)
-            comments = self.queryset.filter(video=video)
-            serializer = self.serializer_class(comments, many=True)
-            response = serializer.data
-            return Response(response, status=status.HTTP_200_OK)
+            comments = self.queryset.filter(video=video).order_by(
+                "created_at", "id"
+            )
+            validators = conditional.collection_validators(request, comments)
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
+
+            rows = self.list_serializer_class.rows_for(comments)
+            serializer = self.list_serializer_class(rows)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional.add_validators(response, validators)
         except models.Video.DoesNotExist:
             response = {
                 "status": "404",
@@ -354,6 +694,108 @@ class CommentListView(APIView):
             )
 
 
+class VideoTagsView(APIView):
+    """
+    Video tags view for reading and replacing the tags of a video
+    Allowed methods: GET, PUT
+    """
+
+    serializer_class = serializers.VideoTagsSerializer
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    queryset = models.Video.objects
+
+    def get(self, request, id, format=None):
+        """
+        List the tags of a video
+        """
+
+        try:
+            video = self.queryset.get(id=id)
+            serializer = self.serializer_class(video)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except models.Video.DoesNotExist:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The video was not found",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error retrieving the tags",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+    def put(self, request, id, format=None):
+        """
+        Replace the tags of a video
+        """
+
+        try:
+            video = self.queryset.get(id=id)
+
+            if video.created_by != request.user:
+                response = {
+                    "status": "403",
+                    "title": "Forbidden",
+                    "detail": "You do not have permission to tag"
+                    + " this video",
+                }
+                return Response(
+                    response,
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+
+            serializer = self.serializer_class(video, data=request.data)
+            if not serializer.is_valid():
+                response = {
+                    "status": "400",
+                    "title": "Bad Request",
+                    "detail": serializer.errors,
+                }
+                return Response(
+                    response,
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            with transaction.atomic():
+                serializer.save()
+
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except models.Video.DoesNotExist:
+            """Return a 404 error if the video was not found"""
+
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The video was not found",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            """Return a 500 error if there was an error tagging the video"""
+
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error tagging the video",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class LikeListView(APIView):
     """
     View for counting and liking videos
@@ -370,9 +812,12 @@ class LikeListView(APIView):
         """
 
         try:
-            video = models.Video.objects.get(id=id)
-            likes = video.likes
-            response = {"count": likes}
+            # Shares the cached representation, and its fills, of the
+            # video detail view
+            _, data = conditional.detail_entry(
+                models.Video.objects, id, serializers.VideoSerializer
+            )
+            response = {"count": data["likes"]}
             return Response(response, status=status.HTTP_200_OK)
         except models.Video.DoesNotExist:
             response = {
@@ -499,3 +944,63 @@ class LikeListView(APIView):
                 response,
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class RelatedVideoListView(APIView):
+    """
+    Video view for listing the videos related to a video
+    Allowed methods: GET
+    """
+
+    list_serializer_class = serializers.VideoListSerializer
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    queryset = models.Video.objects
+
+    def get(self, request, id, format=None):
+        """
+        List the videos sharing the most tags with a video, most similar
+        first, or the videos with the most similar text for videos
+        without tags in common with any other
+        """
+
+        try:
+            serializer_class = self.list_serializer_class
+            videos = self.queryset.filter(related_from__video_id=id).order_by(
+                "-related_from__score", "id"
+            )
+            data = serializer_class(
+                serializer_class.rows_for(videos)[: related.K]
+            ).data
+            if not data:
+                neighbours = similar.get_table().lookup(id)
+                data = serializer_class(
+                    rows_in_order(
+                        serializer_class,
+                        self.queryset,
+                        [video_id for video_id, _ in neighbours],
+                    )
+                ).data
+            if not data and not self.queryset.filter(id=id).exists():
+                raise models.Video.DoesNotExist
+
+            return Response({"results": data}, status=status.HTTP_200_OK)
+        except models.Video.DoesNotExist:
+            response = {
+                "status": "404",
+                "title": "Not Found",
+                "detail": "The video was not found",
+            }
+            return Response(
+                response,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception:
+            response = {
+                "status": "500",
+                "title": "Internal Server Error",
+                "detail": "There was an error listing the related videos",
+            }
+            return Response(
+                response,
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )